@@ -424,7 +424,10 @@ evaluate_synthesizer = mlprogram.synthesizers.FilteredSynthesizer(
                         ],
                     ),
                 ),
-                batch_size=1,
+                batch_size=100,
+                to_key=Pick(
+                    key="interpreter_state",
+                ),
             ),
             to_key=Pick(
                 key="interpreter_state",
@@ -1,4 +1,3 @@
-from copy import deepcopy
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, cast
 
@@ -214,17 +213,19 @@ class ActionSequence:
         action_sequence
             The cloned action_sequence
         """
+        # Actions and parents are never modified after they are added, so
+        # the clone shares them with this action sequence. Only the
+        # containers are copied.
         action_sequence = ActionSequence()
-        for key, value in self._tree.children.items():
-            v = []
-            for src in value:
-                v.append(deepcopy(src))
-            action_sequence._tree.children[key] = v
-        action_sequence._tree.parent = deepcopy(self._tree.parent)
-        action_sequence._action_sequence = deepcopy(self._action_sequence)
+        action_sequence._tree.children = {
+            key: [list(src) for src in value]
+            for key, value in self._tree.children.items()
+        }
+        action_sequence._tree.parent = dict(self._tree.parent)
+        action_sequence._action_sequence = list(self._action_sequence)
         action_sequence._head_action_index = self._head_action_index
         action_sequence._head_children_index = \
-            deepcopy(self._head_children_index)
+            dict(self._head_children_index)
 
         return action_sequence
 
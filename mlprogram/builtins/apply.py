@@ -20,7 +20,10 @@ class Apply(nn.Module):
         self._is_out_supervision = is_out_supervision
 
     def forward(self, entry: Environment) -> Environment:
-        entry = cast(Environment, entry.clone())
+        return self.update(cast(Environment, entry.clone()))
+
+    def update(self, entry: Environment) -> Environment:
+        # Same as forward, but modifies the entry in place
         kwargs = {key: value for key, value in self.constants.items()}
         is_supervision = False
         for i, in_key in enumerate(self.in_keys):
@@ -1,35 +1,53 @@
-from typing import Any, Dict, Iterable, Optional, Set, Tuple
+from typing import AbstractSet, Any, Dict, Iterable, Optional, Tuple
+
+_empty: AbstractSet[str] = frozenset()
 
 
 class Environment(object):
+    # The supervision set is immutable, so the clones share it until one of
+    # them marks a new supervision.
+    __slots__ = ["_values", "_supervisions"]
+
     def __init__(self, values: Optional[Dict[str, Any]] = None,
-                 supervisions: Optional[Set[str]] = None):
+                 supervisions: Optional[AbstractSet[str]] = None):
         values = values or {}
-        supervisions = supervisions or set()
+        supervisions = frozenset(supervisions) if supervisions else _empty
         assert all([key in values for key in supervisions])
         self._values: Dict[str, Any] = values
-        self._supervisions: Set[str] = supervisions
+        self._supervisions: AbstractSet[str] = supervisions
+
+    @staticmethod
+    def _create(values: Dict[str, Any], supervisions: AbstractSet[str]) \
+            -> "Environment":
+        # Create an environment without validating the arguments
+        env = Environment.__new__(Environment)
+        env._values = values
+        env._supervisions = supervisions
+        return env
 
     def __len__(self) -> int:
         return len(self._values)
 
     def __getitem__(self, key: str) -> Any:
-        assert key in self._values
-        return self._values[key]
+        try:
+            return self._values[key]
+        except KeyError:
+            raise AssertionError(f"{key} is not in the environment")
 
     def __setitem__(self, key: str, value: Any):
         self._values[key] = value
 
     def mark_as_supervision(self, key: str) -> None:
         assert key in self._values
-        self._supervisions.add(key)
+        if key not in self._supervisions:
+            self._supervisions = self._supervisions | {key}
 
     def is_supervision(self, key: str) -> bool:
         return key in self._supervisions
 
     def clear(self) -> None:
         self._values.clear()
-        self._supervisions.clear()
+        self._supervisions = _empty
 
     def keys(self) -> Iterable[str]:
         return self._values.keys()
@@ -44,13 +62,13 @@ class Environment(object):
         return key in self._values
 
     def clone_without_supervision(self):
-        return Environment({
+        return Environment._create({
             key: value for key, value in self._values.items()
             if key not in self._supervisions
-        })
+        }, _empty)
 
     def clone(self):
-        return Environment(dict(self._values), set(self._supervisions))
+        return Environment._create(dict(self._values), self._supervisions)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -71,6 +89,17 @@ class Environment(object):
                 return x
         self._values = {key: _to(x) for key, x in self._values.items()}
 
+    def pin_memory(self) -> "Environment":
+        # Called by DataLoader when pin_memory=True
+        def _pin_memory(x: Any):
+            if hasattr(x, "pin_memory"):
+                return x.pin_memory()
+            else:
+                return x
+        return Environment._create(
+            {key: _pin_memory(x) for key, x in self._values.items()},
+            self._supervisions)
+
     def __str__(self) -> str:
         return f"Environment(${str(self.to_dict())})"
 
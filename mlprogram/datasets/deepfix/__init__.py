@@ -1,2 +1,4 @@
 from mlprogram.datasets.deepfix.download import download  # noqa
 from mlprogram.datasets.deepfix.lexer import Lexer  # noqa
+from mlprogram.datasets.deepfix.dataset import SqliteDataset  # noqa
+from mlprogram.datasets.deepfix.dataset import SqliteIterableDataset  # noqa
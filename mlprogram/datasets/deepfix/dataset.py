@@ -0,0 +1,95 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+from torch.utils import data
+
+from mlprogram.builtins import Environment
+from mlprogram.utils.data import ListDataset, get_shard
+
+QUERY = "SELECT code, error, errorcount FROM Code"
+
+
+def _to_environment(code: str, error: str, errorcount: int) -> Environment:
+    return Environment(
+        {
+            "code": code,
+            "error": error,
+            "n_error": errorcount,
+        },
+        set(["error", "n_error"])
+    )
+
+
+class _ConnectionPool(object):
+    # A read-only connection is opened per (process, thread), so each
+    # DataLoader worker uses its own connection after fork.
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connections: Dict[Tuple[int, int], sqlite3.Connection] = {}
+
+    def get(self) -> sqlite3.Connection:
+        key = (os.getpid(), threading.get_ident())
+        with self.lock:
+            if key not in self.connections:
+                self.connections[key] = sqlite3.connect(
+                    f"file:{self.path}?mode=ro", uri=True,
+                    check_same_thread=False)
+            return self.connections[key]
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+
+class SqliteDataset(ListDataset[Environment]):
+    def __init__(self, path: str):
+        super().__init__([])
+        self.path = path
+        self.pool = _ConnectionPool(path)
+        self.rowids = np.array(
+            [rowid for rowid, in self.pool.get().execute(
+                "SELECT rowid FROM Code ORDER BY rowid")],
+            dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.rowids)
+
+    def _get(self, idx: int) -> Environment:
+        rowid = int(self.rowids[idx])
+        row = self.pool.get().execute(f"{QUERY} WHERE rowid = ?",
+                                      (rowid,)).fetchone()
+        return _to_environment(*row)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._get(i) for i in range(*idx.indices(len(self)))]
+        return self._get(idx)
+
+
+class SqliteIterableDataset(data.IterableDataset):
+    def __init__(self, path: str):
+        self.path = path
+        self.pool = _ConnectionPool(path)
+
+    def __iter__(self) -> Iterator[Environment]:
+        conn = self.pool.get()
+        min_rowid, max_rowid = \
+            conn.execute("SELECT min(rowid), max(rowid) FROM Code").fetchone()
+        if min_rowid is None:
+            return
+        # Each shard reads a contiguous range of rowids so that it only
+        # touches its own pages of the table.
+        shard, n_shard = get_shard()
+        n = max_rowid - min_rowid + 1
+        begin = min_rowid + n * shard // n_shard
+        end = min_rowid + n * (shard + 1) // n_shard
+        for row in conn.execute(
+                f"{QUERY} WHERE rowid >= ? AND rowid < ? ORDER BY rowid",
+                (begin, end)):
+            yield _to_environment(*row)
@@ -7,11 +7,17 @@ import zipfile
 from shutil import copyfileobj
 from typing import Callable
 
+import torch
+
 from mlprogram import logging
-from mlprogram.builtins import Environment
 from mlprogram.datasets import DEFAULT_CACHE_DIR
+from mlprogram.datasets.deepfix.dataset import (
+    QUERY,
+    SqliteDataset,
+    SqliteIterableDataset,
+    _to_environment,
+)
 from mlprogram.functools import file_cache
-from mlprogram.utils.data import ListDataset
 
 logger = logging.Logger(__name__)
 
@@ -24,45 +30,56 @@ def default_get(src: str, dst: str):
         copyfileobj(src_file, dst_file)
 
 
+def _extract(path: str, get: Callable[[str, str], None], dst: str) -> None:
+    logger.info("Download DeepFix dataset")
+    logger.debug(f"Dataset path: {path}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        zipfile_path = os.path.join(tmpdir, "dataset.zip")
+        get(path, zipfile_path)
+
+        gzipfile = os.path.join(tmpdir, "dataset.gz")
+        with zipfile.ZipFile(zipfile_path) as z:
+            with z.open(os.path.join("prutor-deepfix-09-12-2017",
+                                     "prutor-deepfix-09-12-2017.db.gz"),
+                        "r") as file, \
+                    open(gzipfile, "wb") as dst_file:
+                copyfileobj(file, dst_file)
+        with gzip.open(gzipfile, "rb") as src_file, \
+                open(dst, "wb") as dst_file:
+            copyfileobj(src_file, dst_file)
+
+
 def download(cache_path: str = os.path.join(DEFAULT_CACHE_DIR, "deepfix.pt"),
              path: str = BASE_PATH,
-             get: Callable[[str, str], None] = default_get) \
-        -> ListDataset:
+             get: Callable[[str, str], None] = default_get,
+             format: str = "columnar",
+             streaming: bool = False) \
+        -> torch.utils.data.Dataset:
+    # format="sqlite" keeps the extracted SQLite file next to cache_path and
+    # reads the rows on demand instead of loading the whole corpus.
+    assert format in set(["columnar", "sqlite"])
+    assert not streaming or format == "sqlite"
+    if format == "sqlite":
+        sqlitefile = os.path.splitext(cache_path)[0] + ".db"
+        if not os.path.exists(sqlitefile):
+            os.makedirs(os.path.dirname(sqlitefile), exist_ok=True)
+            tmpfile = f"{sqlitefile}.{os.getpid()}.tmp"
+            _extract(path, get, tmpfile)
+            os.replace(tmpfile, sqlitefile)
+        if streaming:
+            return SqliteIterableDataset(sqlitefile)
+        return SqliteDataset(sqlitefile)
 
-    @file_cache(cache_path)
+    @file_cache(cache_path, format="columnar")
     def _download():
-        logger.info("Download DeepFix dataset")
-        logger.debug(f"Dataset path: {path}")
-        samples = []
         with tempfile.TemporaryDirectory() as tmpdir:
-            dst = os.path.join(tmpdir, "dataset.zip")
-            get(path, dst)
-
-            gzipfile = os.path.join(tmpdir, "dataset.gz")
-            with zipfile.ZipFile(dst) as z:
-                with z.open(os.path.join("prutor-deepfix-09-12-2017",
-                                         "prutor-deepfix-09-12-2017.db.gz"),
-                            "r") as file, \
-                        open(gzipfile, "wb") as dst_file:
-                    copyfileobj(file, dst_file)
             sqlitefile = os.path.join(tmpdir, "dataset.db")
-            with gzip.open(gzipfile, "rb") as src_file, \
-                    open(sqlitefile, "wb") as dst_file:
-                copyfileobj(src_file, dst_file)
+            _extract(path, get, sqlitefile)
 
             conn = sqlite3.connect(sqlitefile)
             c = conn.cursor()
-            for code, error, errorcount in \
-                    c.execute("SELECT code, error, errorcount FROM Code"):
-                samples.append(Environment(
-                    {
-                        "code": code,
-                        "error": error,
-                        "n_error": errorcount,
-                    },
-                    set(["error", "n_error"])
-                ))
+            samples = [_to_environment(*row) for row in c.execute(QUERY)]
+            conn.close()
         return samples
 
-    samples = _download()
-    return ListDataset(samples)
+    return _download()
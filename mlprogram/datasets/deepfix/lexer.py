@@ -41,6 +41,7 @@ limitations under the License.
 """
 
 import re
+from functools import lru_cache
 from typing import List, Optional, Tuple
 
 from mlprogram import logging
@@ -73,69 +74,120 @@ class Lexer(BaseLexer[str, str]):
               'gets', 'fgets', 'getchar', 'main', 'malloc', 'calloc', 'free']
     _types = ['char', 'double', 'float', 'int', 'long', 'short', 'unsigned']
 
+    # The keywords of the original tokenizer (they are not C keywords)
+    _token_keywords = frozenset(
+        ['IF', 'THEN', 'ENDIF', 'FOR', 'NEXT', 'GOSUB', 'RETURN'])
+    _token_specification = [
+        ('comment',
+         r'\/\*(?:[^*]|\*(?!\/))*\*\/|\/\*([^*]|\*(?!\/))*\*?|\/\/[^\n]*'),
+        ('directive', r'#\w+'),
+        ('string', r'"(?:[^"\n]|\\")*"?'),
+        ('char', r"'(?:\\?[^'\n]|\\')'"),
+        ('char_continue', r"'[^']*"),
+        ('number', r'[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?'),
+        ('include', r'(?<=\#include) *<([_A-Za-z]\w*(?:\.h))?>'),
+        ('op',
+         r'\(|\)|\[|\]|{|}|->|<<|>>|\*\*|\|\||&&|--|\+\+|[-+*|&%\/=]=|[-<>~!%^&*\/+=?|.,:;#]'),  # noqa
+        ('name', r'[_A-Za-z]\w*'),
+        ('whitespace', r'\s+'),
+        ('nl', r'\\\n?'),
+        ('MISMATCH', r'.'),            # Any other character
+    ]
+    _token_regex = re.compile('|'.join('(?P<%s>%s)' % pair
+                                       for pair in _token_specification))
+    _skipped_kinds = frozenset(['NEWLINE', 'SKIP', 'whitespace'])
+    _multiline_kinds = frozenset(['char_continue', 'nl'])
+    # The kinds whose values are replaced with placeholders, and the prefix
+    # of the placeholders
+    _placeholder_kinds = {
+        'name': 'name',
+        'number': 'number',
+        'string': 'string',
+        'char': 'char',
+        'char_continue': 'char',
+    }
+
     def __init__(self, delimiter: str = " "):
         super().__init__()
         self.delimiter = delimiter
 
     def tokenize_with_offset(self, code: str) \
             -> Optional[List[Tuple[int, Token[str, str]]]]:
-        keywords = {'IF', 'THEN', 'ENDIF', 'FOR', 'NEXT', 'GOSUB', 'RETURN'}
-        token_specification = [
-            ('comment',
-             r'\/\*(?:[^*]|\*(?!\/))*\*\/|\/\*([^*]|\*(?!\/))*\*?|\/\/[^\n]*'),
-            ('directive', r'#\w+'),
-            ('string', r'"(?:[^"\n]|\\")*"?'),
-            ('char', r"'(?:\\?[^'\n]|\\')'"),
-            ('char_continue', r"'[^']*"),
-            ('number', r'[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?'),
-            ('include', r'(?<=\#include) *<([_A-Za-z]\w*(?:\.h))?>'),
-            ('op',
-             r'\(|\)|\[|\]|{|}|->|<<|>>|\*\*|\|\||&&|--|\+\+|[-+*|&%\/=]=|[-<>~!%^&*\/+=?|.,:;#]'),  # noqa
-            ('name', r'[_A-Za-z]\w*'),
-            ('whitespace', r'\s+'),
-            ('nl', r'\\\n?'),
-            ('MISMATCH', r'.'),            # Any other character
-        ]
-        tok_regex = '|'.join('(?P<%s>%s)' %
-                             pair for pair in token_specification)
+        tokens = self._scan(code)
+        if tokens is None:
+            return None
+        return self._replace_with_placeholders(tokens)
+
+    def tokenize_lines_with_offset(self, lines: List[str]) \
+            -> Optional[List[Tuple[int, Token[str, str]]]]:
+        # Each line is scanned separately, and the results are cached by the
+        # line. So re-tokenizing a program after a line is changed scans only
+        # the changed line. The placeholders are assigned to the whole
+        # program so that they are consistent with tokenize_with_offset.
+        tokens: List[Tuple[int, str, str]] = []
+        begin = 0
+        for line in lines:
+            result = _scan_line(line)
+            if result is None:
+                return None
+            line_tokens, is_closed = result
+            if not is_closed:
+                # A token of the line may continue to the next line
+                return self.tokenize_with_offset("\n".join(lines) + "\n")
+            tokens.extend((begin + offset, kind, value)
+                          for offset, kind, value in line_tokens)
+            begin += len(line) + 1
+        return self._replace_with_placeholders(tokens)
+
+    @classmethod
+    def _scan(cls, code: str) -> Optional[List[Tuple[int, str, str]]]:
+        skipped_kinds = cls._skipped_kinds
+        token_keywords = cls._token_keywords
         tokens = []
-        for mo in re.finditer(tok_regex, code):
+        for mo in cls._token_regex.finditer(code):
             kind = mo.lastgroup
-            if kind is None:
+            if kind is None or kind in skipped_kinds:
                 continue
-            value = mo.group(kind)
-            if kind in set(['NEWLINE', 'SKIP', 'whitespace']):
-                pass
-            elif kind == 'MISMATCH':
+            if kind == 'MISMATCH':
                 return None
-            else:
-                if kind == 'name' and value in keywords:
-                    kind = value
-                offset = mo.start()
-                tokens.append((offset, Token(kind, value, value)))
-
-        name_to_idx = _Mapping("name")
-        number_to_idx = _Mapping("number")
-        str_to_idx = _Mapping("string")
-        chr_to_idx = _Mapping("char")
-
+            value = mo.group(kind)
+            if kind == 'name' and value in token_keywords:
+                kind = value
+            tokens.append((mo.start(), kind, value))
+        return tokens
+
+    def _replace_with_placeholders(self, tokens: List[Tuple[int, str, str]]) \
+            -> List[Tuple[int, Token[str, str]]]:
+        mappings = {prefix: _Mapping(prefix)
+                    for prefix in set(self._placeholder_kinds.values())}
+        placeholder_kinds = self._placeholder_kinds
         retval = []
-        for offset, token in tokens:
-            if token.kind == "name":
-                retval.append((offset, Token(token.kind, name_to_idx(token.raw_value),
-                                             token.raw_value)))
-            elif token.kind == "number":
-                retval.append((offset, Token(token.kind, number_to_idx(token.raw_value),
-                                             token.raw_value)))
-            elif token.kind == "string":
-                retval.append((offset, Token(token.kind, str_to_idx(token.raw_value),
-                                             token.raw_value)))
-            elif token.kind == "char" or token.kind == "char_continue":
-                retval.append((offset, Token(token.kind, chr_to_idx(token.raw_value),
-                                             token.raw_value)))
+        for offset, kind, value in tokens:
+            if kind in placeholder_kinds:
+                token = Token(kind, mappings[placeholder_kinds[kind]](value),
+                              value)
             else:
-                retval.append((offset, token))
+                token = Token(kind, value, value)
+            retval.append((offset, token))
         return retval
 
     def untokenize(self, sequnece: List[Token[str, str]]) -> Optional[str]:
         return self.delimiter.join([x.raw_value for x in sequnece])
+
+
+@lru_cache(maxsize=100000)
+def _scan_line(line: str) \
+        -> Optional[Tuple[Tuple[Tuple[int, str, str], ...], bool]]:
+    tokens = Lexer._scan(line)
+    if tokens is None:
+        return None
+    # The unterminated comments, char_continue, and backslash-newline may
+    # span multiple lines
+    is_closed = True
+    for _, kind, value in tokens:
+        if kind in Lexer._multiline_kinds or \
+                (kind == "comment" and value.startswith("/*") and
+                 (len(value) < 4 or not value.endswith("*/"))):
+            is_closed = False
+            break
+    return tuple(tokens), is_closed
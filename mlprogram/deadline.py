@@ -0,0 +1,67 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Generator, List, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class Deadline(object):
+    def __init__(self, timeout_sec: Optional[float] = None):
+        if timeout_sec is None:
+            self.end: Optional[float] = None
+        else:
+            self.end = time.time() + timeout_sec
+
+    def remaining(self) -> Optional[float]:
+        if self.end is None:
+            return None
+        return max(0.0, self.end - time.time())
+
+    def is_expired(self) -> bool:
+        return self.end is not None and time.time() >= self.end
+
+
+class _Stack(threading.local):
+    def __init__(self):
+        self.deadlines: List[Deadline] = []
+
+
+_stack = _Stack()
+
+
+@contextmanager
+def activate(deadline: Deadline):
+    # The nearest deadline among the active ones is used
+    current_deadline = current()
+    if current_deadline.end is not None and \
+            (deadline.end is None or current_deadline.end < deadline.end):
+        deadline = current_deadline
+    _stack.deadlines.append(deadline)
+    try:
+        yield deadline
+    finally:
+        _stack.deadlines.pop()
+
+
+def current() -> Deadline:
+    if len(_stack.deadlines) == 0:
+        return Deadline()
+    return _stack.deadlines[-1]
+
+
+def is_expired() -> bool:
+    return len(_stack.deadlines) != 0 and _stack.deadlines[-1].is_expired()
+
+
+def run_with_deadline(deadline: Deadline, generator: Generator[V, None, None]) \
+        -> Generator[V, None, None]:
+    # Run each step of the generator with the deadline. The deadline is
+    # deactivated while the caller consumes the yielded value.
+    while True:
+        with activate(deadline):
+            try:
+                value = next(generator)
+            except StopIteration:
+                return
+        yield value
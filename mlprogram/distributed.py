@@ -1,7 +1,9 @@
+import contextlib
 import os
-from typing import Callable, Optional, cast
+from typing import Callable, Dict, List, Optional, cast
 
 import torch
+from torch import nn
 
 from mlprogram import logging
 
@@ -76,6 +78,138 @@ def size(group: Optional[torch.distributed.group] = None) -> int:
         return 1
 
 
+def broadcast(value: int, src: int = 0) -> int:
+    # Share an integer (e.g., a random seed) of the src process among all
+    # processes
+    if not torch.distributed.is_initialized():
+        return value
+    tensor = torch.tensor([value], dtype=torch.int64)
+    torch.distributed.broadcast(tensor, src, group=groups["world_gloo"])
+    return int(tensor.item())
+
+
 def call(f: Callable, *args, **kwargs):
     if torch.distributed.is_initialized():
         return f(*args, **kwargs)
+
+
+class _Bucket(object):
+    def __init__(self, params: List[nn.Parameter]):
+        self.params = params
+        self.buffer = torch.zeros(sum(p.numel() for p in params),
+                                  dtype=params[0].dtype,
+                                  device=params[0].device)
+        self.n_ready = 0
+        self.work = None
+
+
+class GradientReducer(object):
+    def __init__(self, model: nn.Module, group: torch.distributed.group,
+                 bucket_size: int = 25 * 1024 * 1024):
+        # Average the gradients among the processes while the backward is
+        # running. The parameters are grouped into buckets of at most
+        # bucket_size bytes, and the all-reduce of a bucket starts as soon as
+        # all its gradients are computed. The buckets are reduced in a fixed
+        # order so that all processes issue the same sequence of collectives.
+        self.group = group
+        self.size = size(group)
+        # The gradients are computed roughly in the reverse order of the
+        # parameters
+        params = [p for p in model.parameters() if p.requires_grad]
+        params.reverse()
+        self.buckets: List[_Bucket] = []
+        self.bucket_of: Dict[nn.Parameter, _Bucket] = {}
+        current: List[nn.Parameter] = []
+        nbytes = 0
+        for p in params:
+            if len(current) != 0 and \
+                    (nbytes + p.numel() * p.element_size() > bucket_size or
+                     current[0].dtype != p.dtype or
+                     current[0].device != p.device):
+                self._add_bucket(current)
+                current = []
+                nbytes = 0
+            current.append(p)
+            nbytes += p.numel() * p.element_size()
+        if len(current) != 0:
+            self._add_bucket(current)
+        self.next_bucket = 0
+        self.enabled = True
+
+        # The hooks of AccumulateGrad are called after p.grad is updated
+        self.grad_accs = []
+        for p in params:
+            grad_acc = p.expand_as(p).grad_fn.next_functions[0][0]
+            grad_acc.register_hook(self._create_hook(p))
+            self.grad_accs.append(grad_acc)
+
+    def _add_bucket(self, params: List[nn.Parameter]) -> None:
+        bucket = _Bucket(params)
+        self.buckets.append(bucket)
+        for p in params:
+            self.bucket_of[p] = bucket
+
+    def _create_hook(self, p: nn.Parameter) -> Callable:
+        def hook(*args):
+            if not self.enabled:
+                return
+            bucket = self.bucket_of[p]
+            bucket.n_ready += 1
+            if bucket.n_ready == len(bucket.params):
+                self._launch_ready_buckets()
+        return hook
+
+    def _launch(self, bucket: _Bucket) -> None:
+        offset = 0
+        for p in bucket.params:
+            n = p.numel()
+            if p.grad is None:
+                bucket.buffer[offset:offset + n].zero_()
+            else:
+                bucket.buffer[offset:offset + n].copy_(p.grad.reshape(-1))
+            offset += n
+        # Divide before reducing so that the sum is the average
+        bucket.buffer.div_(self.size)
+        bucket.work = torch.distributed.all_reduce(
+            bucket.buffer, group=self.group, async_op=True)
+
+    def _launch_ready_buckets(self) -> None:
+        while self.next_bucket < len(self.buckets):
+            bucket = self.buckets[self.next_bucket]
+            if bucket.n_ready != len(bucket.params):
+                break
+            self._launch(bucket)
+            self.next_bucket += 1
+
+    @contextlib.contextmanager
+    def no_sync(self):
+        # Accumulate the gradients of the backward passes in this block
+        # locally. They are reduced with the next synchronized backward.
+        self.enabled = False
+        try:
+            yield
+        finally:
+            self.enabled = True
+
+    def synchronize(self) -> None:
+        # Wait for the all-reduce operations and write the averaged gradients
+        # back. The buckets containing unused parameters are reduced here.
+        try:
+            for bucket in self.buckets[self.next_bucket:]:
+                self._launch(bucket)
+            for bucket in self.buckets:
+                bucket.work.wait()
+                offset = 0
+                for p in bucket.params:
+                    n = p.numel()
+                    grad = bucket.buffer[offset:offset + n].view_as(p)
+                    if p.grad is None:
+                        p.grad = grad.clone()
+                    else:
+                        p.grad.copy_(grad)
+                    offset += n
+        finally:
+            for bucket in self.buckets:
+                bucket.n_ready = 0
+                bucket.work = None
+            self.next_bucket = 0
@@ -1,3 +1,4 @@
+import typing
 from dataclasses import dataclass
 from typing import Any, Dict, Generic, List, Optional, Tuple, TypeVar, Union, cast
 
@@ -47,9 +48,11 @@ class Unknown:
 
 @dataclass
 class Samples(Generic[V]):
-    rules: List[Rule]
-    node_types: List[NodeType]
-    tokens: List[Tuple[str, V]]
+    # Each field is either the list of the elements or the number of
+    # occurrences of each element.
+    rules: Union[List[Rule], typing.Counter[Rule]]
+    node_types: Union[List[NodeType], typing.Counter[NodeType]]
+    tokens: Union[List[Tuple[str, V]], typing.Counter[Tuple[str, V]]]
 
 
 class ActionSequenceEncoder:
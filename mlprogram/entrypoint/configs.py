@@ -1,14 +1,105 @@
+import hashlib
+import inspect
+import json
 import os
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import python_config
-from pytorch_pfn_extras.config import Config
+from pytorch_pfn_extras.config import Config, _parse_key
 
+from mlprogram import logging
 from mlprogram.entrypoint.types import types
 from mlprogram.functools import file_cache
 
+logger = logging.Logger(__name__)
+
+
+def _code_version(value: Any) -> str:
+    # The version is the source code of the modules defining the type and
+    # its base classes. Changes in the other modules (e.g., a helper function
+    # imported from another module) do not change the version.
+    classes = inspect.getmro(value) if inspect.isclass(value) else [value]
+    sources = [getattr(value, "__qualname__", "")]
+    for c in classes:
+        module = inspect.getmodule(c)
+        if module is None or module.__name__ == "builtins":
+            continue
+        try:
+            sources.append(inspect.getsource(module))
+        except (OSError, TypeError):
+            sources.append(module.__name__)
+    return hashlib.sha256("\n".join(sources).encode("utf-8")).hexdigest()
+
+
+def _lookup(root: Any, key: Tuple[Any, ...]) -> Any:
+    node = root
+    for k in key:
+        node = node[k]
+    return node
+
+
+def config_digest(config: Any, types: Dict[str, Any],
+                  root: Optional[Any] = None,
+                  key: Tuple[Any, ...] = ()) -> str:
+    # The digest depends on the config and the source code of the types used
+    # in the config. config has to be the unresolved config located at key
+    # in root. A reference (e.g., "@/parser") is replaced with the config it
+    # refers to, so the change of an upstream stage also changes the digest
+    # of its downstream stages. Values other than the JSON types (e.g.,
+    # objects created by the types) cannot be digested deterministically, so
+    # they are rejected.
+    if root is None:
+        root = config
+    used_types: Set[str] = set()
+
+    def canonicalize(d: Any, key: Tuple[Any, ...],
+                     trace: Tuple[Tuple[Any, ...], ...]) -> Any:
+        if isinstance(d, dict):
+            for k in ["_type", "type"]:
+                if isinstance(d.get(k), str):
+                    used_types.add(d[k])
+            return {k: canonicalize(v, (*key, k), trace)
+                    for k, v in d.items()}
+        elif isinstance(d, (list, tuple)):
+            return [canonicalize(v, (*key, i), trace)
+                    for i, v in enumerate(d)]
+        elif isinstance(d, str) and d.startswith("@"):
+            ref_key, attr_key, _ = _parse_key(d[1:], key[:-1])
+            if ref_key in trace:
+                raise RuntimeError(f"Circular reference: {d}")
+            return {
+                "@": canonicalize(_lookup(root, ref_key), ref_key,
+                                  (*trace, ref_key)),
+                "attr": list(attr_key) if attr_key is not None else None,
+            }
+        elif d is None or isinstance(d, (str, int, float, bool)):
+            return d
+        raise TypeError(f"Cannot compute a digest of {type(d)}")
+
+    content = canonicalize(config, key, (key,))
+    versions = {
+        t: _code_version(types[t]) if t in types else ""
+        for t in sorted(used_types)
+    }
+    content = json.dumps({"config": content, "types": versions},
+                         sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def with_file_cache(path, config, types, digest=None):
+    # The cache file is addressed by the digest of the config, so the stale
+    # cache is not used when the config or the code is changed. parse_config
+    # passes the digest of the unresolved config because the references in
+    # config are already resolved into the objects.
+    if digest is None:
+        digest = config_digest(config, types)
+    root, ext = os.path.splitext(path)
+    path = f"{root}-{digest[:16]}{ext}"
+    if os.path.exists(path):
+        logger.info(f"with_file_cache: hit {path}")
+    else:
+        logger.info(f"with_file_cache: miss {path}")
 
-def with_file_cache(path, config, types):
     def restore(d):
         if not isinstance(d, dict):
             return d
@@ -23,6 +114,8 @@ def with_file_cache(path, config, types):
             t = d.pop("_type")
             d = {key: restore(value) for key, value in d.items()}
             d["type"] = t
+        else:
+            d = {key: restore(value) for key, value in d.items()}
         return d
 
     @file_cache(path)
@@ -38,7 +131,8 @@ def parse_config(configs: Dict[str, Any],
         for k, v in custom_types.items():
             _types[k] = v
     _types["with_file_cache"] = \
-        lambda path, config: with_file_cache(path, config, _types)
+        lambda path, config, digest=None: \
+        with_file_cache(path, config, _types, digest)
 
     def convert(d: Any, rename: bool) -> Any:
         if not isinstance(d, dict):
@@ -59,7 +153,27 @@ def parse_config(configs: Dict[str, Any],
                 d = {key: convert(value, False) for key, value in d.items()}
         return d
 
-    return Config(convert(configs, False), _types)
+    root = convert(configs, False)
+
+    # Compute the digests before the references are resolved
+    digests: List[Tuple[Dict[str, Any], str]] = []
+
+    def add_digest(d: Any, key: Tuple[Any, ...]) -> None:
+        if isinstance(d, dict):
+            if "with_file_cache" in [d.get("type"), d.get("_type")]:
+                digests.append((d, config_digest(d["config"], _types, root,
+                                                 (*key, "config"))))
+            for k, v in d.items():
+                add_digest(v, (*key, k))
+        elif isinstance(d, list):
+            for i, v in enumerate(d):
+                add_digest(v, (*key, i))
+
+    add_digest(root, ())
+    for d, digest in digests:
+        d["digest"] = digest
+
+    return Config(root, _types)
 
 
 def load_config(file: str) -> Dict[str, Any]:
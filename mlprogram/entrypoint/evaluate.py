@@ -13,6 +13,8 @@ from tqdm import tqdm
 
 from mlprogram import logging
 from mlprogram.builtins import Environment
+from mlprogram.nn.utils.quantization import quantize_dynamic_
+from mlprogram.pytorch_pfn_extras import load_scores
 from mlprogram.synthesizers import Synthesizer
 from mlprogram.utils.data import ListDataset
 
@@ -167,8 +169,11 @@ def evaluate(input_dir: str, workspace_dir: str, output_dir: str,
              top_n: List[int] = [1],
              device: torch.device = torch.device("cpu"),
              n_process: Optional[int] = None,
-             n_samples: Optional[int] = None) \
+             n_samples: Optional[int] = None,
+             quantize: bool = False) \
         -> None:
+    # If quantize is True, the Linear and LSTM layers are dynamically
+    # quantized after loading the model (CPU only).
     os.makedirs(workspace_dir, exist_ok=True)
 
     logger.info("Prepare model")
@@ -182,19 +187,21 @@ def evaluate(input_dir: str, workspace_dir: str, output_dir: str,
         logger.warning(f"There are multiple models in {model_dir}")
     if len(os.listdir(model_dir)) == 0:
         logger.warning(f"There are no models in {model_dir}")
-    pathes = []
-    for model_path in os.listdir(model_dir):
-        model_path = os.path.join(model_dir, os.path.basename(model_path))
-        score = \
-            torch.load(model_path, map_location=torch.device("cpu"))["score"]
-        pathes.append((score, model_path))
-    pathes.sort(key=lambda x: -x[0])  # type: ignore
-    model_path = pathes[0][1]
+    scores = load_scores(model_dir)
+    model_path = os.path.join(model_dir,
+                              max(scores.keys(), key=lambda x: scores[x]))
 
     logger.info(f"Start evaluation: {model_path}")
     state_dict = \
         torch.load(model_path, map_location=torch.device("cpu"))["model"]
     model.load_state_dict(state_dict)
+    if quantize:
+        if device.type == "cpu":
+            logger.info("Quantize the model")
+            quantize_dynamic_(model)
+        else:
+            logger.warning(
+                f"Skip quantization (not supported on {device.type})")
 
     result = evaluate_synthesizer()
 
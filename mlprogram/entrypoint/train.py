@@ -1,8 +1,9 @@
+import contextlib
 import os
 import shutil
 import traceback
 from dataclasses import dataclass
-from typing import Any, Callable, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import pytorch_pfn_extras as ppe
 import torch
@@ -12,8 +13,16 @@ from torch.utils.data import DataLoader
 
 from mlprogram import distributed, logging
 from mlprogram.builtins import Environment
-from mlprogram.pytorch_pfn_extras import SaveTopKModel, StopByThreshold
+from mlprogram.functools import file_cache
+from mlprogram.nn.utils.precision import autocast, create_grad_scaler
+from mlprogram.pytorch_pfn_extras import (
+    CPUThreadWriter,
+    SaveTopKModel,
+    StopByThreshold,
+    score_index_path,
+)
 from mlprogram.synthesizers import Synthesizer
+from mlprogram.utils.data import BucketBatchSampler, InfiniteSampler, split_by_size
 
 logger = logging.Logger(__name__)
 
@@ -115,32 +124,61 @@ def create_extensions_manager(n_iter: int, evaluation_interval_iter: int,
             trigger=Trigger(evaluation_interval_iter, n_iter)
         )
     if distributed.is_initialized():
-        snapshot = extensions.snapshot(autoload=True, n_retains=1,
-                                       saver_rank=0)
+        snapshot = extensions.snapshot(
+            autoload=True, n_retains=1, saver_rank=0,
+            writer=CPUThreadWriter(out_dir=workspace_dir))
         snapshot._rank = distributed.rank()
         snapshot._size = distributed.size()
         snapshot._local_rank = distributed.rank()
     else:
-        snapshot = extensions.snapshot(autoload=True, n_retains=1)
+        snapshot = extensions.snapshot(
+            autoload=True, n_retains=1,
+            writer=CPUThreadWriter(out_dir=workspace_dir))
     manager.extend(snapshot, trigger=Trigger(snapshot_interval_iter, n_iter))
     return manager
 
 
 def create_dataloader(dataset: torch.utils.data.Dataset,
-                      batch_size: int, n_worker: int, collate_fn: Callable) \
+                      batch_size: int, n_worker: int, collate_fn: Callable,
+                      pin_memory: bool = False,
+                      prefetch_factor: int = 2,
+                      lengths: Optional[List[int]] = None,
+                      max_tokens: Optional[int] = None) \
         -> torch.utils.data.DataLoader:
+    # The workers are kept alive across the epochs. A map-style dataset is
+    # sampled by InfiniteSampler, so one iteration over the loader never
+    # ends and the prefetching does not stop at the epoch boundaries.
+    # The samplers shard the dataset by rank, and DataLoader splits each
+    # shard among the workers. An iterable dataset has to shard itself
+    # (see ShardedIterableDataset).
+    kwargs: Dict[str, Any] = {}
+    if n_worker != 0:
+        kwargs["persistent_workers"] = True
+        kwargs["prefetch_factor"] = prefetch_factor
     if hasattr(dataset, "__len__"):
         is_iterable = False
     else:
         is_iterable = True
+    if lengths is not None:
+        # Batch the samples with similar lengths to reduce padding
+        assert not is_iterable
+        return DataLoader(dataset,
+                          batch_sampler=BucketBatchSampler(
+                              lengths, batch_size, max_tokens),
+                          num_workers=n_worker,
+                          collate_fn=collate_fn, pin_memory=pin_memory,
+                          **kwargs)
     if is_iterable:
         return DataLoader(dataset, batch_size=batch_size,
                           shuffle=False, num_workers=n_worker,
-                          collate_fn=collate_fn)
+                          collate_fn=collate_fn, pin_memory=pin_memory,
+                          **kwargs)
     else:
         return DataLoader(dataset, batch_size=batch_size,
-                          shuffle=True, num_workers=n_worker,
-                          collate_fn=collate_fn)
+                          sampler=InfiniteSampler(len(dataset)),
+                          num_workers=n_worker,
+                          collate_fn=collate_fn, pin_memory=pin_memory,
+                          **kwargs)
 
 
 def get_world_process_group(device: torch.device) \
@@ -154,18 +192,80 @@ def get_world_process_group(device: torch.device) \
             return distributed.groups["world_gloo"]
 
 
-def all_reduce(model: nn.Module, group: torch.distributed.group):
-    nparams = list(model.named_parameters())
-    nparams.sort(key=lambda x: x[0])  # type: ignore
-    params = [p.grad if p.grad is not None else torch.zeros_like(p.data)
-              for _, p in nparams]
-    size = distributed.size(group)
-    distributed.call(
-        torch.distributed.all_reduce_coalesced,
-        params, group=group
-    )
-    for p in params:
-        p /= size
+def create_gradient_reducer(model: nn.Module,
+                            group: Optional[torch.distributed.group]) \
+        -> Optional[distributed.GradientReducer]:
+    if group is None:
+        return None
+    return distributed.GradientReducer(model, group)
+
+
+class MicroBatchCollate(object):
+    def __init__(self, collate: Callable[[List[Any]], Any],
+                 batch_size: Optional[int] = None,
+                 max_tokens: Optional[int] = None,
+                 sample_length: Optional[Callable[[Any], int]] = None):
+        # Split the samples of a batch into micro-batches and collate each
+        # of them. Each micro-batch is paired with its ratio in the batch,
+        # which weights its loss so that the accumulated gradient equals the
+        # gradient of the whole batch.
+        assert max_tokens is None or sample_length is not None
+        self.collate = collate
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.sample_length = sample_length
+
+    def __call__(self, samples: List[Any]) -> List[Tuple[float, Any]]:
+        if self.sample_length is not None:
+            lengths = [self.sample_length(sample) for sample in samples]
+        else:
+            lengths = [1] * len(samples)
+        groups = split_by_size(lengths, self.batch_size, self.max_tokens)
+        return [(len(group) / len(samples),
+                 self.collate([samples[i] for i in group]))
+                for group in groups]
+
+
+def accumulate_gradients(model: nn.Module,
+                         micro_batches: List[Tuple[float, Any]],
+                         loss: Callable[[Any], torch.Tensor],
+                         device: torch.device, precision: str,
+                         scaler: torch.cuda.amp.GradScaler,
+                         reducer: Optional[distributed.GradientReducer],
+                         non_blocking: bool = False) -> float:
+    # Run forward and backward for each micro-batch and return the loss of
+    # the whole batch. The gradients are reduced only in the last backward.
+    total = 0.0
+    for i, (weight, batch) in enumerate(micro_batches):
+        with logger.block("to"):
+            batch.to(device=device, non_blocking=non_blocking)
+        with logger.block("forward"):
+            with autocast(device, precision):
+                output = model(batch)
+            bloss = loss(output)
+            if weight != 1.0:
+                bloss = bloss * weight
+        with logger.block("backward"):
+            if reducer is not None and i != len(micro_batches) - 1:
+                sync: Any = reducer.no_sync()
+            else:
+                sync = contextlib.nullcontext()
+            with sync:
+                scaler.scale(bloss).backward()
+        total += bloss.item()
+    return total
+
+
+def load_lengths(workspace_dir: str, dataset: torch.utils.data.Dataset,
+                 sample_length: Callable[[Any], int]) -> List[int]:
+    # The lengths of the samples are computed by the main process once and
+    # cached in the workspace. The workspace belongs to one training config,
+    # so the cache is keyed only by the size of the dataset.
+    @file_cache(os.path.join(workspace_dir, f"lengths-{len(dataset)}.pt"))
+    def compute():
+        logger.info("Compute the lengths of the samples")
+        return [sample_length(dataset[i]) for i in range(len(dataset))]
+    return compute()
 
 
 def save_results(workspace_dir: str, output_dir: str,
@@ -182,6 +282,9 @@ def save_results(workspace_dir: str, output_dir: str,
     if os.path.exists(out_model_dir):
         shutil.rmtree(out_model_dir)
     shutil.copytree(model_dir, out_model_dir)
+    if os.path.exists(score_index_path(model_dir)):
+        shutil.copyfile(score_index_path(model_dir),
+                        score_index_path(out_model_dir))
 
     logger.info("Dump the last model")
     torch.save(model.state_dict(), os.path.join(output_dir, "model.pt"))
@@ -204,18 +307,52 @@ def train_supervised(workspace_dir: str, output_dir: str,
                      maximize: bool = True,
                      threshold: Optional[float] = None,
                      n_dataloader_worker: int = 2,
-                     device: torch.device = torch.device("cpu")) \
+                     device: torch.device = torch.device("cpu"),
+                     pin_memory: Optional[bool] = None,
+                     prefetch_factor: int = 2,
+                     sample_length: Optional[Callable[[Any], int]] = None,
+                     max_tokens: Optional[int] = None,
+                     precision: str = "float32",
+                     micro_batch_size: Optional[int] = None,
+                     micro_batch_max_tokens: Optional[int] = None) \
         -> None:
+    # If sample_length is set, the samples are batched by their lengths.
+    # max_tokens bounds the padded size of each batch.
+    # The forward computation of the model runs with the precision, and the
+    # loss is computed in float32.
+    # If micro_batch_size or micro_batch_max_tokens is set, each batch is
+    # split into micro-batches and their gradients are accumulated before
+    # the optimizer step. The loss has to be the mean over the samples.
     os.makedirs(workspace_dir, exist_ok=True)
+    if pin_memory is None:
+        pin_memory = device.type == "cuda"
 
     logger.info("Prepare model")
     model.to(device)
     model.train()
 
     group = get_world_process_group(device)
-
-    if hasattr(dataset, "__len__"):
-        iter_per_epoch = len(dataset) // batch_size
+    reducer = create_gradient_reducer(model, group)
+    scaler = create_grad_scaler(device, precision)
+
+    lengths = None
+    if sample_length is not None:
+        lengths = load_lengths(workspace_dir, dataset, sample_length)
+    micro_batching = \
+        micro_batch_size is not None or micro_batch_max_tokens is not None
+    if micro_batching:
+        collate = MicroBatchCollate(collate, micro_batch_size,
+                                    micro_batch_max_tokens, sample_length)
+    loader = create_dataloader(dataset, batch_size, n_dataloader_worker,
+                               collate, pin_memory=pin_memory,
+                               prefetch_factor=prefetch_factor,
+                               lengths=lengths, max_tokens=max_tokens)
+
+    if lengths is not None:
+        iter_per_epoch = len(loader.batch_sampler)
+    elif hasattr(dataset, "__len__"):
+        # Each rank reads 1/size of the dataset in an epoch
+        iter_per_epoch = len(dataset) // (batch_size * distributed.size())
     else:
         iter_per_epoch = 1
     n_iter = calc_n_iter(length, iter_per_epoch)
@@ -236,31 +373,30 @@ def train_supervised(workspace_dir: str, output_dir: str,
     logger.info("Start training")
     try:
         while manager.iteration < n_iter:
-            loader = create_dataloader(dataset, batch_size, n_dataloader_worker,
-                                       collate)
-
             for batch in logger.iterable_block("iteration", loader, True):
                 if manager.iteration >= n_iter:
                     break
-                if len(batch.to_dict()) == 0:
+                micro_batches = batch if micro_batching else [(1.0, batch)]
+                micro_batches = [(weight, micro_batch)
+                                 for weight, micro_batch in micro_batches
+                                 if len(micro_batch.to_dict()) != 0]
+                if len(micro_batches) == 0:
                     logger.warning(f"Skip {manager.iteration} th batch")
                     continue
                 with manager.run_iteration():
                     model.train()
-                    with logger.block("to"):
-                        batch.to(device=device)
-                    with logger.block("forward"):
-                        output = model(batch)
-                        bloss = loss(output)
-                    with logger.block("backward"):
-                        model.zero_grad()
-                        bloss.backward()
+                    model.zero_grad()
+                    bloss = accumulate_gradients(
+                        model, micro_batches, loss, device, precision,
+                        scaler, reducer, non_blocking=pin_memory)
                     with logger.block("all-reduce"):
-                        all_reduce(model, group)
+                        if reducer is not None:
+                            reducer.synchronize()
                     with logger.block("optimizer.step"):
-                        optimizer.step()
+                        scaler.step(optimizer)
+                        scaler.update()
 
-                    ppe.reporting.report({"loss": bloss.item()})
+                    ppe.reporting.report({"loss": bloss})
                     logger.dump_elapsed_time_log()
                     if device.type == "cuda":
                         ppe.reporting.report({
@@ -293,8 +429,17 @@ def train_REINFORCE(input_dir: str, workspace_dir: str, output_dir: str,
                     use_pretrained_model: bool = False,
                     use_pretrained_optimizer: bool = False,
                     n_dataloader_worker: int = 2,
-                    device: torch.device = torch.device("cpu")) \
+                    device: torch.device = torch.device("cpu"),
+                    prefetch_factor: int = 2,
+                    precision: str = "float32",
+                    micro_batch_size: Optional[int] = None,
+                    micro_batch_max_tokens: Optional[int] = None,
+                    sample_length: Optional[Callable[[Any], int]] = None) \
         -> None:
+    # If micro_batch_size or micro_batch_max_tokens is set, the rollouts
+    # are split into micro-batches and their gradients are accumulated.
+    # sample_length returns the length of a rollout for
+    # micro_batch_max_tokens.
     os.makedirs(workspace_dir, exist_ok=True)
 
     logger.info("Prepare model")
@@ -302,9 +447,12 @@ def train_REINFORCE(input_dir: str, workspace_dir: str, output_dir: str,
     model.train()
 
     group = get_world_process_group(device)
+    reducer = create_gradient_reducer(model, group)
+    scaler = create_grad_scaler(device, precision)
 
     if hasattr(dataset, "__len__"):
-        iter_per_epoch = len(dataset) // batch_size
+        # Each rank reads 1/size of the dataset in an epoch
+        iter_per_epoch = len(dataset) // (batch_size * distributed.size())
     else:
         iter_per_epoch = 1
     n_iter = calc_n_iter(length, iter_per_epoch)
@@ -336,12 +484,20 @@ def train_REINFORCE(input_dir: str, workspace_dir: str, output_dir: str,
             workspace_dir,
             report_metrics=["reward"])
 
+    if micro_batch_size is not None or micro_batch_max_tokens is not None:
+        collate_rollouts: Callable[[List[Any]], List[Tuple[float, Any]]] = \
+            MicroBatchCollate(collate, micro_batch_size,
+                              micro_batch_max_tokens, sample_length)
+    else:
+        def collate_rollouts(rollouts):
+            return [(1.0, collate(rollouts))]
+
     logger.info("Start training")
+    # The samples are used on CPU by the synthesizer, so they are not pinned
+    loader = create_dataloader(dataset, batch_size, n_dataloader_worker,
+                               lambda x: x, prefetch_factor=prefetch_factor)
     try:
         while manager.iteration < n_iter:
-            loader = create_dataloader(dataset, batch_size, n_dataloader_worker,
-                                       lambda x: x)
-
             for samples in logger.iterable_block("iteration", loader, True):
                 if manager.iteration >= n_iter:
                     break
@@ -376,24 +532,23 @@ def train_REINFORCE(input_dir: str, workspace_dir: str, output_dir: str,
                 with manager.run_iteration():
                     model.train()
                     with logger.block("collate"):
-                        batch2 = collate(rollouts)
-                    with logger.block("to"):
-                        batch2.to(device)
-                    with logger.block("forward"):
-                        model.train()
-                        output = model(batch2)
-                        bloss = loss(output)
-                    with logger.block("backward"):
-                        model.zero_grad()
-                        bloss.backward()
+                        micro_batches = collate_rollouts(rollouts)
+                    model.zero_grad()
+                    bloss = accumulate_gradients(
+                        model, micro_batches, loss, device, precision,
+                        scaler, reducer)
                     with logger.block("all-reduce"):
-                        all_reduce(model, group)
+                        if reducer is not None:
+                            reducer.synchronize()
                     with logger.block("optimizer.step"):
-                        optimizer.step()
+                        scaler.step(optimizer)
+                        scaler.update()
 
-                    ppe.reporting.report({"loss": bloss.item()})
+                    ppe.reporting.report({"loss": bloss})
                     ppe.reporting.report({
-                        "reward": batch2["reward"].float().mean().item()
+                        "reward": torch.stack(
+                            [rollout["reward"] for rollout in rollouts]
+                        ).float().mean().item()
                     })
                     logger.dump_elapsed_time_log()
                     if device.type == "cuda":
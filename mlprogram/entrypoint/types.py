@@ -103,6 +103,10 @@ types = {
         mlprogram.datasets.deepfix.download,
     "mlprogram.datasets.deepfix.Lexer":
         mlprogram.datasets.deepfix.Lexer,
+    "mlprogram.datasets.deepfix.SqliteDataset":
+        mlprogram.datasets.deepfix.SqliteDataset,
+    "mlprogram.datasets.deepfix.SqliteIterableDataset":
+        mlprogram.datasets.deepfix.SqliteIterableDataset,
 
     "mlprogram.metrics.use_environment": mlprogram.metrics.use_environment,
     "mlprogram.metrics.Accuracy": mlprogram.metrics.Accuracy,
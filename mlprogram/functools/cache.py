@@ -5,15 +5,20 @@ from typing import Callable, Generic, TypeVar, cast
 import torch
 
 from mlprogram import distributed, logging
+from mlprogram.utils.data import ListDataset, columnar
 
 V = TypeVar("V")
 logger = logging.Logger(__name__)
 
 
 class FileCache(Generic[V]):
-    def __init__(self, path: str, f: Callable[[], V]):
+    def __init__(self, path: str, f: Callable[[], V], format: str = "torch"):
+        # format="columnar" stores a list of Environment in the memory-mappable
+        # columnar format, and the cached value is loaded as ListDataset.
+        assert format in set(["torch", "columnar"])
         self.path = path
         self.f = f
+        self.format = format
 
     def __call__(self) -> V:
         if distributed.is_main_process():
@@ -22,14 +27,22 @@ class FileCache(Generic[V]):
                 tmpfile = os.path.join(os.path.dirname(self.path), str(uuid.uuid4()))
                 val = self.f()
                 os.makedirs(os.path.dirname(self.path), exist_ok=True)
-                torch.save(val, tmpfile)
+                if self.format == "columnar" and columnar.is_supported(val):
+                    columnar.save(val, tmpfile)
+                else:
+                    torch.save(val, tmpfile)
                 os.rename(tmpfile, self.path)
         distributed.call(torch.distributed.barrier)
         logger.info(f"Cached file found in {self.path}")
+        if self.format == "columnar":
+            if columnar.is_columnar_file(self.path):
+                return cast(V, columnar.ColumnarDataset(self.path))
+            return cast(V, ListDataset(torch.load(self.path)))
         return cast(V, torch.load(self.path))
 
 
-def file_cache(path: str) -> Callable[[Callable[[], V]], FileCache[V]]:
+def file_cache(path: str, format: str = "torch") \
+        -> Callable[[Callable[[], V]], FileCache[V]]:
     def wrapper(f: Callable[[], V]):
-        return FileCache(path, f)
+        return FileCache(path, f, format)
     return wrapper
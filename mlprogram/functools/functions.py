@@ -1,11 +1,26 @@
-import functools
+import os
 import traceback
-from collections import OrderedDict
-from typing import Any, Callable, Generic, List, Optional, TypeVar
+from collections import OrderedDict, deque
+from multiprocessing.pool import AsyncResult, Pool
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sized,
+    Tuple,
+    TypeVar,
+)
 
 from torch import multiprocessing
+from tqdm import tqdm
 
 from mlprogram import logging
+from mlprogram.builtins import Apply, Environment
 
 logger = logging.Logger(__name__)
 
@@ -13,20 +28,38 @@ V0 = TypeVar("V0")
 V1 = TypeVar("V1")
 
 
+def _call(f: Callable, value: Any, owned: bool) -> Tuple[Any, bool]:
+    # owned is True if the value is created in the pipeline and no one else
+    # refers to it. An Apply updates an owned environment in place instead of
+    # cloning it, and its output is always owned.
+    if isinstance(f, Apply) and type(f).forward is Apply.forward and \
+            isinstance(value, Environment):
+        if owned:
+            return f.update(value), True
+        return f(value), True
+    if isinstance(f, (Compose, Sequence)):
+        return f._run(value, owned)
+    return f(value), False
+
+
 class Compose:
     def __init__(self, funcs: OrderedDict):
         self.funcs = funcs
 
     @logger.function_block("Compose.__call__")
     def __call__(self, value: Optional[Any]) -> Optional[Any]:
+        return self._run(value, False)[0]
+
+    def _run(self, value: Optional[Any], owned: bool) \
+            -> Tuple[Optional[Any], bool]:
         if value is None:
-            return None
+            return None, owned
         for key, f in self.funcs.items():
             with logger.block(key):
-                value = f(value)
+                value, owned = _call(f, value, owned)
                 if value is None:
-                    return None
-        return value
+                    return None, owned
+        return value, owned
 
 
 class Sequence:
@@ -35,22 +68,71 @@ class Sequence:
 
     @logger.function_block("Sequence.__call__")
     def __call__(self, values: Any) -> Optional[Any]:
+        return self._run(values, False)[0]
+
+    def _run(self, values: Any, owned: bool) -> Tuple[Optional[Any], bool]:
         value_opt: Optional[Any] = values
         for key, func in self.funcs.items():
             with logger.block(key):
-                value_opt = func(value_opt)
+                value_opt, owned = _call(func, value_opt, owned)
                 if value_opt is None:
-                    return None
-        return value_opt
+                    return None, owned
+        return value_opt, owned
+
+
+_worker_func: Optional[Callable] = None
+
+
+def _initialize_worker(func: Callable) -> None:
+    # The function is sent to each worker once, not with each chunk
+    global _worker_func
+    _worker_func = func
+
+
+def _apply_chunk(chunk: List[Any]) -> List[Any]:
+    assert _worker_func is not None
+    return [Map._apply(_worker_func, value) for value in chunk]
 
 
 class Map(Generic[V0, V1]):
-    def __init__(self, func: Callable[[V0], V1], n_worker: int = 0):
+    def __init__(self, func: Callable[[V0], V1], n_worker: int = 0,
+                 chunksize: int = 1, max_pending_chunks: Optional[int] = None,
+                 progress: bool = False):
+        # The pool is created on the first call. max_pending_chunks bounds the
+        # number of chunks that are submitted but not yet consumed
+        # (default: 2 * n_worker).
         self.func = func
-        if n_worker != 0:
-            self.pool = multiprocessing.Pool(n_worker)
-        else:
-            self.pool = None
+        self.n_worker = n_worker
+        self.chunksize = chunksize
+        self.max_pending_chunks = max_pending_chunks or max(1, 2 * n_worker)
+        self.progress = progress
+        self.pool: Optional[Pool] = None
+        # The process that owns the pool
+        self._pid: Optional[int] = None
+
+    def __getstate__(self):
+        # The pool cannot be pickled, so the other process creates a new one
+        state = dict(self.__dict__)
+        state["pool"] = None
+        state["_pid"] = None
+        return state
+
+    def __enter__(self) -> "Map[V0, V1]":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def close(self) -> None:
+        # A forked process (e.g., a DataLoader worker) does not own the pool
+        if getattr(self, "pool", None) is not None and \
+                self._pid == os.getpid():
+            self.pool.close()
+            self.pool.join()
+        self.pool = None
 
     @staticmethod
     def _apply(func: Callable[[V0], V1], value: V0) -> Optional[V1]:
@@ -60,15 +142,47 @@ class Map(Generic[V0, V1]):
             logger.error(traceback.format_exc())
             return None
 
+    def _chunks(self, values: Iterable[V0]) -> Iterator[List[V0]]:
+        chunk: List[V0] = []
+        for value in values:
+            chunk.append(value)
+            if len(chunk) == self.chunksize:
+                yield chunk
+                chunk = []
+        if len(chunk) != 0:
+            yield chunk
+
+    def imap(self, values: Iterable[V0]) -> Iterator[Optional[V1]]:
+        # Apply the function to the values and yield the results in the order
+        # of the values
+        total = len(values) if isinstance(values, Sized) else None
+        with tqdm(total=total, disable=not self.progress) as progress:
+            if self.n_worker == 0:
+                for v0 in logger.iterable_block("values", values):
+                    yield Map._apply(self.func, v0)
+                    progress.update(1)
+                return
+
+            if self.pool is None or self._pid != os.getpid():
+                self.pool = multiprocessing.Pool(
+                    self.n_worker, initializer=_initialize_worker,
+                    initargs=(self.func,))
+                self._pid = os.getpid()
+            pending: Deque[AsyncResult] = deque()
+            for chunk in self._chunks(values):
+                if len(pending) == self.max_pending_chunks:
+                    results = pending.popleft().get()
+                    yield from results
+                    progress.update(len(results))
+                pending.append(self.pool.apply_async(_apply_chunk, (chunk,)))
+            while len(pending) != 0:
+                results = pending.popleft().get()
+                yield from results
+                progress.update(len(results))
+
     @logger.function_block("Map.__call__")
-    def __call__(self, values: List[V0]) -> List[Optional[V1]]:
-        if self.pool is None:
-            return [Map._apply(self.func, v0)
-                    for v0 in logger.iterable_block("values", values)]
-        else:
-            return list(self.pool.map(
-                functools.partial(Map._apply, self.func),
-                values))
+    def __call__(self, values: Iterable[V0]) -> List[Optional[V1]]:
+        return list(self.imap(values))
 
 
 class Identity(object):
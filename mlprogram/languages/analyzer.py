@@ -7,3 +7,6 @@ Error = TypeVar("Error")
 class Analyzer(Generic[Code, Error]):
     def __call__(self, code: Code) -> List[Error]:
         raise NotImplementedError
+
+    def analyze_all(self, codes: List[Code]) -> List[List[Error]]:
+        return [self(code) for code in codes]
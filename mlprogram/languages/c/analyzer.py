@@ -1,17 +1,122 @@
+import hashlib
+import json
 import os
 import re
 import subprocess
 import tempfile
-from typing import IO, List, cast
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Dict, List, Optional, cast
 
 from mlprogram.languages import Analyzer as BaseAnalyzer
 
+_diagnostic = re.compile(r'<stdin>:\d+:\d+:\s+(error|warning):')
+_summary = re.compile(r'\d+ \w+ generated.')
+_space = re.compile(r'\s*')
+
 
 class Analyzer(BaseAnalyzer[str, str]):
-    def __init__(self, clang_cmd: str = "clang"):
+    def __init__(self, clang_cmd: str = "clang",
+                 n_worker: Optional[int] = None,
+                 cache_dir: Optional[str] = None,
+                 cache_size: int = 100000):
+        # The results are cached by the hash of the code. cache_dir stores
+        # them on disk so that the processes and the runs can share them.
         self.clang_cmd = clang_cmd
+        self.n_worker = n_worker or os.cpu_count() or 1
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self._init()
+
+    def _init(self) -> None:
+        self._lock = threading.Lock()
+        self._cache: OrderedDict = OrderedDict()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def __getstate__(self):
+        # The pool and the lock cannot be pickled
+        state = dict(self.__dict__)
+        del state["_lock"]
+        del state["_cache"]
+        del state["_pool"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init()
 
     def __call__(self, code: str) -> List[str]:
+        return self.analyze_all([code])[0]
+
+    def analyze_all(self, codes: List[str]) -> List[List[str]]:
+        keys = [self._key(code) for code in codes]
+        results: Dict[str, List[str]] = {}
+        misses: Dict[str, str] = {}
+        for key, code in zip(keys, codes):
+            if key in results or key in misses:
+                continue
+            result = self._load(key)
+            if result is None:
+                misses[key] = code
+            else:
+                results[key] = result
+
+        if len(misses) == 1:
+            ((key, code),) = misses.items()
+            results[key] = self._analyze(code)
+        elif len(misses) > 1:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.n_worker)
+                pool = self._pool
+            for key, result in zip(misses.keys(),
+                                   pool.map(self._analyze, misses.values())):
+                results[key] = result
+        for key in misses.keys():
+            self._store(key, results[key])
+
+        return [list(results[key]) for key in keys]
+
+    def _key(self, code: str) -> str:
+        return hashlib.sha256(
+            f"{self.clang_cmd}\0{code}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        assert self.cache_dir is not None
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _load(self, key: str) -> Optional[List[str]]:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return cast(List[str], self._cache[key])
+        if self.cache_dir is None or not os.path.exists(self._path(key)):
+            return None
+        with open(self._path(key)) as file:
+            result = cast(List[str], json.load(file))
+        self._store_memory(key, result)
+        return result
+
+    def _store(self, key: str, result: List[str]) -> None:
+        self._store_memory(key, result)
+        if self.cache_dir is None:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmpfile = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmpfile, "w") as file:
+            json.dump(result, file)
+        os.replace(tmpfile, path)
+
+    def _store_memory(self, key: str, result: List[str]) -> None:
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _analyze(self, code: str) -> List[str]:
         with tempfile.TemporaryDirectory() as tmpdir:
             path = os.path.join(tmpdir, "x.o")
             proc = subprocess.Popen(
@@ -24,20 +129,15 @@ class Analyzer(BaseAnalyzer[str, str]):
         errors = []
         text = ""
         for line in stderr.split("\n"):
-            if re.match(r'<stdin>:\d+:\d+:\s+error:', line):
-                # error
-                if text != "":
-                    errors.append(text)
-                text = line
-            elif re.match(r'<stdin>:\d+:\d+:\s+warning:', line):
-                # warning
+            if _diagnostic.match(line):
+                # error or warning
                 if text != "":
                     errors.append(text)
                 text = line
-            elif re.match(r'\d+ \w+ generated.', line):
+            elif _summary.match(line):
                 # summary of the result
                 continue
-            elif re.match(r'\s*', line):
+            elif _space.match(line):
                 continue
             else:
                 text = text + "\n" + line
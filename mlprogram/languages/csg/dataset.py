@@ -1,10 +1,9 @@
 from typing import Any, Dict, Optional
 
 import numpy as np
-from torch.utils import data
 from torch.utils.data import IterableDataset
 
-from mlprogram import logging
+from mlprogram import distributed, logging
 from mlprogram.builtins import Environment
 from mlprogram.languages.csg import (
     AST,
@@ -15,6 +14,7 @@ from mlprogram.languages.csg import (
     Translation,
     Union,
 )
+from mlprogram.utils.data import get_shard
 
 logger = logging.Logger(__name__)
 
@@ -36,8 +36,11 @@ class Dataset(IterableDataset):
         self.leaf_candidates = ["Circle", "Rectangle"]
         self.branch_candidates = ["Union", "Difference"]
         self.node_candidates = ["Translation", "Rotation"]
-        self.seed = \
-            seed if seed is not None else np.random.randint(0, 2 ** 32 - 1)
+        if seed is None:
+            # All ranks have to use the same seed
+            seed = distributed.broadcast(np.random.randint(0, 2 ** 32 - 1))
+        self.seed = seed
+        self.epoch = 0
 
     def sample_ast(self, rng: np.random.RandomState, n_object: int) -> AST:
         objects: Dict[int, AST] = {}
@@ -83,12 +86,11 @@ class Dataset(IterableDataset):
         return list(objects.values())[0]
 
     def __iter__(self):
-        worker_info = data.get_worker_info()
-        if worker_info is None:
-            seed = self.seed
-        else:
-            seed = (self.seed * (worker_info.id + 1)) % (2 ** 32 - 1)
-        rng = np.random.RandomState(seed)
+        # Each (rank, worker) pair samples from its own random stream, and
+        # the streams are changed at each epoch
+        shard, _ = get_shard()
+        rng = np.random.RandomState([self.seed, self.epoch, shard])
+        self.epoch += 1
 
         class InternalIterator:
             def __init__(self, parent: Dataset):
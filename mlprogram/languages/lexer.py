@@ -11,11 +11,20 @@ class Lexer(Generic[Kind, Value]):
             -> Optional[List[Tuple[int, Token[Kind, Value]]]]:
         raise NotImplementedError
 
+    def tokenize_lines_with_offset(self, lines: List[str]) \
+            -> Optional[List[Tuple[int, Token[Kind, Value]]]]:
+        # Tokenize the text whose lines are terminated by a newline
+        return self.tokenize_with_offset("\n".join(lines) + "\n")
+
     def tokenize(self, text: str) -> Optional[List[Token[Kind, Value]]]:
         tokens = self.tokenize_with_offset(text)
         if tokens is None:
             return None
         return [token for _, token in tokens]
 
+    def tokenize_all(self, texts: List[str]) \
+            -> List[Optional[List[Token[Kind, Value]]]]:
+        return [self.tokenize(text) for text in texts]
+
     def untokenize(self, sequnece: List[Token[Kind, Value]]) -> Optional[str]:
         raise NotImplementedError
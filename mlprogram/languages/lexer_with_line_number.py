@@ -16,21 +16,26 @@ class LexerWithLineNumber(Lexer[Union[Kinds.LineNumber, Kind], Union[int, Value]
     def tokenize_with_offset(self, text: str) \
             -> Optional[List[Tuple[int, Token[Union[Kinds.LineNumber, Kind],
                                               Union[int, Value]]]]]:
-        if not text.endswith("\n"):
-            text = text + "\n"
         lines = text.split("\n")
-        offsets = [0]
-        for line in lines:
-            offsets.append(offsets[-1] + len(line) + 1)
+        if text.endswith("\n"):
+            lines.pop()
+        return self.tokenize_lines(lines)
+
+    def tokenize_lines(self, lines: List[str]) \
+            -> Optional[List[Tuple[int, Token[Union[Kinds.LineNumber, Kind],
+                                              Union[int, Value]]]]]:
         tokens: List[Tuple[int, Token[Union[Kinds.LineNumber, Kind],
                                       Union[int, Value]]]] = []
-        linenum = 0
-        origs = self.lexer.tokenize_with_offset(text)
+        origs = self.lexer.tokenize_lines_with_offset(lines)
         if origs is None:
             return None
+        linenum = 0
+        # The offset of the beginning of the line linenum
+        begin = 0
         for offset, token in origs:
-            if offsets[linenum] <= offset:
+            if begin <= offset:
                 tokens.append((offset, Token(Kinds.LineNumber(), linenum, linenum)))
+                begin += (len(lines[linenum]) if linenum < len(lines) else 0) + 1
                 linenum += 1
             tokens.append((offset,
                            cast(Token[Union[Kinds.LineNumber, Kind], Union[int, Value]],
@@ -10,4 +10,5 @@ from mlprogram.languages.linediff.functions import IsSubtype  # noqa
 from mlprogram.languages.linediff.functions import ToEpisode  # noqa
 from mlprogram.languages.linediff.functions import UpdateInput  # noqa
 from mlprogram.languages.linediff.interpreter import Interpreter  # noqa
+from mlprogram.languages.linediff.interpreter import Program  # noqa
 from mlprogram.languages.linediff.parser import Parser  # noqa
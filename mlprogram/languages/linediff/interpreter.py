@@ -1,5 +1,5 @@
-from functools import lru_cache
-from typing import List, Tuple, cast
+import weakref
+from typing import List, MutableMapping, Optional, Tuple, Union, cast
 
 from mlprogram import logging
 from mlprogram.languages import BatchedState
@@ -9,53 +9,116 @@ from mlprogram.languages.linediff import AST, Delta, Diff, Insert, Remove, Repla
 logger = logging.Logger(__name__)
 
 
-class Interpreter(BaseInterpreter[AST, str, str, str, str]):
-    def eval(self, code: AST, inputs: List[str]) -> List[str]:
-        if isinstance(code, Delta):
-            code = Diff([code])
-        assert isinstance(code, Diff)
-        return self._eval(code, inputs)
+class Program(object):
+    # An immutable program represented as a tuple of lines. Applying a delta
+    # shares the lines with the original program, and the text is
+    # materialized only when it is required.
+    def __init__(self, lines: Tuple[str, ...], text: Optional[str] = None):
+        self.lines = lines
+        self._text = text
+        self._hash: Optional[int] = None
+        # The programs created by applying the deltas to this program. The
+        # values are weakly referenced, so this program does not keep the
+        # derived programs alive.
+        self._applied: MutableMapping[Delta, "Program"] = \
+            weakref.WeakValueDictionary()
+
+    @staticmethod
+    def from_text(text: str) -> "Program":
+        return Program(tuple(text.split("\n")), text)
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "\n".join(self.lines)
+        return self._text
+
+    def apply(self, delta: Delta) -> "Program":
+        program = self._applied.get(delta)
+        if program is None:
+            program = self._apply(delta)
+            self._applied[delta] = program
+        return program
+
+    def _apply(self, delta: Delta) -> "Program":
+        lines = list(self.lines)
+        if isinstance(delta, Insert):
+            lines.insert(delta.line_number, delta.value)
+        elif isinstance(delta, Remove):
+            del lines[delta.line_number]
+        elif isinstance(delta, Replace):
+            if delta.line_number < len(lines):
+                lines[delta.line_number] = delta.value
+            else:
+                logger.warning(f"Input has only {len(lines)} lines, "
+                               f"{delta} cannot be applied")
+                return self
+        else:
+            raise AssertionError(f"invalid type: {type(delta)}")
+        return Program(tuple(lines))
+
+    def __getstate__(self):
+        # The hash of str differs among the processes, and the cache can be
+        # rebuilt, so only the lines are pickled.
+        return {"lines": self.lines}
+
+    def __setstate__(self, state):
+        self.__init__(state["lines"])
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(self.lines)
+        return self._hash
 
-    def create_state(self, inputs: List[str]) -> BatchedState[AST, str, str, str]:
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Program):
+            return False
+        return self is other or self.lines == other.lines
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return f"Program({self.text!r})"
+
+
+Code = Union[str, Program]
+
+
+class Interpreter(BaseInterpreter[AST, Code, Code, str, Program]):
+    def eval(self, code: AST, inputs: List[Code]) -> List[Code]:
+        return [program.text for program in self._eval(code, inputs)]
+
+    def create_state(self, inputs: List[Code]) \
+            -> BatchedState[AST, Code, str, Program]:
         return BatchedState(
             type_environment={},
             environment={},
             history=[],
-            context=inputs,
+            context=[self._to_program(input) for input in inputs],
         )
 
-    def execute(self, code: AST, state: BatchedState[AST, str, str, str]) \
-            -> BatchedState[AST, str, str, str]:
+    def execute(self, code: AST, state: BatchedState[AST, Code, str, Program]) \
+            -> BatchedState[AST, Code, str, Program]:
         inputs = state.context
-        outputs = self.eval(code, inputs)
-        next = cast(BatchedState[AST, str, str, str], state.clone())
+        outputs = self._eval(code, inputs)
+        next = cast(BatchedState[AST, Code, str, Program], state.clone())
         next.history.append(code)
         next.type_environment[code] = code.get_type_name()
-        next.environment = {code: outputs}
+        next.environment = {code: cast(List[Code], outputs)}
         next.context = outputs
         return next
 
-    def _eval(self, diff: Diff, inputs: List[str]) -> List[str]:
-        for delta in diff.deltas:
-            inputs = self._apply(delta, tuple(inputs))
-        return inputs
+    def _eval(self, code: AST, inputs: List[Code]) -> List[Program]:
+        if isinstance(code, Delta):
+            code = Diff([code])
+        assert isinstance(code, Diff)
+        programs = [self._to_program(input) for input in inputs]
+        for delta in code.deltas:
+            programs = [program.apply(delta) for program in programs]
+        return programs
 
-    @lru_cache(maxsize=1000)
-    def _apply(self, delta: Delta, inputs: Tuple[str]) -> List[str]:
-        line_inputs = [list(input.split("\n")) for input in inputs]
-        if isinstance(delta, Insert):
-            for line_input in line_inputs:
-                line_input.insert(delta.line_number, delta.value)
-        elif isinstance(delta, Remove):
-            for line_input in line_inputs:
-                del line_input[delta.line_number]
-        elif isinstance(delta, Replace):
-            for line_input in line_inputs:
-                if delta.line_number < len(line_input):
-                    line_input[delta.line_number] = delta.value
-                else:
-                    logger.warning(f"Input has only {len(line_input)} lines, "
-                                   f"{delta} cannot be applied")
-        else:
-            raise AssertionError(f"invalid type: {type(delta)}")
-        return ["\n".join(line_input) for line_input in line_inputs]
+    def _to_program(self, input: Code) -> Program:
+        if isinstance(input, Program):
+            return input
+        return Program.from_text(input)
@@ -1,4 +1,4 @@
-from typing import Any, Generic, List, Tuple, TypeVar
+from typing import Any, Generic, List, Optional, Tuple, TypeVar
 
 from torch import nn
 
@@ -17,10 +17,18 @@ class ErrorCorrectRate(nn.Module, Generic[Code, Error, Diff, Kind, Context]):
         super().__init__()
         self.analyzer = analyzer
         self.interpreter = interpreter
+        # The metric is called for each candidate of the same test case, so
+        # the number of errors in the original code is reused.
+        self._original: Optional[Tuple[Code, int]] = None
+
+    def _n_orig_error(self, original: Code) -> int:
+        if self._original is None or self._original[0] != original:
+            self._original = (original, len(self.analyzer(original)))
+        return self._original[1]
 
     def forward(self, test_cases: List[Tuple[Code, Any]], actual: Diff) -> float:
         original = test_cases[0][0]
-        n_orig_error = len(self.analyzer(original))
+        n_orig_error = self._n_orig_error(original)
         fixed = self.interpreter.eval(actual, [original])[0]
 
         n_error = len(self.analyzer(fixed))
@@ -33,6 +33,13 @@ class Loss(nn.Module):
             the index of the word copied from the reference).
             The padding value should be -1.
         """
+        # The loss is computed in float32 even if autocast is enabled
+        rule_probs = PaddedSequenceWithMask(rule_probs.data.float(),
+                                            rule_probs.mask)
+        token_probs = PaddedSequenceWithMask(token_probs.data.float(),
+                                             token_probs.mask)
+        reference_probs = PaddedSequenceWithMask(reference_probs.data.float(),
+                                                 reference_probs.mask)
         L_a, B, num_rules = rule_probs.data.shape
         _, _, num_tokens = token_probs.data.shape
         _, _, reference_length = reference_probs.data.shape
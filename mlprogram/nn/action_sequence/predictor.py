@@ -44,14 +44,16 @@ class Predictor(nn.Module):
             (L_ast, N, L_nl) where L_ast is the sequence length,
             N is the batch_size.
         """
+        # The probabilities are computed in float32 even if autocast is
+        # enabled
         rule_pred = self.rule(action_features.data)
-        rule_prob = torch.softmax(rule_pred, dim=2)
+        rule_prob = torch.softmax(rule_pred, dim=2, dtype=torch.float32)
 
         token_pred = self.token(action_features.data)
-        token_prob = torch.softmax(token_pred, dim=2)
+        token_prob = torch.softmax(token_pred, dim=2, dtype=torch.float32)
 
         select = self.select(action_features.data)
-        select_prob = torch.softmax(select, dim=2)
+        select_prob = torch.softmax(select, dim=2, dtype=torch.float32)
 
         reference_log_prob = \
             self.reference(action_features.data, reference_features)
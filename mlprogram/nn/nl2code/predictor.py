@@ -89,14 +89,17 @@ class Predictor(nn.Module):
         rule_pred = self._rule_embed_inv(
             rule_pred,
             self.embedding.previous_actions_embed.rule_embed)  # (L_a, B, num_rules)
-        rule_pred = torch.softmax(rule_pred, dim=2)  # (L_a, B, num_rules)
+        # (L_a, B, num_rules)
+        rule_pred = torch.softmax(rule_pred, dim=2, dtype=torch.float32)
 
         token_pred = torch.tanh(self._l_token(dc))  # (L_a, B, embedding_size)
         token_pred = self._token_embed_inv(
             token_pred,
             self.embedding.previous_actions_embed.token_embed)  # (L_a, B, num_tokens)
         # last index represents reference (copy)
-        token_pred = torch.softmax(token_pred[:, :, :-1], dim=2)  # (L_a, B, num_tokens)
+        # (L_a, B, num_tokens)
+        token_pred = torch.softmax(token_pred[:, :, :-1], dim=2,
+                                   dtype=torch.float32)
 
         # (L_a, B, query_length)
         reference_pred = self._pointer_net(dc, reference_features)
@@ -106,7 +109,8 @@ class Predictor(nn.Module):
             .to(reference_pred.dtype)
 
         generate_pred = torch.softmax(
-            self._l_generate(action_features.data), dim=2)  # (L_a, B, 2)
+            self._l_generate(action_features.data), dim=2,
+            dtype=torch.float32)  # (L_a, B, 2)
         rule, token, reference = \
             torch.split(generate_pred, 1, dim=2)  # (L_a, B, 1)
 
@@ -46,7 +46,8 @@ class PointerNet(nn.Module):
         trans = torch.tanh(key_trans + value_trans)
         mask = value.mask.reshape([1, Lv, N]).expand(
             [Lk, Lv, N])  # (Lk, Lv, N)
-        xi = self.v(trans).reshape([Lk, Lv, N])  # (Lk, Lv, N)
+        # Normalize in float32 even if autocast is enabled
+        xi = self.v(trans).reshape([Lk, Lv, N]).float()  # (Lk, Lv, N)
         exp_xi_sum = torch.sum(torch.exp(xi) * mask.to(xi.dtype),
                                dim=1, keepdim=True)
         exp_xi_sum = torch.where(exp_xi_sum == 0, torch.ones_like(exp_xi_sum),
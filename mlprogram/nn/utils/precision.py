@@ -0,0 +1,36 @@
+import contextlib
+from typing import ContextManager
+
+import torch
+
+from mlprogram import logging
+
+logger = logging.Logger(__name__)
+
+_dtypes = {
+    "bfloat16": torch.bfloat16,
+    "float16": torch.float16,
+}
+
+
+def autocast(device: torch.device, precision: str = "float32") \
+        -> ContextManager:
+    # Run the enclosed operations in the reduced precision. precision is
+    # one of "float32" (autocast is disabled), "bfloat16", and "float16".
+    # CPU supports only bfloat16, so float16 falls back to bfloat16 on CPU.
+    if precision == "float32":
+        return contextlib.nullcontext()
+    assert precision in _dtypes, f"invalid precision: {precision}"
+    dtype = _dtypes[precision]
+    if device.type == "cpu" and dtype == torch.float16:
+        logger.warning("CPU does not support float16, use bfloat16")
+        dtype = torch.bfloat16
+    return torch.autocast(device.type, dtype=dtype)
+
+
+def create_grad_scaler(device: torch.device, precision: str = "float32") \
+        -> torch.cuda.amp.GradScaler:
+    # Only float16 needs the loss scaling because its exponent is narrow.
+    # The returned scaler does nothing in the other cases.
+    return torch.cuda.amp.GradScaler(
+        enabled=device.type == "cuda" and precision == "float16")
@@ -0,0 +1,19 @@
+import torch
+from torch import nn
+
+from mlprogram import logging
+
+logger = logging.Logger(__name__)
+
+
+def quantize_dynamic_(model: nn.Module,
+                      dtype: torch.dtype = torch.qint8) -> nn.Module:
+    # Replace the Linear and LSTM layers of the model with the dynamically
+    # quantized ones in place. The weights are quantized ahead of time and
+    # the activations are quantized at each call, so only the inference on
+    # CPU is supported. The model object is kept, so the synthesizers that
+    # hold the model use the quantized layers without any change.
+    model.eval()
+    torch.quantization.quantize_dynamic(
+        model, {nn.Linear, nn.LSTM, nn.LSTMCell}, dtype=dtype, inplace=True)
+    return model
@@ -17,6 +17,10 @@ class PaddedSequenceWithMask:
     def cuda(self):
         return PaddedSequenceWithMask(self.data.cuda(), self.mask.cuda())
 
+    def pin_memory(self):
+        return PaddedSequenceWithMask(self.data.pin_memory(),
+                                      self.mask.pin_memory())
+
 
 def pad_sequence(sequences: List[torch.FloatTensor],
                  padding_value: float = 0.0) -> PaddedSequenceWithMask:
@@ -1,7 +1,10 @@
+import json
 import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List
 
 import torch
-from pytorch_pfn_extras import training
+from pytorch_pfn_extras import training, writing
 from pytorch_pfn_extras.training import extension
 from torch import nn
 
@@ -11,6 +14,56 @@ from mlprogram.collections import TopKElement
 logger = logging.Logger(__name__)
 
 
+def score_index_path(model_dir: str) -> str:
+    # The scores of the saved models are stored next to model_dir so that
+    # model_dir contains only the model files.
+    return os.path.normpath(model_dir) + "_scores.json"
+
+
+def load_scores(model_dir: str) -> Dict[str, float]:
+    # Return the scores of the model files in model_dir. The files missing
+    # from the score index (e.g., the ones saved by the old versions) are
+    # loaded to read their scores.
+    index_path = score_index_path(model_dir)
+    index: Dict[str, float] = {}
+    if os.path.exists(index_path):
+        with open(index_path) as file:
+            index = json.load(file)
+    scores = {}
+    for name in os.listdir(model_dir):
+        if name.startswith("."):
+            # A temporary file
+            continue
+        if name in index:
+            scores[name] = index[name]
+        else:
+            logger.debug(f"Load {name} to read its score")
+            path = os.path.join(model_dir, name)
+            scores[name] = torch.load(path, map_location="cpu")["score"]
+    return scores
+
+
+def _to_cpu(value: Any) -> Any:
+    if isinstance(value, torch.Tensor):
+        return value.detach().to("cpu", copy=True)
+    if isinstance(value, dict):
+        return {k: _to_cpu(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_cpu(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(_to_cpu(v) for v in value)
+    return value
+
+
+class CPUThreadWriter(writing.ThreadWriter):
+    # Copy the tensors to CPU on the caller thread and serialize them on a
+    # background thread. The copy keeps the snapshot consistent while the
+    # training updates the parameters.
+    def __call__(self, filename: str, out_dir: str, target: Any,
+                 **kwargs: Any) -> None:
+        super().__call__(filename, out_dir, _to_cpu(target), **kwargs)
+
+
 class SaveTopKModel(extension.Extension):
     def __init__(self, model_dir: str, n_model: int, key: str,
                  model: nn.Module, maximize: bool = True):
@@ -18,16 +71,30 @@ class SaveTopKModel(extension.Extension):
         os.makedirs(model_dir, exist_ok=True)
         self.key = key
         self.maximize = maximize
-        self.models = TopKElement(n_model, lambda path: os.remove(path))
+        self.n_model = n_model
+        self.models = TopKElement(n_model, self._remove)
         self.model_dir = model_dir
         self.model = model
+        # A single thread keeps the order of the file operations
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.futures: List[Future] = []
 
         logger.info("Load saved top-k models")
-        for model in os.listdir(model_dir):
-            logger.debug(f"Load {model} and add to top-k model")
-            path = os.path.join(model_dir, model)
-            score = torch.load(path, map_location="cpu")["score"]
-            self.models.add(score, path)
+        for name, score in load_scores(model_dir).items():
+            logger.debug(f"Add {name} to top-k model")
+            self.models.add(score, os.path.join(model_dir, name))
+
+    def _submit(self, f, *args) -> None:
+        self.futures = [future for future in self.futures
+                        if not future.done()]
+        self.futures.append(self.executor.submit(f, *args))
+
+    def _remove(self, path: str) -> None:
+        self._submit(os.remove, path)
+
+    def _is_top_k(self, score: float) -> bool:
+        elements = self.models.elements
+        return len(elements) < self.n_model or score >= elements[-1][0]
 
     def __call__(self, manager: training.ExtensionsManager) -> None:
         if self.key in manager.observation:
@@ -36,11 +103,47 @@ class SaveTopKModel(extension.Extension):
 
             if not self.maximize:
                 score = -score
+            if not self._is_top_k(score):
+                return
             path = os.path.join(self.model_dir,
                                 f"model_{manager.iteration}.pt")
-            result = {"score": score, "model": self.model.state_dict()}
-            torch.save(result, path)
+            result = {"score": score, "model": _to_cpu(self.model.state_dict())}
+            self._submit(_save, result, path)
             self.models.add(score, path)
+            scores = {os.path.basename(path): score
+                      for score, path in self.models.elements}
+            self._submit(_save_json, scores,
+                         score_index_path(self.model_dir))
+
+    def wait(self) -> None:
+        # Wait for the pending file operations
+        futures = self.futures
+        self.futures = []
+        for future in futures:
+            future.result()
+
+    def finalize(self) -> None:
+        self.wait()
+
+    def on_error(self, manager: training.ExtensionsManager,
+                 exc: Exception, tb: Any) -> None:
+        self.wait()
+
+
+def _save(value: Any, path: str) -> None:
+    # Write to a temporary file so that a partially written model is not
+    # loaded
+    tmp_path = os.path.join(os.path.dirname(path),
+                            f".{os.path.basename(path)}.tmp")
+    torch.save(value, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _save_json(value: Any, path: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(value, file)
+    os.replace(tmp_path, path)
 
 
 class StopByThreshold(extension.Extension):
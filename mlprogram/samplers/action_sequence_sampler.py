@@ -28,8 +28,10 @@ from mlprogram.actions import (
 )
 from mlprogram.builtins import Environment
 from mlprogram.collections import TopKElement
+from mlprogram.deadline import is_expired
 from mlprogram.encoders import ActionSequenceEncoder
 from mlprogram.languages import AST, Node, Root, Token
+from mlprogram.nn.utils.precision import autocast
 from mlprogram.nn.utils.rnn import PaddedSequenceWithMask
 from mlprogram.samplers.sampler import DuplicatedSamplerState, Sampler, SamplerState
 from mlprogram.utils.data import Collate
@@ -82,7 +84,8 @@ class ActionSequenceSampler(Sampler[Environment, AST, Environment],
                  collate: Collate,
                  module: torch.nn.Module,
                  eps: float = 1e-5,
-                 rng: Optional[np.random.RandomState] = None
+                 rng: Optional[np.random.RandomState] = None,
+                 precision: str = "float32"
                  ):
         self.encoder = encoder
         self.is_subtype = is_subtype
@@ -91,8 +94,11 @@ class ActionSequenceSampler(Sampler[Environment, AST, Environment],
         self.collate = collate
         self.module = module
         self.eps = eps
+        self.precision = precision
         self.rng = \
             rng or np.random.RandomState(np.random.randint(0, 2 << 32 - 1))
+        self._statistics = {"n_instantiated_action_sequence": 0,
+                            "n_instantiated_action": 0}
 
         self.token_kind_to_idx: Dict[str, List[int]] = {}
         for token in self.encoder._token_encoder.vocab:
@@ -113,14 +119,37 @@ class ActionSequenceSampler(Sampler[Environment, AST, Environment],
                     self.encoder._rule_encoder.encode(rule).item()
                 )
 
+    def _device(self) -> torch.device:
+        params = list(self.module.parameters())
+        if len(params) != 0:
+            return params[0].device
+        return torch.device("cpu")
+
     def _to(self, x: Environment) -> Environment:
         params = list(self.module.parameters())
         if len(params) != 0:
             x.to(params[0].device)
         return x
 
+    def _instantiate(self, state: DuplicatedSamplerState[Environment]) \
+            -> None:
+        action_sequence = state.state.state["action_sequence"]()
+        state.state.state["action_sequence"] = action_sequence
+        self._statistics["n_instantiated_action_sequence"] += 1
+        self._statistics["n_instantiated_action"] += \
+            len(action_sequence.action_sequence)
+
+    def statistics(self) -> Dict[str, int]:
+        # The number of the action sequences instantiated in the last search
+        # and the total length of them. The instantiated action sequences
+        # share their actions, so this counts the references to the actions,
+        # not the copies of them.
+        return dict(self._statistics)
+
     @logger.function_block("initialize")
     def initialize(self, input: Input) -> Environment:
+        self._statistics = {"n_instantiated_action_sequence": 0,
+                            "n_instantiated_action": 0}
         self.module.encoder.eval()
         state_list = self.transform_input(input)
         state_tensor = self.collate.collate([state_list])
@@ -164,7 +193,8 @@ class ActionSequenceSampler(Sampler[Environment, AST, Environment],
         states_tensor = self.collate.collate(state_list)
         states_tensor = self._to(states_tensor)
 
-        with torch.no_grad(), logger.block("decode_state"):
+        with torch.no_grad(), logger.block("decode_state"), \
+                autocast(self._device(), self.precision):
             next_states = self.module.decoder(states_tensor)
 
         rule_pred = next_states["rule_probs"].data.cpu().reshape(N, -1)
@@ -344,49 +374,63 @@ class ActionSequenceSampler(Sampler[Environment, AST, Environment],
                         SamplerState(state.score + lp, next_state),
                         n)
 
+    def _enumerate_all_samples(
+        self, states: List[SamplerState[Environment]]) \
+            -> List[List[DuplicatedSamplerState[Environment]]]:
+        # The i-th element contains the samples generated from states[i].
+        # The action sequences of the samples are not instantiated yet.
+        assert all([len(state.state._supervisions) == 0 for state in states])
+
+        retval: List[List[DuplicatedSamplerState[Environment]]] = \
+            [[] for _ in states]
+        idxs = [
+            i for i, state in enumerate(states)
+            if state.state["action_sequence"].head is not None]
+        if len(idxs) == 0:
+            return retval
+
+        self.module.eval()
+        rule_pred, token_pred, reference_pred, next_states = \
+            self.batch_infer([states[i] for i in idxs])
+        for j, i in logger.iterable_block(
+                "enumerate_samples_per_state", enumerate(idxs)):
+            if is_expired():
+                logger.debug("timeout")
+                break
+            retval[i] = list(self.enumerate_samples_per_state(
+                rule_pred[j], token_pred[j], reference_pred[j],
+                next_states[j], states[i],
+                enumeration=Enumeration.Random,
+                k=None))
+        return retval
+
     def all_samples(
         self, states: List[SamplerState[Environment]], sorted: bool = True) \
             -> Generator[DuplicatedSamplerState[Environment], None, None]:
-        assert all([len(state.state._supervisions) == 0 for state in states])
-
         with logger.block("all_samples"):
-            states = [
-                state for state in states
-                if state.state["action_sequence"].head is not None]
-            if len(states) == 0:
-                return
-
-            self.module.eval()
-            rule_pred, token_pred, reference_pred, next_states = \
-                self.batch_infer(states)
+            samples = [
+                state
+                for samples in self._enumerate_all_samples(states)
+                for state in samples
+            ]
             if sorted:
-                samples = []
-                for i, state in logger.iterable_block(
-                        "enumerate_samples_per_state", enumerate(states)):
-                    for state in self.enumerate_samples_per_state(
-                            rule_pred[i], token_pred[i], reference_pred[i],
-                            next_states[i], state,
-                            enumeration=Enumeration.Random,
-                            k=None):
-                        samples.append(state)
-
                 with logger.block("sort_among_all_states"):
                     samples.sort(key=lambda x: -x.state.score)  # type: ignore
-                    for state in samples:
-                        state.state.state["action_sequence"] = \
-                            state.state.state["action_sequence"]()
-                        yield state
-            else:
-                for i, state in logger.iterable_block(
-                        "enumerate_samples_per_state", enumerate(states)):
-                    for state in self.enumerate_samples_per_state(
-                            rule_pred[i], token_pred[i], reference_pred[i],
-                            next_states[i], state,
-                            enumeration=Enumeration.Random,
-                            k=None):
-                        state.state.state["action_sequence"] = \
-                            state.state.state["action_sequence"]()
-                        yield state
+            for state in samples:
+                self._instantiate(state)
+                yield state
+
+    def all_samples_per_state(
+        self, states: List[SamplerState[Environment]], sorted: bool = True) \
+            -> List[List[DuplicatedSamplerState[Environment]]]:
+        with logger.block("all_samples_per_state"):
+            retval = self._enumerate_all_samples(states)
+            for samples in retval:
+                if sorted:
+                    samples.sort(key=lambda x: -x.state.score)
+                for state in samples:
+                    self._instantiate(state)
+            return retval
 
     def top_k_samples(
         self, states: List[SamplerState[Environment]], k: int) \
@@ -406,6 +450,9 @@ class ActionSequenceSampler(Sampler[Environment, AST, Environment],
             topk = TopKElement(k)
             for i, state in logger.iterable_block("find_top_k_per_state",
                                                   enumerate(states)):
+                if is_expired():
+                    logger.debug("timeout")
+                    break
                 for state in self.enumerate_samples_per_state(
                         rule_pred[i], token_pred[i], reference_pred[i],
                         next_states[i], state, enumeration=Enumeration.Top,
@@ -415,8 +462,7 @@ class ActionSequenceSampler(Sampler[Environment, AST, Environment],
             # Instantiate top-k hypothesis
             with logger.block("find_top_k_among_all_states"):
                 for score, state in topk.elements:
-                    state.state.state["action_sequence"] = \
-                        state.state.state["action_sequence"]()
+                    self._instantiate(state)
                     yield state
 
     def batch_k_samples(
@@ -441,8 +487,10 @@ class ActionSequenceSampler(Sampler[Environment, AST, Environment],
 
             for r, t, c, ns, s, k in zip(rule_pred, token_pred, reference_pred,
                                          next_states, states, ks):
+                if is_expired():
+                    logger.debug("timeout")
+                    return
                 for state in self.enumerate_samples_per_state(
                         r, t, c, ns, s, Enumeration.Multinomial, k=k):
-                    state.state.state["action_sequence"] = \
-                        state.state.state["action_sequence"]()
+                    self._instantiate(state)
                     yield state
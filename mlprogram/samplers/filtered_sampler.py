@@ -1,4 +1,4 @@
-from typing import Callable, Generator, Generic, List, Optional, Tuple, TypeVar
+from typing import Callable, Dict, Generator, Generic, List, Optional, Tuple, TypeVar
 
 from mlprogram import logging
 from mlprogram.samplers.sampler import DuplicatedSamplerState, Sampler, SamplerState
@@ -45,3 +45,6 @@ class FilteredSampler(Generic[Input, Output, State]):
                         ks: List[int]) \
             -> Generator[DuplicatedSamplerState[State], None, None]:
         return self.sampler.batch_k_samples(states, ks)
+
+    def statistics(self) -> Dict[str, int]:
+        return self.sampler.statistics()
@@ -1,5 +1,15 @@
 from dataclasses import dataclass
-from typing import Any, Callable, Generator, Generic, List, Optional, Tuple, TypeVar
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Generic,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
 Input = TypeVar("Input")
 Output = TypeVar("Output")
@@ -10,6 +20,7 @@ State = TypeVar("State")
 
 @dataclass
 class SamplerState(Generic[State]):
+    __slots__ = ["score", "state"]
     score: float
     state: State
 
@@ -24,6 +35,7 @@ class SamplerState(Generic[State]):
 
 @dataclass
 class DuplicatedSamplerState(Generic[State]):
+    __slots__ = ["state", "num"]
     state: SamplerState[State]
     num: int
 
@@ -49,6 +61,12 @@ class Sampler(Generic[Input, Output, State]):
             -> Generator[DuplicatedSamplerState[State], None, None]:
         raise NotImplementedError
 
+    def all_samples_per_state(self, states: List[SamplerState[State]],
+                              sorted: bool = True) \
+            -> List[List[DuplicatedSamplerState[State]]]:
+        # The i-th element contains the samples generated from states[i]
+        return [list(self.all_samples([state], sorted)) for state in states]
+
     def top_k_samples(self, states: List[SamplerState[State]], k: int) \
             -> Generator[DuplicatedSamplerState[State], None, None]:
         raise NotImplementedError
@@ -58,6 +76,10 @@ class Sampler(Generic[Input, Output, State]):
             -> Generator[DuplicatedSamplerState[State], None, None]:
         raise NotImplementedError
 
+    def statistics(self) -> Dict[str, int]:
+        # The statistics of the last search
+        return {}
+
 
 class TransformedSampler(Sampler[Input, Output2, State]):
     def __init__(self, sampler: Sampler[Input, Output1, State],
@@ -86,6 +108,11 @@ class TransformedSampler(Sampler[Input, Output2, State]):
             -> Generator[DuplicatedSamplerState[State], None, None]:
         return self.sampler.all_samples(states, sorted)
 
+    def all_samples_per_state(self, states: List[SamplerState[State]],
+                              sorted: bool = True) \
+            -> List[List[DuplicatedSamplerState[State]]]:
+        return self.sampler.all_samples_per_state(states, sorted)
+
     def top_k_samples(self, states: List[SamplerState[State]], k: int) \
             -> Generator[DuplicatedSamplerState[State], None, None]:
         return self.sampler.top_k_samples(states, k)
@@ -95,6 +122,9 @@ class TransformedSampler(Sampler[Input, Output2, State]):
             -> Generator[DuplicatedSamplerState[State], None, None]:
         return self.sampler.batch_k_samples(states, ks)
 
+    def statistics(self) -> Dict[str, int]:
+        return self.sampler.statistics()
+
 
 def transform(sampler: Sampler[Input, Output1, State],
               transform: Callable[[Output1], Optional[Output2]]) \
@@ -1,9 +1,20 @@
-from typing import Callable, Generator, Generic, List, Optional, Tuple, TypeVar
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Generic,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
 import torch
 
 from mlprogram import logging
 from mlprogram.builtins import Environment
+from mlprogram.deadline import is_expired
 from mlprogram.samplers import DuplicatedSamplerState, Sampler, SamplerState
 from mlprogram.utils.data import Collate
 
@@ -12,30 +23,64 @@ logger = logging.Logger(__name__)
 Input = TypeVar("Input")
 Output = TypeVar("Output")
 State = TypeVar("State")
+Key = TypeVar("Key")
 
 
 class SamplerWithValueNetwork(Sampler[Input, Output, State],
-                              Generic[Input, Output, State]):
+                              Generic[Input, Output, State, Key]):
     def __init__(self,
                  sampler: Sampler[Input, Output, State],
                  transform: Callable[[State], Environment],
                  collate: Collate,
                  value_network: torch.nn.Module,
-                 batch_size: int = 1):
+                 batch_size: int = 1,
+                 to_key: Optional[Callable[[State], Key]] = None):
         self.sampler = sampler
         self.transform = transform
         self.collate = collate
         self.value_network = value_network
         self.batch_size = batch_size
+        self.to_key = to_key
+        # The values of the states that are already evaluated.
+        # This cache is cleared when a new input is given.
+        self.values: Dict[Key, float] = {}
 
     @logger.function_block("initialize")
     def initialize(self, input: Input) -> State:
+        self.values = {}
         return self.sampler.initialize(input)
 
     def create_output(self, input, state: State) \
             -> Optional[Tuple[Output, bool]]:
         return self.sampler.create_output(input, state)
 
+    def calculate_values(self, states: List[State]) -> List[float]:
+        if self.to_key is None:
+            keys: List[Any] = list(range(len(states)))
+            cache: Dict[Any, float] = {}
+        else:
+            keys = [self.to_key(state) for state in states]
+            cache = self.values
+
+        # Evaluate each missing key only once
+        indexes: Dict[Any, int] = {}
+        for i, key in enumerate(keys):
+            if key not in cache:
+                indexes.setdefault(key, i)
+        if len(indexes) != 0:
+            inputs = [self.transform(states[i]) for i in indexes.values()]
+            values = []
+            with torch.no_grad(), logger.block("calculate_value"):
+                for offset in range(0, len(inputs), self.batch_size):
+                    value = self.value_network(self.collate.collate(
+                        inputs[offset:offset + self.batch_size]))
+                    values.append(value.reshape(-1))
+                # Transfer all values at once
+                list_values = torch.cat(values).tolist()
+            for key, value in zip(indexes.keys(), list_values):
+                cache[key] = value
+        return [cache[key] for key in keys]
+
     def batch_k_samples(self, states: List[SamplerState[State]],
                         ks: List[int]) \
             -> Generator[DuplicatedSamplerState[State],
@@ -43,26 +88,18 @@ class SamplerWithValueNetwork(Sampler[Input, Output, State],
         with logger.block("batch_k_samples"):
             self.value_network.eval()
             outputs = []
-            value_network_inputs = []
             for state in self.sampler.batch_k_samples(states, ks):
-                input = self.transform(state.state.state)
+                if is_expired():
+                    logger.debug("timeout")
+                    break
                 outputs.append(state)
-                value_network_inputs.append(input)
-                if len(outputs) == self.batch_size:
-                    with torch.no_grad(), logger.block("calculate_value"):
-                        value = self.value_network(
-                            self.collate.collate(value_network_inputs))
-                    for value, output in zip(value, outputs):
-                        yield DuplicatedSamplerState(
-                            SamplerState(value.item(), output.state.state),
-                            output.num)
-                    outputs = []
-                    value_network_inputs = []
-            if len(outputs) != 0:
-                with torch.no_grad(), logger.block("calculate_value"):
-                    value = self.value_network(
-                        self.collate.collate(value_network_inputs))
-                for value, output in zip(value, outputs):
-                    yield DuplicatedSamplerState(
-                        SamplerState(value.item(), output.state.state),
-                        output.num)
+            values = \
+                self.calculate_values([output.state.state
+                                       for output in outputs])
+            for value, output in zip(values, outputs):
+                yield DuplicatedSamplerState(
+                    SamplerState(value, output.state.state),
+                    output.num)
+
+    def statistics(self) -> Dict[str, int]:
+        return self.sampler.statistics()
@@ -1,4 +1,5 @@
-from typing import Callable, Generator, Generic, List, Optional, Tuple, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Generator, Generic, List, Optional, Tuple, TypeVar
 
 import numpy as np
 import torch
@@ -6,9 +7,10 @@ from torch import nn
 
 from mlprogram import logging
 from mlprogram.builtins import Environment
-from mlprogram.languages import Expander, Interpreter, Token
+from mlprogram.deadline import is_expired
+from mlprogram.languages import BatchedState, Expander, Interpreter, Token
 from mlprogram.samplers import DuplicatedSamplerState, Sampler, SamplerState
-from mlprogram.synthesizers.synthesizer import Synthesizer
+from mlprogram.synthesizers.synthesizer import Result, Synthesizer
 from mlprogram.utils.data import Collate
 
 logger = logging.Logger(__name__)
@@ -29,7 +31,8 @@ class SequentialProgramSampler(Sampler[Input, Code, Environment],
                  encoder: nn.Module,
                  expander: Expander[Code],
                  interpreter: Interpreter[Code, Input, Value, Kind, Context],
-                 rng: Optional[np.random.RandomState] = None):
+                 rng: Optional[np.random.RandomState] = None,
+                 n_worker: int = 0):
         self.synthesizer = synthesizer
         self.transform_input = transform_input
         self.collate = collate
@@ -38,6 +41,7 @@ class SequentialProgramSampler(Sampler[Input, Code, Environment],
         self.interpreter = interpreter
         self.rng = \
             rng or np.random.RandomState(np.random.randint(0, 2 << 32 - 1))
+        self.n_worker = n_worker
 
     def _to(self, x: Environment) -> Environment:
         params = list(self.encoder.parameters())
@@ -70,6 +74,35 @@ class SequentialProgramSampler(Sampler[Input, Code, Environment],
         )
         return code, False
 
+    def _create_state(self, original: Environment,
+                      interpreter_state: BatchedState[Code, Value, Kind,
+                                                      Context]) \
+            -> Environment:
+        new_state = original.clone()
+        # Clear reference and variables
+        new_state["reference"] = []
+        new_state["variables"] = []
+        new_state["interpreter_state"] = interpreter_state
+        for code in interpreter_state.environment:
+            new_state["reference"].append(
+                Token[Kind, Code](
+                    interpreter_state.type_environment[code],
+                    code, code)
+            )
+            new_state["variables"].append(
+                interpreter_state.environment[code]
+            )
+        return new_state
+
+    def _synthesize(self, state: SamplerState[Environment], k: int) \
+            -> Generator[Result[Code], None, None]:
+        cnt = 0
+        for result in self.synthesizer(state.state, n_required_output=k):
+            yield result
+            cnt += 1
+            if cnt == k:
+                break
+
     def batch_k_samples(self, states: List[SamplerState[Environment]],
                         ks: List[int]) \
             -> Generator[DuplicatedSamplerState[Environment],
@@ -79,36 +112,55 @@ class SequentialProgramSampler(Sampler[Input, Code, Environment],
         originals = [state.state.clone() for state in states]
 
         with logger.block("batch_k_samples"):
-            for original, state, k in zip(originals, states, ks):
-                if k == 0:
-                    continue
-
-                cnt = 0
-                for result in self.synthesizer(state.state,
-                                               n_required_output=k):
-                    new_state = original.clone()
-                    # Clear reference and variables
-                    new_state["reference"] = []
-                    new_state["variables"] = []
-                    new_state["interpreter_state"] = \
-                        self.interpreter.execute(
-                            result.output,
-                            state.state["interpreter_state"]
-                    )
-                    for code in \
-                            new_state["interpreter_state"].environment:
-                        new_state["reference"].append(
-                            Token[Kind, Code](
-                                new_state["interpreter_state"]
-                                .type_environment[code],
-                                code, code)
-                        )
-                        new_state["variables"].append(
-                            new_state["interpreter_state"]
-                            .environment[code]
-                        )
-                    yield DuplicatedSamplerState(
-                        SamplerState(result.score, new_state), result.num)
-                    cnt += 1
-                    if cnt == k:
-                        break
+            if self.n_worker == 0:
+                for original, state, k in zip(originals, states, ks):
+                    if is_expired():
+                        logger.debug("timeout")
+                        return
+                    if k == 0:
+                        continue
+
+                    for result in self._synthesize(state, k):
+                        if is_expired():
+                            # Skip the execution of the interpreter
+                            logger.debug("timeout")
+                            return
+                        new_state = self._create_state(
+                            original,
+                            self.interpreter.execute(
+                                result.output,
+                                state.state["interpreter_state"]))
+                        yield DuplicatedSamplerState(
+                            SamplerState(result.score, new_state),
+                            result.num)
+            else:
+                # The inner synthesizers run sequentially because they may
+                # share the random number generator. Only the interpreter
+                # runs in parallel.
+                with ThreadPoolExecutor(self.n_worker) as executor:
+                    futures = []
+                    for original, state, k in zip(originals, states, ks):
+                        if is_expired():
+                            logger.debug("timeout")
+                            break
+                        if k == 0:
+                            continue
+                        for result in self._synthesize(state, k):
+                            if is_expired():
+                                logger.debug("timeout")
+                                break
+                            futures.append((
+                                original, result,
+                                executor.submit(
+                                    self.interpreter.execute,
+                                    result.output,
+                                    state.state["interpreter_state"])))
+                    for original, result, future in futures:
+                        new_state = \
+                            self._create_state(original, future.result())
+                        yield DuplicatedSamplerState(
+                            SamplerState(result.score, new_state),
+                            result.num)
+
+    def statistics(self) -> Dict[str, int]:
+        return self.synthesizer.statistics()
@@ -1,6 +1,7 @@
-from typing import Generator, Generic, Optional, TypeVar
+from typing import Dict, Generator, Generic, Optional, TypeVar
 
 from mlprogram import logging
+from mlprogram.deadline import is_expired
 from mlprogram.samplers import Sampler, SamplerState
 from mlprogram.synthesizers.synthesizer import Result, Synthesizer
 
@@ -31,6 +32,9 @@ class BeamSearch(Synthesizer[Input, Output], Generic[Input, Output, State]):
             while steps < self.max_step_size and k > 0:
                 if len(states) == 0:
                     return
+                if is_expired():
+                    logger.debug("timeout")
+                    return
                 next_states = []
 
                 for next_state in self.sampler.top_k_samples(states, k):
@@ -51,3 +55,6 @@ class BeamSearch(Synthesizer[Input, Output], Generic[Input, Output, State]):
                         next_states.append(next_state.state)
                 states = next_states
                 steps += 1
+
+    def statistics(self) -> Dict[str, int]:
+        return self.sampler.statistics()
@@ -1,6 +1,7 @@
-from typing import Generator, Generic, Optional, TypeVar
+from typing import Callable, Dict, Generator, Generic, List, Optional, Tuple, TypeVar
 
 from mlprogram import logging
+from mlprogram.deadline import is_expired
 from mlprogram.samplers import DuplicatedSamplerState, Sampler, SamplerState
 from mlprogram.synthesizers.synthesizer import Result, Synthesizer
 
@@ -12,33 +13,114 @@ State = TypeVar("State")
 Key = TypeVar("Key")
 
 
+class _Node(Generic[Output, State]):
+    def __init__(self, state: DuplicatedSamplerState[State], depth: int):
+        self.state = state
+        self.depth = depth
+        self.is_visited = False
+        self.output_opt: Optional[Tuple[Output, bool]] = None
+        self.children: Optional[List["_Node[Output, State]"]] = None
+        # The index of the next child to be visited
+        self.index = 0
+
+
 class DFS(Synthesizer[Input, Output], Generic[Input, Output, State, Key]):
-    def __init__(self, sampler: Sampler[Input, Output, State]):
+    def __init__(self, sampler: Sampler[Input, Output, State],
+                 max_step_size: Optional[int] = None,
+                 batch_size: int = 1,
+                 prune: Optional[Callable[[Input, SamplerState[State]],
+                                          bool]] = None):
         self.sampler = sampler
+        self.max_step_size = max_step_size
+        self.batch_size = batch_size
+        self.prune = prune
 
-    def _search(self, input: Input, state: DuplicatedSamplerState[State]) \
-            -> Generator[Result[Output], None, None]:
-        if state.num == 0:
-            return
-
-        for next_state in self.sampler.all_samples([state.state], sorted=True):
+    def _output(self, input: Input, node: _Node[Output, State]) \
+            -> Optional[Tuple[Output, bool]]:
+        if not node.is_visited:
+            node.is_visited = True
             output_opt = \
-                self.sampler.create_output(input, next_state.state.state)
-            if output_opt is not None:
-                output, is_finished = output_opt
-                yield Result(output, next_state.state.score,
-                             is_finished, 1)
-            else:
-                is_finished = False
-            if not is_finished:
-                for result in self._search(input, next_state):
-                    yield result
+                self.sampler.create_output(input, node.state.state.state)
+            if output_opt is not None and node.depth == self.max_step_size:
+                # The step is last
+                output_opt = (output_opt[0], True)
+            node.output_opt = output_opt
+        return node.output_opt
+
+    def _is_expandable(self, input: Input, node: _Node[Output, State]) \
+            -> bool:
+        if node.state.num == 0:
+            return False
+        if self.max_step_size is not None and \
+                node.depth >= self.max_step_size:
+            return False
+        if node.depth != 0:
+            output_opt = self._output(input, node)
+            if output_opt is not None and output_opt[1]:
+                # The output is finished
+                return False
+        if self.prune is not None and self.prune(input, node.state.state):
+            return False
+        return True
+
+    def _expand(self, input: Input, node: _Node[Output, State],
+                stack: List[_Node[Output, State]]) -> None:
+        # Expand the pending states that will be visited soon together with
+        # the node so that the sampler can batch the inference.
+        nodes = [node]
+        for parent in reversed(stack):
+            if len(nodes) >= self.batch_size:
+                break
+            assert parent.children is not None
+            for sibling in parent.children[parent.index:]:
+                if len(nodes) >= self.batch_size:
+                    break
+                if sibling.children is None and \
+                        self._is_expandable(input, sibling):
+                    nodes.append(sibling)
+
+        with logger.block("expand"):
+            samples = self.sampler.all_samples_per_state(
+                [node.state.state for node in nodes], sorted=True)
+        for node, children in zip(nodes, samples):
+            node.children = [_Node(child, node.depth + 1)
+                             for child in children]
 
     def __call__(self, input: Input, n_required_output: Optional[int] = None) \
             -> Generator[Result[Output], None, None]:
         with logger.block("__call__"):
-            initial_state = DuplicatedSamplerState(
-                SamplerState(0.0, self.sampler.initialize(input)), 1
+            root: _Node[Output, State] = _Node(
+                DuplicatedSamplerState(
+                    SamplerState(0.0, self.sampler.initialize(input)), 1),
+                0
             )
-            for output in self._search(input, initial_state):
-                yield output
+            if not self._is_expandable(input, root):
+                return
+            stack: List[_Node[Output, State]] = []
+            self._expand(input, root, stack)
+            stack.append(root)
+
+            while len(stack) != 0:
+                if is_expired():
+                    logger.debug("timeout")
+                    return
+                node = stack[-1]
+                assert node.children is not None
+                if node.index == len(node.children):
+                    stack.pop()
+                    continue
+                child = node.children[node.index]
+                node.index += 1
+
+                output_opt = self._output(input, child)
+                if output_opt is not None:
+                    output, is_finished = output_opt
+                    yield Result(output, child.state.state.score,
+                                 is_finished, 1)
+                if self._is_expandable(input, child):
+                    if child.children is None:
+                        self._expand(input, child, stack)
+                    stack.append(child)
+
+    def statistics(self) -> Dict[str, int]:
+        return self.sampler.statistics()
@@ -1,4 +1,4 @@
-from typing import Callable, Generator, Generic, Optional, TypeVar
+from typing import Callable, Dict, Generator, Generic, Optional, TypeVar
 
 from mlprogram import logging
 from mlprogram.synthesizers.synthesizer import Result, Synthesizer
@@ -26,3 +26,6 @@ class FilteredSynthesizer(Synthesizer[Input, Output], Generic[Input, Output]):
                     logger.debug(f"find appropriate output: score={score}")
                     yield result
                     return
+
+    def statistics(self) -> Dict[str, int]:
+        return self.synthesizer.statistics()
@@ -1,9 +1,18 @@
-import math
-from typing import Callable, Dict, Generator, Generic, Optional, TypeVar, cast
+from typing import (
+    Callable,
+    Dict,
+    Generator,
+    Generic,
+    List,
+    Optional,
+    TypeVar,
+    cast,
+)
 
 import numpy as np
 
 from mlprogram import logging
+from mlprogram.deadline import is_expired
 from mlprogram.samplers import DuplicatedSamplerState, Sampler, SamplerState
 from mlprogram.synthesizers.synthesizer import Result, Synthesizer
 
@@ -15,6 +24,40 @@ State = TypeVar("State")
 Key = TypeVar("Key")
 
 
+def multinomial(n: int, probs: np.ndarray, rng: np.random.RandomState) \
+        -> np.ndarray:
+    return rng.multinomial(n, probs)
+
+
+def systematic(n: int, probs: np.ndarray, rng: np.random.RandomState) \
+        -> np.ndarray:
+    # The number of the positions (u + j) / n (j = 0, ..., n - 1) in
+    # [cumsum[i - 1], cumsum[i]) is ceil(n * cumsum[i] - u) -
+    # ceil(n * cumsum[i - 1] - u).
+    cumsum = np.cumsum(probs)
+    cumsum[-1] = 1.0
+    u = rng.random_sample()
+    edges = np.ceil(n * cumsum - u).astype(np.int64)
+    return np.diff(edges, prepend=0)
+
+
+def stratified(n: int, probs: np.ndarray, rng: np.random.RandomState) \
+        -> np.ndarray:
+    cumsum = np.cumsum(probs)
+    cumsum[-1] = 1.0
+    positions = (np.arange(n) + rng.random_sample(n)) / n
+    indexes = np.searchsorted(cumsum, positions, side="right")
+    indexes = np.minimum(indexes, len(probs) - 1)
+    return np.bincount(indexes, minlength=len(probs))
+
+
+resampling_functions = {
+    "multinomial": multinomial,
+    "systematic": systematic,
+    "stratified": stratified,
+}
+
+
 class SMC(Synthesizer[Input, Output], Generic[Input, Output, State, Key]):
     def __init__(self, max_step_size: int,
                  initial_particle_size: int,
@@ -22,7 +65,9 @@ class SMC(Synthesizer[Input, Output], Generic[Input, Output, State, Key]):
                  to_key: Callable[[State], Key] = lambda x: cast(Key, x),
                  max_try_num: Optional[int] = None,
                  factor: int = 2,
-                 rng: Optional[np.random.RandomState] = None):
+                 rng: Optional[np.random.RandomState] = None,
+                 resampling: str = "multinomial"):
+        assert resampling in resampling_functions
         self.max_step_size = max_step_size
         self.max_try_num = max_try_num
         self.initial_particle_size = initial_particle_size
@@ -31,6 +76,7 @@ class SMC(Synthesizer[Input, Output], Generic[Input, Output, State, Key]):
         self.sampler = sampler
         self.rng = \
             rng or np.random.RandomState(np.random.randint(0, 2 << 32 - 1))
+        self.resample = resampling_functions[resampling]
 
     def __call__(self, input: Input, n_required_output: Optional[int] = None) \
             -> Generator[Result[Output], None, None]:
@@ -53,8 +99,13 @@ class SMC(Synthesizer[Input, Output], Generic[Input, Output, State, Key]):
                 )]
                 step = 0
                 while step < self.max_step_size and n_particle > 0:
+                    if is_expired():
+                        logger.debug("timeout")
+                        return
                     # Generate particles
-                    samples: Dict[Key, DuplicatedSamplerState[State]] = {}
+                    indexes: Dict[Key, int] = {}
+                    list_samples: List[DuplicatedSamplerState[State]] = []
+                    nums: List[int] = []
                     for sample in self.sampler.batch_k_samples(
                         [state.state for state in particles],
                         [state.num for state in particles]
@@ -62,17 +113,19 @@ class SMC(Synthesizer[Input, Output], Generic[Input, Output, State, Key]):
                         if sample.num == 0:
                             # This sample does not exist
                             continue
-                        key = self.to_key(sample.state.state)
-                        if key in samples:
-                            state = samples[key]
-                            samples[key] = \
-                                DuplicatedSamplerState(
-                                    state.state, state.num + sample.num
-                            )
+                        if is_expired():
+                            logger.debug("timeout")
+                            return
+                        # Look up the key only once to hash it only once
+                        index = indexes.setdefault(
+                            self.to_key(sample.state.state), len(list_samples))
+                        if index == len(list_samples):
+                            list_samples.append(sample)
+                            nums.append(sample.num)
                         else:
-                            samples[key] = sample
+                            nums[index] += sample.num
 
-                    if len(samples) == 0:
+                    if len(list_samples) == 0:
                         # Output last particle with is_finished=True
                         for state in particles:
                             output_opt = \
@@ -85,15 +138,19 @@ class SMC(Synthesizer[Input, Output], Generic[Input, Output, State, Key]):
                         break
 
                     # Resample
-                    list_samples = [state for state in samples.values()]
-                    log_weights = [math.log(state.num) + state.state.score
-                                   for state in list_samples]
-                    probs = [math.exp(log_weight - max(log_weights))
-                             for log_weight in log_weights]
-                    probs = [p / sum(probs) for p in probs]
-                    particles = []
-                    resampled = self.rng.multinomial(n_particle, probs)
-                    for state, n in zip(list_samples, resampled):
+                    with logger.block("resample"):
+                        log_weights = \
+                            np.log(np.array(nums, dtype=np.float64)) + \
+                            np.array([state.state.score
+                                      for state in list_samples],
+                                     dtype=np.float64)
+                        probs = np.exp(log_weights - np.max(log_weights))
+                        probs /= np.sum(probs)
+                        resampled = self.resample(n_particle, probs, self.rng)
+
+                    is_finished_list = np.zeros(len(list_samples), dtype=bool)
+                    for j, (state, n) in enumerate(zip(list_samples,
+                                                       resampled.tolist())):
                         # Create output
                         output_opt = \
                             self.sampler.create_output(input,
@@ -104,21 +161,21 @@ class SMC(Synthesizer[Input, Output], Generic[Input, Output, State, Key]):
                                 is_finished = True
                             yield Result(output, state.state.score,
                                          is_finished, n)
-                        else:
-                            is_finished = False
-
-                        if is_finished:
-                            # Exclude finished particles
-                            n_particle -= n
-
-                        if n > 0:
-                            particles.append(
-                                DuplicatedSamplerState(
-                                    state.state, n
-                                )
-                            )
+                            is_finished_list[j] = is_finished
+
+                    # Exclude finished particles
+                    n_particle -= int(np.sum(resampled[is_finished_list]))
+                    particles = [
+                        DuplicatedSamplerState(list_samples[j].state, n)
+                        for j, n in zip(
+                            np.nonzero(resampled)[0].tolist(),
+                            resampled[resampled > 0].tolist())
+                    ]
                     step += 1
 
                 n_initial_particle *= self.factor
                 if i == self.max_try_num:
                     break
+
+    def statistics(self) -> Dict[str, int]:
+        return self.sampler.statistics()
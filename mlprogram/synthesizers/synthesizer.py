@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Generator, Generic, Optional, TypeVar
+from typing import Dict, Generator, Generic, Optional, TypeVar
 
 Input = TypeVar("Input")
 Output = TypeVar("Output")
@@ -18,3 +18,8 @@ class Synthesizer(Generic[Input, Output]):
     def __call__(self, input: Input, n_required_output: Optional[int] = None) \
             -> Generator[Result[Output], None, None]:
         raise NotImplementedError
+
+    def statistics(self) -> Dict[str, int]:
+        # The statistics of the last synthesis (e.g., the statistics of the
+        # sampler)
+        return {}
@@ -1,7 +1,7 @@
-import time
-from typing import Generator, Generic, Optional, TypeVar
+from typing import Dict, Generator, Generic, Optional, TypeVar
 
 from mlprogram import logging
+from mlprogram.deadline import Deadline, run_with_deadline
 from mlprogram.synthesizers import Result, Synthesizer
 
 logger = logging.Logger(__name__)
@@ -19,12 +19,16 @@ class SynthesizerWithTimeout(Synthesizer[Input, Output],
 
     def __call__(self, input: Input, n_required_output: Optional[int] = None) \
             -> Generator[Result[Output], None, None]:
-        begin = time.time()
+        deadline = Deadline(self.timeout_sec)
         with logger.block("__call__"):
-            for output in self.synthesizer(
-                    input,
-                    n_required_output=n_required_output):
+            for output in run_with_deadline(
+                    deadline,
+                    self.synthesizer(input,
+                                     n_required_output=n_required_output)):
                 yield output
-                if time.time() - begin > self.timeout_sec:
+                if deadline.is_expired():
                     logger.debug("timeout")
                     break
+
+    def statistics(self) -> Dict[str, int]:
+        return self.synthesizer.statistics()
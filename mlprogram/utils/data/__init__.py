@@ -1,3 +1,4 @@
+from mlprogram.utils.data.columnar import ColumnarDataset  # noqa
 from mlprogram.utils.data.functions import (  # noqa
     Collate,
     CollateOptions,
@@ -7,8 +8,14 @@ from mlprogram.utils.data.functions import (  # noqa
     split_by_n_error,
 )
 from mlprogram.utils.data.random import random_split  # noqa
+from mlprogram.utils.data.samplers import BucketBatchSampler  # noqa
+from mlprogram.utils.data.samplers import InfiniteSampler  # noqa
+from mlprogram.utils.data.samplers import split_by_size  # noqa
 from mlprogram.utils.data.utils import (  # noqa
     ListDataset,
+    ShardedIterableDataset,
+    SubsetDataset,
+    get_shard,
     to_map_style_dataset,
     transform,
 )
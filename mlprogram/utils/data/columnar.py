@@ -0,0 +1,222 @@
+import json
+import mmap
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+from mlprogram.builtins import Environment
+from mlprogram.utils.data.utils import ListDataset
+
+# File layout:
+#   magic (8 bytes), header length (int64), header (json), padding,
+#   buffers (each buffer starts at a multiple of ALIGNMENT)
+MAGIC = b"MLPCOL01"
+ALIGNMENT = 64
+
+_dtypes = {
+    torch.bool: "bool",
+    torch.uint8: "uint8",
+    torch.int8: "int8",
+    torch.int16: "int16",
+    torch.int32: "int32",
+    torch.int64: "int64",
+    torch.float16: "float16",
+    torch.float32: "float32",
+    torch.float64: "float64",
+}
+
+
+def _column_type(values: List[Any]) -> Optional[str]:
+    if all(isinstance(v, str) for v in values):
+        return "str"
+    if all(isinstance(v, bool) for v in values):
+        return "bool"
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return "int"
+    if all(isinstance(v, float) for v in values):
+        return "float"
+    if all(isinstance(v, torch.Tensor) for v in values):
+        dtypes = set(v.dtype for v in values)
+        ndims = set(v.dim() for v in values)
+        if len(dtypes) == 1 and len(ndims) == 1 and \
+                list(dtypes)[0] in _dtypes:
+            return "tensor"
+    return None
+
+
+def is_supported(elems: List[Environment]) -> bool:
+    if len(elems) == 0:
+        return True
+    keys = set(elems[0].keys())
+    supervisions = set(key for key in keys if elems[0].is_supervision(key))
+    for elem in elems:
+        if set(elem.keys()) != keys:
+            return False
+        if set(key for key in keys if elem.is_supervision(key)) != \
+                supervisions:
+            return False
+    return all(_column_type([elem[key] for elem in elems]) is not None
+               for key in keys)
+
+
+def save(elems: List[Environment], path: str) -> None:
+    assert is_supported(elems)
+    keys = list(elems[0].keys()) if len(elems) != 0 else []
+    buffers: List[np.ndarray] = []
+    columns = []
+
+    def add_buffer(array: np.ndarray) -> int:
+        buffers.append(np.ascontiguousarray(array))
+        return len(buffers) - 1
+
+    for key in keys:
+        values = [elem[key] for elem in elems]
+        t = _column_type(values)
+        column: Dict[str, Any] = {
+            "key": key, "type": t,
+            "supervision": elems[0].is_supervision(key),
+        }
+        if t == "str":
+            encoded = [v.encode("utf-8") for v in values]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(v) for v in encoded], out=offsets[1:])
+            column["offsets"] = add_buffer(offsets)
+            column["data"] = add_buffer(
+                np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        elif t == "bool":
+            column["data"] = add_buffer(np.array(values, dtype=np.bool_))
+        elif t == "int":
+            column["data"] = add_buffer(np.array(values, dtype=np.int64))
+        elif t == "float":
+            column["data"] = add_buffer(np.array(values, dtype=np.float64))
+        else:
+            dtype = _dtypes[values[0].dtype]
+            ndim = values[0].dim()
+            shapes = np.array([list(v.shape) for v in values],
+                              dtype=np.int64).reshape(len(values), ndim)
+            sizes = [v.numel() for v in values]
+            offsets = np.zeros(len(values) + 1, dtype=np.int64)
+            np.cumsum(sizes, out=offsets[1:])
+            column["dtype"] = dtype
+            column["ndim"] = ndim
+            column["shapes"] = add_buffer(shapes)
+            column["offsets"] = add_buffer(offsets)
+            column["data"] = add_buffer(
+                np.concatenate([v.detach().cpu().reshape(-1).numpy()
+                                for v in values])
+                if len(values) != 0 else np.zeros((0,), dtype=dtype))
+        columns.append(column)
+
+    # Compute the offsets of the buffers
+    header: Dict[str, Any] = {"n": len(elems), "columns": columns,
+                              "buffers": []}
+    header_bytes = json.dumps(header).encode("utf-8")
+    # The header contains the offsets, so iterate until its length converges
+    while True:
+        begin = _align(len(MAGIC) + 8 + len(header_bytes))
+        offset = begin
+        header["buffers"] = []
+        for buffer in buffers:
+            header["buffers"].append([offset, buffer.nbytes,
+                                      buffer.dtype.str])
+            offset = _align(offset + buffer.nbytes)
+        new_header_bytes = json.dumps(header).encode("utf-8")
+        if len(new_header_bytes) == len(header_bytes):
+            header_bytes = new_header_bytes
+            break
+        header_bytes = new_header_bytes
+
+    with open(path, "wb") as file:
+        file.write(MAGIC)
+        file.write(np.int64(len(header_bytes)).tobytes())
+        file.write(header_bytes)
+        for buffer, (offset, _, _) in zip(buffers, header["buffers"]):
+            file.write(b"\0" * (offset - file.tell()))
+            file.write(buffer.tobytes())
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def is_columnar_file(path: str) -> bool:
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+class ColumnarDataset(ListDataset[Environment]):
+    def __init__(self, path: str):
+        super().__init__([])
+        self.path = path
+        self._open()
+
+    def _open(self) -> None:
+        with open(self.path, "rb") as file:
+            assert file.read(len(MAGIC)) == MAGIC
+            header_size = int(np.frombuffer(file.read(8), dtype=np.int64)[0])
+            header = json.loads(file.read(header_size).decode("utf-8"))
+            # The pages are shared among the processes opening the file
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.n: int = header["n"]
+        self.buffers = [
+            np.frombuffer(self._mmap, dtype=np.dtype(dtype), offset=offset,
+                          count=nbytes // np.dtype(dtype).itemsize)
+            if nbytes != 0 else np.zeros((0,), dtype=np.dtype(dtype))
+            for offset, nbytes, dtype in header["buffers"]
+        ]
+        self.columns: List[Tuple[str, str, bool, Dict[str, Any]]] = [
+            (column["key"], column["type"], column["supervision"], column)
+            for column in header["columns"]
+        ]
+
+    def __getstate__(self):
+        # mmap cannot be pickled, so reopen it in the other process
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.elems = []
+        self.path = state["path"]
+        self._open()
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _get(self, idx: int) -> Environment:
+        if idx < 0:
+            idx += self.n
+        if not 0 <= idx < self.n:
+            raise IndexError(f"index {idx} is out of range")
+        values = {}
+        supervisions = set()
+        for key, t, is_supervision, column in self.columns:
+            data = self.buffers[column["data"]]
+            if t == "str":
+                offsets = self.buffers[column["offsets"]]
+                value: Any = \
+                    data[offsets[idx]:offsets[idx + 1]].tobytes() \
+                    .decode("utf-8")
+            elif t == "bool":
+                value = bool(data[idx])
+            elif t == "int":
+                value = int(data[idx])
+            elif t == "float":
+                value = float(data[idx])
+            else:
+                offsets = self.buffers[column["offsets"]]
+                ndim = column["ndim"]
+                shape = self.buffers[column["shapes"]][
+                    idx * ndim:(idx + 1) * ndim].tolist()
+                # Copy the data because the mmap is read-only
+                value = torch.from_numpy(
+                    data[offsets[idx]:offsets[idx + 1]].copy()
+                ).reshape(shape)
+            values[key] = value
+            if is_supervision:
+                supervisions.add(key)
+        return Environment(values, supervisions)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._get(i) for i in range(*idx.indices(self.n))]
+        return self._get(idx)
@@ -1,72 +1,141 @@
 import multiprocessing as mp
+from collections import Counter
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
 import torch
 from torch.nn import functional as F
 from tqdm import tqdm
 
 from mlprogram import logging
-from mlprogram.actions import ActionSequence, ApplyRule, CloseVariadicFieldRule, Rule
+from mlprogram.actions import ActionSequence, ApplyRule, CloseVariadicFieldRule
 from mlprogram.builtins import Environment
 from mlprogram.encoders import Samples
 from mlprogram.languages import Analyzer, Parser, Token
 from mlprogram.nn.utils import rnn
-from mlprogram.utils.data.utils import ListDataset
+from mlprogram.utils.data.utils import SubsetDataset
 
 logger = logging.Logger(__name__)
 
 
+def _chunks(dataset: torch.utils.data.Dataset, chunk_size: int) \
+        -> Iterator[List[Any]]:
+    chunk: List[Any] = []
+    for sample in dataset:
+        chunk.append(sample)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if len(chunk) != 0:
+        yield chunk
+
+
+def _count(count_chunk: Callable[[List[Any]], Tuple[Counter, ...]],
+           dataset: torch.utils.data.Dataset, n_counter: int,
+           n_process: int, chunk_size: int) -> Tuple[Counter, ...]:
+    # Count the elements of each chunk and merge the partial counts. The
+    # chunks are merged in the dataset order, so the order of the keys (i.e.,
+    # the vocabulary order) is the order of their first occurrences.
+    counters: Tuple[Counter, ...] = tuple(Counter() for _ in range(n_counter))
+
+    def merge(partial: Tuple[Counter, ...]) -> None:
+        for counter, p in zip(counters, partial):
+            counter.update(p)
+
+    if n_process == 0:
+        for chunk in _chunks(dataset, chunk_size):
+            merge(count_chunk(chunk))
+    else:
+        with mp.Pool(processes=n_process) as pool:
+            for partial in pool.imap(count_chunk,
+                                     _chunks(dataset, chunk_size)):
+                merge(partial)
+    return counters
+
+
+class _CountWords:
+    def __init__(self, extract_reference: Callable[[Any], List[Token]],
+                 query_key: str):
+        self.extract_reference = extract_reference
+        self.query_key = query_key
+
+    def __call__(self, chunk: List[Any]) -> Tuple[Counter]:
+        words: Counter = Counter()
+        for sample in chunk:
+            reference = self.extract_reference(sample[self.query_key])
+            words.update(token.value for token in reference)
+        return (words,)
+
+
+class _CountCharacters:
+    def __init__(self, extract_reference: Callable[[Any], List[Token]]):
+        self.extract_reference = extract_reference
+
+    def __call__(self, chunk: List[Any]) -> Tuple[Counter]:
+        chars: Counter = Counter()
+        for sample in chunk:
+            reference = self.extract_reference(sample["text_query"])
+            for token in reference:
+                chars.update(token.value)
+        return (chars,)
+
+
+class _CountSamples:
+    def __init__(self, parser: Parser[Any]):
+        self.parser = parser
+
+    def __call__(self, chunk: List[Any]) -> Tuple[Counter, Counter, Counter]:
+        rules: Counter = Counter()
+        node_types: Counter = Counter()
+        tokens: Counter = Counter()
+        for sample in chunk:
+            ground_truth = sample["ground_truth"]
+            ast = self.parser.parse(ground_truth)
+            if ast is None:
+                continue
+            action_sequence = ActionSequence.create(ast)
+            for action in action_sequence.action_sequence:
+                if isinstance(action, ApplyRule):
+                    rule = action.rule
+                    if not isinstance(rule, CloseVariadicFieldRule):
+                        rules[rule] += 1
+                        node_types[rule.parent] += 1
+                        for _, child in rule.children:
+                            node_types[child] += 1
+                else:
+                    assert action.kind is not None
+                    tokens[(action.kind, action.value)] += 1
+        return rules, node_types, tokens
+
+
 def get_words(dataset: torch.utils.data.Dataset,
               extract_reference: Callable[[Any], List[Token]],
               query_key: str = "text_query",
-              ) -> Sequence[str]:
-    words = []
-
-    for sample in dataset:
-        reference = extract_reference(sample[query_key])
-        words.extend([token.value for token in reference])
-
+              n_process: int = 0,
+              chunk_size: int = 1024) -> Counter:
+    words, = _count(_CountWords(extract_reference, query_key), dataset, 1,
+                    n_process, chunk_size)
     return words
 
 
 def get_characters(dataset: torch.utils.data.Dataset,
                    extract_reference: Callable[[Any], List[Token]],
-                   ) -> Sequence[str]:
-    chars: List[str] = []
-
-    for sample in dataset:
-        reference = extract_reference(sample["text_query"])
-        for token in reference:
-            chars.extend(token.value)
-
+                   n_process: int = 0,
+                   chunk_size: int = 1024) -> Counter:
+    chars, = _count(_CountCharacters(extract_reference), dataset, 1,
+                    n_process, chunk_size)
     return chars
 
 
 def get_samples(dataset: torch.utils.data.Dataset,
-                parser: Parser[Any]) -> Samples:
-    rules: List[Rule] = []
-    node_types = []
-    tokens: List[Tuple[str, str]] = []
-
-    for sample in dataset:
-        ground_truth = sample["ground_truth"]
-        ast = parser.parse(ground_truth)
-        if ast is None:
-            continue
-        action_sequence = ActionSequence.create(ast)
-        for action in action_sequence.action_sequence:
-            if isinstance(action, ApplyRule):
-                rule = action.rule
-                if not isinstance(rule, CloseVariadicFieldRule):
-                    rules.append(rule)
-                    node_types.append(rule.parent)
-                    for _, child in rule.children:
-                        node_types.append(child)
-            else:
-                assert action.kind is not None
-                tokens.append((action.kind, action.value))
-
+                parser: Parser[Any],
+                n_process: int = 0,
+                chunk_size: int = 1024) -> Samples:
+    # The returned samples hold the number of occurrences of each element
+    # instead of the list of all elements. The thresholds are applied by
+    # the encoders (e.g., LabelEncoder in ActionSequenceEncoder).
+    rules, node_types, tokens = _count(_CountSamples(parser), dataset, 3,
+                                       n_process, chunk_size)
     return Samples(rules, node_types, tokens)
 
 
@@ -198,13 +267,34 @@ class _CalcNError:
 
 def split_by_n_error(dataset: torch.utils.data.Dataset,
                      analyzer: Analyzer,
-                     n_process: int = 0) -> Dict[str, torch.utils.data.Dataset]:
-    no_error = []
-    with_error = []
-    calc_n_error = _CalcNError(analyzer)
+                     n_process: int = 0,
+                     chunk_size: int = 1024) \
+        -> Dict[str, torch.utils.data.Dataset]:
+    no_error: List[int] = []
+    with_error: List[int] = []
     if n_process == 0:
-        n_errors = [calc_n_error(data) for data in enumerate(tqdm(dataset))]
+        # Analyze the code in chunks so that the analyzer can run them
+        # concurrently
+        n_errors = []
+        codes: List[Tuple[int, Any]] = []
+
+        def flush():
+            results = analyzer.analyze_all([code for _, code in codes])
+            n_errors.extend((i, len(errors))
+                            for (i, _), errors in zip(codes, results))
+            codes.clear()
+
+        for i, data in enumerate(tqdm(dataset)):
+            if "n_error" in data:
+                n_errors.append((i, data["n_error"]))
+            else:
+                codes.append((i, data["code"]))
+            if len(codes) == chunk_size:
+                flush()
+        flush()
+        n_errors.sort(key=lambda x: x[0])
     else:
+        calc_n_error = _CalcNError(analyzer)
         n_errors = []
         with mp.Pool(processes=n_process) as pool:
             with tqdm(total=len(dataset)) as _t:
@@ -214,11 +304,12 @@ def split_by_n_error(dataset: torch.utils.data.Dataset,
                     n_errors.append(_r)
     for i, n_error in n_errors:
         if n_error == 0:
-            no_error.append(dataset[i])
+            no_error.append(i)
         else:
-            with_error.append(dataset[i])
+            with_error.append(i)
 
+    # Return the views of dataset so that the elements are not copied
     return {
-        "no_error": ListDataset(no_error),
-        "with_error": ListDataset(with_error)
+        "no_error": SubsetDataset(dataset, no_error),
+        "with_error": SubsetDataset(dataset, with_error)
     }
@@ -0,0 +1,141 @@
+from typing import Iterator, List, Optional
+
+import torch
+
+from mlprogram import distributed
+
+
+def split_by_size(lengths: List[int], batch_size: Optional[int] = None,
+                  max_tokens: Optional[int] = None) -> List[List[int]]:
+    # Split the sequence of samples into the consecutive groups. A group
+    # contains at most batch_size samples and, if max_tokens is set, its
+    # padded size (max length * #samples) is at most max_tokens. A sample
+    # longer than max_tokens forms a group by itself.
+    groups: List[List[int]] = []
+    group: List[int] = []
+    max_length = 0
+    for i, length in enumerate(lengths):
+        is_full = \
+            (batch_size is not None and len(group) >= batch_size) or \
+            (max_tokens is not None and
+             max(max_length, length) * (len(group) + 1) > max_tokens)
+        if len(group) != 0 and is_full:
+            groups.append(group)
+            group = []
+            max_length = 0
+        group.append(i)
+        max_length = max(max_length, length)
+    if len(group) != 0:
+        groups.append(group)
+    return groups
+
+
+class InfiniteSampler(torch.utils.data.Sampler):
+    def __init__(self, n: int, shuffle: bool = True,
+                 seed: Optional[int] = None,
+                 rank: Optional[int] = None,
+                 world_size: Optional[int] = None):
+        # Yield the indices of the dataset forever. The indices are
+        # reshuffled at each epoch, so DataLoader keeps prefetching across
+        # the epoch boundaries. Each rank yields a disjoint shard of the
+        # indices.
+        self.n = n
+        self.shuffle = shuffle
+        if seed is None:
+            seed = int(torch.empty((), dtype=torch.int64).random_().item())
+            # All ranks have to use the same seed
+            seed = distributed.broadcast(seed)
+        self.seed = seed
+        self.rank = rank if rank is not None else distributed.rank()
+        self.world_size = \
+            world_size if world_size is not None else distributed.size()
+        self.epoch = 0
+
+    def indices(self, epoch: int) -> List[int]:
+        if self.shuffle:
+            generator = torch.Generator()
+            generator.manual_seed(self.seed + epoch)
+            indices = torch.randperm(self.n, generator=generator).tolist()
+        else:
+            indices = list(range(self.n))
+        if len(indices) % self.world_size != 0:
+            # Repeat indices so that all ranks have the same number of samples
+            n_pad = self.world_size - len(indices) % self.world_size
+            indices.extend((indices * n_pad)[:n_pad])
+        return indices[self.rank::self.world_size]
+
+    def __iter__(self) -> Iterator[int]:
+        while True:
+            indices = self.indices(self.epoch)
+            self.epoch += 1
+            yield from indices
+
+
+class BucketBatchSampler(torch.utils.data.Sampler):
+    def __init__(self, lengths: List[int], batch_size: Optional[int] = None,
+                 max_tokens: Optional[int] = None,
+                 bucket_size: Optional[int] = None,
+                 shuffle: bool = True, seed: Optional[int] = None,
+                 rank: Optional[int] = None,
+                 world_size: Optional[int] = None):
+        # Yield batches of the samples with similar lengths forever.
+        # The samples are shuffled, split into buckets of bucket_size, and
+        # each bucket is sorted by length and split into batches. A batch
+        # contains at most batch_size samples and, if max_tokens is set, its
+        # padded size (max length * #samples) is at most max_tokens.
+        # The batches are sharded among the ranks.
+        assert batch_size is not None or max_tokens is not None
+        self.lengths = lengths
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        if bucket_size is None:
+            bucket_size = 100 * batch_size if batch_size is not None else 4096
+        self.bucket_size = bucket_size
+        self.shuffle = shuffle
+        if seed is None:
+            seed = int(torch.empty((), dtype=torch.int64).random_().item())
+            # All ranks have to use the same seed
+            seed = distributed.broadcast(seed)
+        self.seed = seed
+        self.rank = rank if rank is not None else distributed.rank()
+        self.world_size = \
+            world_size if world_size is not None else distributed.size()
+        self.epoch = 0
+
+    def _split(self, indices: List[int]) -> List[List[int]]:
+        groups = split_by_size([self.lengths[index] for index in indices],
+                               self.batch_size, self.max_tokens)
+        return [[indices[i] for i in group] for group in groups]
+
+    def batches(self, epoch: int) -> List[List[int]]:
+        generator = torch.Generator()
+        generator.manual_seed(self.seed + epoch)
+        n = len(self.lengths)
+        if self.shuffle:
+            indices = torch.randperm(n, generator=generator).tolist()
+        else:
+            indices = list(range(n))
+        batches: List[List[int]] = []
+        for begin in range(0, n, self.bucket_size):
+            bucket = sorted(indices[begin:begin + self.bucket_size],
+                            key=lambda i: self.lengths[i])
+            batches.extend(self._split(bucket))
+        if self.shuffle:
+            batches = [batches[i] for i in
+                       torch.randperm(len(batches),
+                                      generator=generator).tolist()]
+        if len(batches) % self.world_size != 0:
+            # Repeat batches so that all ranks have the same number of batches
+            n_pad = self.world_size - len(batches) % self.world_size
+            batches.extend((batches * n_pad)[:n_pad])
+        return batches[self.rank::self.world_size]
+
+    def __len__(self) -> int:
+        # The number of batches per epoch
+        return len(self.batches(0))
+
+    def __iter__(self) -> Iterator[List[int]]:
+        while True:
+            batches = self.batches(self.epoch)
+            self.epoch += 1
+            yield from batches
@@ -1,12 +1,28 @@
-from typing import Callable, Generic, List, TypeVar, cast
+import itertools
+from typing import Callable, Generic, Iterator, List, Tuple, TypeVar, cast
 
+import numpy as np
 import torch
 
+from mlprogram import distributed
+
 V = TypeVar("V")
 V0 = TypeVar("V0")
 V1 = TypeVar("V1")
 
 
+def get_shard() -> Tuple[int, int]:
+    # Return the id of the shard read by this (rank, DataLoader worker) pair
+    # and the number of the shards
+    worker_info = torch.utils.data.get_worker_info()
+    if worker_info is None:
+        worker_id, n_worker = 0, 1
+    else:
+        worker_id, n_worker = worker_info.id, worker_info.num_workers
+    return distributed.rank() * n_worker + worker_id, \
+        distributed.size() * n_worker
+
+
 class ListDataset(torch.utils.data.Dataset, Generic[V]):
     def __init__(self, elems: List[V]):
         self.elems: List[V] = elems
@@ -18,6 +34,24 @@ class ListDataset(torch.utils.data.Dataset, Generic[V]):
         return self.elems[idx]
 
 
+class SubsetDataset(ListDataset[V]):
+    def __init__(self, dataset: torch.utils.data.Dataset, indices: List[int]):
+        # A view of the elements of dataset at indices. The elements are read
+        # from dataset lazily, so a lazy dataset (e.g., ColumnarDataset) is
+        # not loaded into memory.
+        super().__init__([])
+        self.dataset = dataset
+        self.indices = np.array(indices, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self.dataset[int(i)] for i in self.indices[idx]]
+        return self.dataset[int(self.indices[idx])]
+
+
 class TransformedDataset(torch.utils.data.Dataset, Generic[V0, V1]):
     def __init__(self, dataset: torch.utils.data.Dataset,
                  transform: Callable[[V0], V1]):
@@ -52,6 +86,18 @@ class TransformedIterableDataset(torch.utils.data.IterableDataset,
         return InternalIterator(self)
 
 
+class ShardedIterableDataset(torch.utils.data.IterableDataset, Generic[V]):
+    def __init__(self, dataset: torch.utils.data.IterableDataset):
+        # Keep every n-th element of the dataset so that each (rank, worker)
+        # pair reads a disjoint part of it. This is for the datasets that do
+        # not shard themselves.
+        self.dataset = dataset
+
+    def __iter__(self) -> Iterator[V]:
+        shard, n_shard = get_shard()
+        return itertools.islice(iter(self.dataset), shard, None, n_shard)
+
+
 def to_map_style_dataset(dataset: torch.utils.data.IterableDataset, n: int) \
         -> ListDataset:
     elems = []
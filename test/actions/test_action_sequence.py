@@ -230,6 +230,23 @@ class TestActionSequence(object):
             action_sequence2._head_children_index
         assert action_sequence.generate() != action_sequence2.generate()
 
+    def test_clone_shares_actions(self):
+        action_sequence = ActionSequence()
+        rule = ExpandTreeRule(NodeType("expr", NodeConstraint.Node, False),
+                              [("elems",
+                                NodeType("expr", NodeConstraint.Node, True))])
+        action_sequence.eval(ApplyRule(rule))
+        action_sequence.eval(ApplyRule(rule))
+
+        action_sequence2 = action_sequence.clone()
+        for action, action2 in zip(action_sequence.action_sequence,
+                                   action_sequence2.action_sequence):
+            assert action is action2
+        action_sequence2.eval(ApplyRule(CloseVariadicFieldRule()))
+        assert 2 == len(action_sequence.action_sequence)
+        assert [[1]] == action_sequence._tree.children[0]
+        assert [[]] == action_sequence._tree.children[1]
+
     def test_create_leaf(self):
         seq = ActionSequence.create(Leaf("str", "t0 t1"))
         assert [ApplyRule(ExpandTreeRule(
@@ -1,3 +1,5 @@
+import pickle
+
 import pytest
 import torch
 
@@ -53,3 +55,15 @@ class TestEnv(object):
         e["z"] = 10
         e.to(device=torch.device("cpu"))
         assert e["key"].args == ((), {"device": torch.device("cpu")})
+
+    def test_clone_shares_supervisions(self) -> None:
+        e = Environment({"key": 0, "key2": 1}, set(["key"]))
+        e2 = e.clone()
+        e2.mark_as_supervision("key2")
+        assert e.is_supervision("key")
+        assert not e.is_supervision("key2")
+        assert e2.is_supervision("key2")
+
+    def test_pickle(self) -> None:
+        e = Environment({"key": 0, "key2": 1}, set(["key"]))
+        assert e == pickle.loads(pickle.dumps(e))
@@ -0,0 +1,83 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+
+import torch
+
+from mlprogram import distributed
+from mlprogram.builtins import Environment
+from mlprogram.datasets.deepfix import SqliteDataset, SqliteIterableDataset
+
+
+def create_db(tmpdir, n):
+    path = os.path.join(tmpdir, "dataset.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE Code(code text, error text, errorcount int)")
+    for i in range(n):
+        conn.execute("INSERT INTO Code VALUES (?, ?, ?)",
+                     (f"code{i}", f"error{i}", i))
+    conn.commit()
+    conn.close()
+    return path
+
+
+def entry(i):
+    return Environment({"code": f"code{i}", "error": f"error{i}",
+                        "n_error": i},
+                       set(["error", "n_error"]))
+
+
+class TestSqliteDataset(object):
+    def test_getitem(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dataset = SqliteDataset(create_db(tmpdir, 3))
+            assert 3 == len(dataset)
+            assert entry(0) == dataset[0]
+            assert entry(2) == dataset[-1]
+            assert [entry(1), entry(2)] == dataset[1:]
+            assert [entry(0), entry(1), entry(2)] == list(dataset)
+
+    def test_pickle(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dataset = pickle.loads(pickle.dumps(
+                SqliteDataset(create_db(tmpdir, 3))))
+            assert entry(1) == dataset[1]
+
+    def test_dataloader(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dataset = SqliteDataset(create_db(tmpdir, 4))
+            loader = torch.utils.data.DataLoader(
+                dataset, batch_size=None, num_workers=2)
+            assert [entry(i) for i in range(4)] == list(loader)
+
+
+class TestSqliteIterableDataset(object):
+    def test_iter(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dataset = SqliteIterableDataset(create_db(tmpdir, 3))
+            assert [entry(0), entry(1), entry(2)] == list(dataset)
+
+    def test_empty(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dataset = SqliteIterableDataset(create_db(tmpdir, 0))
+            assert [] == list(dataset)
+
+    def test_shard_by_worker(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dataset = SqliteIterableDataset(create_db(tmpdir, 5))
+            loader = torch.utils.data.DataLoader(
+                dataset, batch_size=None, num_workers=2)
+            elems = list(loader)
+            assert 5 == len(elems)
+            assert set(range(5)) == set(elem["n_error"] for elem in elems)
+
+    def test_shard_by_rank(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dataset = SqliteIterableDataset(create_db(tmpdir, 5))
+            monkeypatch.setattr(distributed, "size", lambda: 2)
+            elems = []
+            for rank in range(2):
+                monkeypatch.setattr(distributed, "rank", lambda: rank)
+                elems.append([elem["n_error"] for elem in dataset])
+            assert [[0, 1], [2, 3, 4]] == elems
@@ -51,3 +51,35 @@ class TestLexer(object):
         lexer = Lexer()
         assert lexer.untokenize(lexer.tokenize("int x = 0;")) == \
             "int x = 0 ;"
+
+    def test_keyword_of_original_tokenizer(self):
+        lexer = Lexer()
+        assert lexer.tokenize_with_offset("IF a") == [
+            (0, Token("IF", "IF", "IF")),
+            (3, Token("name", "___name@0___", "a")),
+        ]
+
+    def test_mismatch(self):
+        lexer = Lexer()
+        assert lexer.tokenize_with_offset("int a = `;") is None
+
+    def test_tokenize_all(self):
+        lexer = Lexer()
+        assert lexer.tokenize_all(["int a;", "`"]) == [
+            lexer.tokenize("int a;"), None
+        ]
+
+    def test_tokenize_lines_with_offset(self):
+        lexer = Lexer()
+        lines = ["int a;", "a = 1;", "b = a;"]
+        assert lexer.tokenize_lines_with_offset(lines) == \
+            lexer.tokenize_with_offset("\n".join(lines) + "\n")
+        assert lexer.tokenize_lines_with_offset(lines)[-4] == \
+            (14, Token("name", "___name@2___", "b"))
+
+    def test_tokenize_lines_with_multiline_token(self):
+        lexer = Lexer()
+        for lines in [["a /* foo", "bar */ b"], ["'a", "b'"], ["a \\", "b"]]:
+            assert lexer.tokenize_lines_with_offset(lines) == \
+                lexer.tokenize_with_offset("\n".join(lines) + "\n")
+        assert lexer.tokenize_lines_with_offset(["a", "`"]) is None
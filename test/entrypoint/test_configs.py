@@ -1,43 +1,126 @@
 import os
 import tempfile
 
-from mlprogram.entrypoint.configs import load_config, parse_config
+import pytest
+
+from mlprogram.entrypoint.configs import config_digest, load_config, parse_config
+from mlprogram.entrypoint.types import types
 
 
 class TestParseConfig(object):
     def test_with_file_cache(self):
         with tempfile.TemporaryDirectory() as tmpdir:
             path = os.path.join(tmpdir, "cache")
-            config = {
-                "main": {
-                    "type": "with_file_cache",
-                    "path": path,
-                    "config": {
-                        "type": "select",
-                        "key": "key",
-                        "options": {
-                            "key": 0
+
+            def config(value):
+                return {
+                    "main": {
+                        "type": "with_file_cache",
+                        "path": path,
+                        "config": {
+                            "type": "select",
+                            "key": "key",
+                            "options": {
+                                "key": value
+                            }
                         }
                     }
                 }
-            }
-            result = parse_config(config)
+            result = parse_config(config(0))
             assert result["/main"] == 0
-            config = {
-                "main": {
-                    "type": "with_file_cache",
-                    "path": path,
-                    "config": {
-                        "type": "select",
-                        "key": "key",
-                        "options": {
-                            "key": 1
+            assert 1 == len(os.listdir(tmpdir))
+            result = parse_config(config(0))
+            assert result["/main"] == 0
+            assert 1 == len(os.listdir(tmpdir))
+            # The cache is invalidated by the change of the config
+            result = parse_config(config(1))
+            assert result["/main"] == 1
+            assert 2 == len(os.listdir(tmpdir))
+
+    def test_nested_with_file_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            def config(value):
+                return {
+                    "main": {
+                        "type": "with_file_cache",
+                        "path": os.path.join(tmpdir, "main"),
+                        "config": {
+                            "type": "select",
+                            "key": "key",
+                            "options": {
+                                "key": {
+                                    "type": "with_file_cache",
+                                    "path": os.path.join(tmpdir, "sub"),
+                                    "config": {
+                                        "type": "select",
+                                        "key": "key",
+                                        "options": {"key": value}
+                                    }
+                                }
+                            }
                         }
                     }
                 }
-            }
-            result = parse_config(config)
-            assert result["/main"] == 0
+            assert 0 == parse_config(config(0))["/main"]
+            assert 2 == len(os.listdir(tmpdir))
+            assert 1 == parse_config(config(1))["/main"]
+            assert 4 == len(os.listdir(tmpdir))
+            assert 0 == parse_config(config(0))["/main"]
+            assert 4 == len(os.listdir(tmpdir))
+
+    def test_with_file_cache_with_reference(self):
+        class Parser(object):
+            def __init__(self, value):
+                self.value = value
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            def config(value):
+                return {
+                    "parser": {"type": "Parser", "value": value},
+                    "main": {
+                        "type": "with_file_cache",
+                        "path": os.path.join(tmpdir, "main"),
+                        "config": {
+                            "type": "select",
+                            "key": "key",
+                            "options": {"key": "@/parser.value"}
+                        }
+                    }
+                }
+            custom_types = {"Parser": Parser}
+            assert 0 == parse_config(config(0), custom_types)["/main"]
+            assert 1 == len(os.listdir(tmpdir))
+            # The objects created from the references do not change the digest
+            assert 0 == parse_config(config(0), custom_types)["/main"]
+            assert 1 == len(os.listdir(tmpdir))
+            # The change of the referred config changes the digest
+            assert 1 == parse_config(config(1), custom_types)["/main"]
+            assert 2 == len(os.listdir(tmpdir))
+
+
+class TestConfigDigest(object):
+    def test_happy_path(self):
+        config = {"_type": "select", "key": "key", "options": {"key": 0}}
+        assert config_digest(config, types) == config_digest(config, types)
+        assert config_digest(config, types) != \
+            config_digest({"_type": "select", "key": "key",
+                           "options": {"key": 1}}, types)
+        assert config_digest(config, types) != \
+            config_digest(config, {"select": lambda key, options: 0})
+
+    def test_reference(self):
+        root = {
+            "x": {"_type": "select", "key": "key", "options": {"key": 0}},
+            "y": {"_type": "select", "key": "key", "options": {"key": 1}},
+            "main": {"value": "@/x"},
+        }
+        digest = config_digest(root["main"], types, root, ("main",))
+        assert digest == config_digest({"value": "@/x"}, types, root, ("main",))
+        assert digest != config_digest({"value": "@/y"}, types, root, ("main",))
+
+    def test_object(self):
+        with pytest.raises(TypeError):
+            config_digest({"value": object()}, types)
 
     def test_custom_types(self):
         config = {
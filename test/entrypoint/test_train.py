@@ -9,7 +9,15 @@ from torch import nn, optim
 
 from mlprogram.builtins import Environment
 from mlprogram.entrypoint import train_REINFORCE, train_supervised
-from mlprogram.entrypoint.train import Epoch, Iteration
+from mlprogram.entrypoint.train import (
+    Epoch,
+    Iteration,
+    MicroBatchCollate,
+    accumulate_gradients,
+    create_dataloader,
+    load_lengths,
+)
+from mlprogram.nn.utils.precision import create_grad_scaler
 from mlprogram.synthesizers import Result
 from mlprogram.utils.data import Collate, CollateOptions, ListDataset
 
@@ -52,6 +60,88 @@ class MockEvaluate(object):
         report({self.key: 0.0})
 
 
+class TestCreateDataLoader(object):
+    def test_map_style_dataset(self):
+        dataset = ListDataset([0, 1, 2])
+        loader = create_dataloader(dataset, 2, 1, lambda x: x)
+        it = iter(loader)
+        batches = [next(it) for _ in range(3)]
+        assert [2, 2, 2] == [len(batch) for batch in batches]
+        assert [0, 0, 1, 1, 2, 2] == sorted(sum(batches, []))
+
+    def test_pin_memory(self):
+        dataset = ListDataset([Environment({"value": torch.tensor(0)})])
+        loader = create_dataloader(dataset, 1, 0, collate.collate,
+                                   pin_memory=True)
+        it = iter(loader)
+        assert torch.tensor([0]) == next(it)["value"]
+
+    def test_lengths(self):
+        dataset = ListDataset([0, 1, 2, 3])
+        loader = create_dataloader(dataset, 2, 0, lambda x: x,
+                                   lengths=[1, 2, 1, 2])
+        it = iter(loader)
+        batches = sorted([sorted(next(it)) for _ in range(2)])
+        assert [[0, 2], [1, 3]] == batches
+
+
+class TestLoadLengths(object):
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dataset = ListDataset(["a", "bb"])
+            assert [1, 2] == load_lengths(tmpdir, dataset, len)
+
+            def sample_length(x):
+                raise AssertionError("The lengths are recomputed")
+            assert [1, 2] == load_lengths(tmpdir, dataset, sample_length)
+
+
+class TestMicroBatchCollate(object):
+    def test_batch_size(self):
+        collate = MicroBatchCollate(lambda x: x, batch_size=2)
+        assert [(2 / 3, [0, 1]), (1 / 3, [2])] == collate([0, 1, 2])
+
+    def test_max_tokens(self):
+        collate = MicroBatchCollate(lambda x: x, max_tokens=4,
+                                    sample_length=lambda x: x)
+        assert [(0.5, [1, 2]), (0.25, [3]), (0.25, [1])] == \
+            collate([1, 2, 3, 1])
+
+
+class TestAccumulateGradients(object):
+    def test_happy_path(self):
+        torch.manual_seed(0)
+        model = nn.Linear(2, 1)
+
+        def loss(output):
+            return output["value"].sum(dim=1).mean()
+
+        samples = [Environment({"x": torch.rand(2)}) for _ in range(3)]
+
+        class Model(nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.m = model
+
+            def forward(self, env):
+                env["value"] = self.m(env["x"])
+                return env
+
+        collate = Collate(x=CollateOptions(False, 0, 0))
+        scaler = create_grad_scaler(torch.device("cpu"))
+        expected = accumulate_gradients(
+            Model(), [(1.0, collate.collate(samples))], loss,
+            torch.device("cpu"), "float32", scaler, None)
+        expected_grad = model.weight.grad.clone()
+        model.zero_grad()
+        actual = accumulate_gradients(
+            Model(),
+            MicroBatchCollate(collate.collate, batch_size=2)(samples), loss,
+            torch.device("cpu"), "float32", scaler, None)
+        assert np.allclose(expected, actual)
+        assert torch.allclose(expected_grad, model.weight.grad)
+
+
 class TestTrainSupervised(object):
     def prepare_dataset(self):
         return ListDataset([
@@ -218,6 +308,53 @@ class TestTrainSupervised(object):
             assert os.path.exists(os.path.join(output, "model.pt"))
             assert os.path.exists(os.path.join(output, "optimizer.pt"))
 
+    def test_sample_length(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ws = os.path.join(tmpdir, "ws")
+            output = os.path.join(tmpdir, "out")
+            model = self.prepare_model()
+            train_supervised(ws, output,
+                             self.prepare_dataset(),
+                             model, self.prepare_optimizer(model),
+                             self.loss_fn,
+                             MockEvaluate("key"), "key",
+                             collate.collate, 2, Epoch(2),
+                             sample_length=lambda x: 1, max_tokens=1)
+            assert os.path.exists(
+                os.path.join(ws, "snapshot_iter_6"))
+            assert os.path.exists(os.path.join(ws, "lengths-3.pt"))
+
+    def test_bfloat16(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ws = os.path.join(tmpdir, "ws")
+            output = os.path.join(tmpdir, "out")
+            model = self.prepare_model()
+            train_supervised(ws, output,
+                             self.prepare_dataset(),
+                             model, self.prepare_optimizer(model),
+                             self.loss_fn,
+                             MockEvaluate("key"), "key",
+                             collate.collate, 1, Epoch(2),
+                             precision="bfloat16")
+            assert os.path.exists(
+                os.path.join(ws, "snapshot_iter_6"))
+            assert torch.float32 == next(model.parameters()).dtype
+
+    def test_micro_batch(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ws = os.path.join(tmpdir, "ws")
+            output = os.path.join(tmpdir, "out")
+            model = self.prepare_model()
+            train_supervised(ws, output,
+                             self.prepare_dataset(),
+                             model, self.prepare_optimizer(model),
+                             self.loss_fn,
+                             MockEvaluate("key"), "key",
+                             collate.collate, 2, Epoch(2),
+                             micro_batch_size=1)
+            assert os.path.exists(
+                os.path.join(ws, "snapshot_iter_2"))
+
     def test_remove_old_snapshots(self):
         with tempfile.TemporaryDirectory() as tmpdir:
             ws = os.path.join(tmpdir, "ws")
@@ -374,6 +511,25 @@ class TestTrainREINFORCE(object):
             assert os.path.exists(
                 os.path.join(output, "optimizer.pt"))
 
+    def test_micro_batch(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ws = os.path.join(tmpdir, "ws")
+            output = os.path.join(tmpdir, "out")
+            model = self.prepare_model()
+            train_REINFORCE(output, ws, output,
+                            self.prepare_dataset(),
+                            self.prepare_synthesizer(model),
+                            model,
+                            self.prepare_optimizer(model),
+                            lambda x: self.loss_fn(x) * x["reward"],
+                            MockEvaluate("key"), "key",
+                            reward,
+                            collate.collate,
+                            1, 2, Epoch(2),
+                            micro_batch_size=1)
+            assert os.path.exists(
+                os.path.join(ws, "snapshot_iter_6"))
+
     def test_pretrained_model(self):
         with tempfile.TemporaryDirectory() as tmpdir:
             ws = os.path.join(tmpdir, "ws")
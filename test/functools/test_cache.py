@@ -1,7 +1,9 @@
 import os
 import tempfile
 
+from mlprogram.builtins import Environment
 from mlprogram.functools import file_cache
+from mlprogram.utils.data import ColumnarDataset, ListDataset
 
 
 class TestFileCache(object):
@@ -15,3 +17,18 @@ class TestFileCache(object):
             assert os.path.exists(os.path.join(tmpdir, "tmp.pt"))
             assert len(os.listdir(tmpdir)) == 1
             assert f() == 0
+
+    def test_columnar(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            @file_cache(os.path.join(tmpdir, "tmp.pt"), format="columnar")
+            def f():
+                return [Environment({"x": len(os.listdir(tmpdir))})]
+
+            assert isinstance(f(), ColumnarDataset)
+            assert [Environment({"x": 0})] == list(f())
+
+            @file_cache(os.path.join(tmpdir, "tmp2.pt"), format="columnar")
+            def g():
+                return [Environment({"x": [0]})]
+            assert isinstance(g(), ListDataset)
+            assert [Environment({"x": [0]})] == list(g())
@@ -1,5 +1,9 @@
+import pickle
 from collections import OrderedDict
 
+from torch import nn
+
+from mlprogram.builtins import Apply, Environment
 from mlprogram.functools import Compose, Map, Sequence
 
 
@@ -20,6 +24,23 @@ class TestCompose(object):
         assert f(2) is None
 
 
+class CountingEnvironment(Environment):
+    n_clone = 0
+
+    def clone(self):
+        CountingEnvironment.n_clone += 1
+        return CountingEnvironment(dict(self._values), set(self._supervisions))
+
+
+class Add1(nn.Module):
+    def forward(self, x):
+        return x + 1
+
+
+def add1_apply(key):
+    return Apply(in_keys=[key], out_key=key, module=Add1())
+
+
 def add1(x):
     return x + 1
 
@@ -41,6 +62,33 @@ class TestMap(object):
         f = Map(raise_exception)
         assert f([2]) == [None]
 
+    def test_multiprocessing_exception(self):
+        with Map(raise_exception, 1) as f:
+            assert f([2]) == [None]
+
+    def test_chunksize(self):
+        with Map(add1, 2, chunksize=3, max_pending_chunks=1) as f:
+            assert list(range(1, 11)) == f(range(10))
+            assert list(range(1, 11)) == list(f.imap(iter(range(10))))
+
+    def test_lazy_pool(self):
+        f = Map(add1, 1)
+        assert f.pool is None
+        f([0])
+        assert f.pool is not None
+        f.close()
+        assert f.pool is None
+        assert [3] == f([2])
+        f.close()
+
+    def test_pickle(self):
+        with Map(add1, 1) as f:
+            f([0])
+            g = pickle.loads(pickle.dumps(f))
+            assert g.pool is None
+            assert [3] == g([2])
+            g.close()
+
 
 class TestSequence(object):
     def test_happy_path(self):
@@ -52,3 +100,36 @@ class TestSequence(object):
         f = Sequence(OrderedDict([("f0", lambda x: None),
                                   ("f1", lambda x: {"x": x["x"] * 2})]))
         assert f({"x": 2}) is None
+
+
+class TestPipeline(object):
+    def test_clone_once(self):
+        f = Sequence(OrderedDict([
+            ("f0", add1_apply("x")),
+            ("f1", Compose(OrderedDict([("g0", add1_apply("x")),
+                                        ("g1", add1_apply("x"))]))),
+            ("f2", add1_apply("x")),
+        ]))
+        entry = CountingEnvironment({"x": 0})
+        CountingEnvironment.n_clone = 0
+        assert Environment({"x": 4}) == f(entry)
+        assert 1 == CountingEnvironment.n_clone
+        assert Environment({"x": 0}) == entry
+
+    def test_clone_after_other_function(self):
+        held = []
+
+        def hold(entry):
+            held.append(entry)
+            return entry
+
+        f = Sequence(OrderedDict([
+            ("f0", add1_apply("x")),
+            ("f1", hold),
+            ("f2", add1_apply("x")),
+        ]))
+        entry = CountingEnvironment({"x": 0})
+        CountingEnvironment.n_clone = 0
+        assert Environment({"x": 2}) == f(entry)
+        assert 2 == CountingEnvironment.n_clone
+        assert [Environment({"x": 1})] == held
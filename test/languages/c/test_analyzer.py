@@ -1,3 +1,7 @@
+import os
+import pickle
+import tempfile
+
 from mlprogram.languages.c import Analyzer
 
 
@@ -17,3 +21,65 @@ class TestAnalyzer(object):
     def test_errors(self):
         analyzer = Analyzer()
         assert 2 == len(analyzer("b = 0;\nint a = 0"))
+
+
+def create_clang(tmpdir):
+    # A fake clang that reports one error per line and counts the calls
+    path = os.path.join(tmpdir, "clang")
+    with open(path, "w") as file:
+        file.write(f"""#!/bin/sh
+echo x >> {tmpdir}/calls
+n=0
+while read -r line; do
+    n=$((n+1))
+    echo "<stdin>:$n:1: error: $line" >&2
+done
+""")
+    os.chmod(path, 0o755)
+    return path
+
+
+def n_call(tmpdir):
+    path = os.path.join(tmpdir, "calls")
+    if not os.path.exists(path):
+        return 0
+    with open(path) as file:
+        return len(file.readlines())
+
+
+class TestCachedAnalyzer(object):
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            analyzer = Analyzer(create_clang(tmpdir))
+            assert ["<stdin>:1:1: error: x"] == analyzer("x\n")
+            assert ["<stdin>:1:1: error: x"] == analyzer("x\n")
+            assert 1 == n_call(tmpdir)
+
+    def test_cache_size(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            analyzer = Analyzer(create_clang(tmpdir), cache_size=1)
+            analyzer("x\n")
+            analyzer("y\n")
+            analyzer("x\n")
+            assert 3 == n_call(tmpdir)
+
+    def test_disk_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            clang = create_clang(tmpdir)
+            cache_dir = os.path.join(tmpdir, "cache")
+            Analyzer(clang, cache_dir=cache_dir)("x\n")
+            analyzer = pickle.loads(
+                pickle.dumps(Analyzer(clang, cache_dir=cache_dir)))
+            assert ["<stdin>:1:1: error: x"] == analyzer("x\n")
+            assert 1 == n_call(tmpdir)
+
+    def test_analyze_all(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            analyzer = Analyzer(create_clang(tmpdir), n_worker=2)
+            assert [
+                ["<stdin>:1:1: error: x"],
+                ["<stdin>:1:1: error: x", "<stdin>:2:1: error: y"],
+                ["<stdin>:1:1: error: x"],
+                [],
+            ] == analyzer.analyze_all(["x\n", "x\ny\n", "x\n", ""])
+            assert 3 == n_call(tmpdir)
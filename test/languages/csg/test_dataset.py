@@ -1,6 +1,7 @@
 import numpy as np
 import torch
 
+from mlprogram import distributed
 from mlprogram.languages.csg import Dataset
 
 
@@ -10,6 +11,26 @@ class TestDataset(object):
         for x in dataset:
             break
 
+    def sample(self, dataset, n):
+        it = iter(dataset)
+        return [next(it)["ground_truth"] for _ in range(n)]
+
+    def test_seed(self):
+        assert self.sample(Dataset(2, 1, 2, 1, 45, seed=0), 10) == \
+            self.sample(Dataset(2, 1, 2, 1, 45, seed=0), 10)
+
+    def test_reshuffle(self):
+        dataset = Dataset(2, 1, 2, 1, 45, seed=0)
+        assert self.sample(dataset, 10) != self.sample(dataset, 10)
+
+    def test_shard_by_rank(self, monkeypatch):
+        monkeypatch.setattr(distributed, "size", lambda: 2)
+        samples = []
+        for rank in range(2):
+            monkeypatch.setattr(distributed, "rank", lambda: rank)
+            samples.append(self.sample(Dataset(2, 1, 2, 1, 45, seed=0), 10))
+        assert samples[0] != samples[1]
+
     def test_multiprocess_loader(self):
         torch.manual_seed(0)
         np.random.seed(0)
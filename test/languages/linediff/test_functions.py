@@ -6,6 +6,7 @@ from mlprogram.languages.linediff import (
     Expander,
     Interpreter,
     IsSubtype,
+    Program,
     Remove,
     Replace,
     ToEpisode,
@@ -36,8 +37,10 @@ class TestToEpisode(object):
             set(["ground_truth"])
         ))
         assert len(episode) == 2
-        assert episode[0]["interpreter_state"].context == ["xxx\nyyy"]
-        assert episode[1]["interpreter_state"].context == ["zzz\nyyy"]
+        assert episode[0]["interpreter_state"].context == \
+            [Program.from_text("xxx\nyyy")]
+        assert episode[1]["interpreter_state"].context == \
+            [Program.from_text("zzz\nyyy")]
 
 
 class TestAddTestCases(object):
@@ -57,3 +60,6 @@ class TestUpdateInput(object):
         state = BatchedState({}, {Diff([]): ["foo"]}, [Diff([])], ["foo"])
         entry = f(Environment({"interpreter_state": state}))
         assert entry["code"] == "foo"
+        state = BatchedState({}, {}, [], [Program.from_text("xxx\nyyy")])
+        entry = f(Environment({"interpreter_state": state}))
+        assert entry["code"] == "xxx\nyyy"
@@ -1,5 +1,16 @@
+import gc
+import pickle
+import weakref
+
 from mlprogram.languages import BatchedState
-from mlprogram.languages.linediff import Diff, Insert, Interpreter, Remove, Replace
+from mlprogram.languages.linediff import (
+    Diff,
+    Insert,
+    Interpreter,
+    Program,
+    Remove,
+    Replace,
+)
 
 
 class TestInterpreter(object):
@@ -18,6 +29,16 @@ class TestInterpreter(object):
             Diff([Insert(0, "foo"), Replace(1, "test")]), ["bar\nhoge"]
         ) == ["foo\ntest\nhoge"]
 
+    def test_eval_program(self):
+        interpreter = Interpreter()
+        assert interpreter.eval(Insert(0, "foo"),
+                                [Program.from_text("bar\nhoge")]) == \
+            ["foo\nbar\nhoge"]
+
+    def test_create_state(self):
+        state = Interpreter().create_state(["bar\nhoge"])
+        assert state.context == [Program(("bar", "hoge"))]
+
     def test_execute(self):
         ref0 = Insert(0, "foo")
         ref1 = Replace(1, "test")
@@ -28,12 +49,51 @@ class TestInterpreter(object):
         assert state.history == [ref0]
         assert set(state.environment.keys()) == set([ref0])
         assert state.type_environment[ref0] == "Insert"
-        assert state.environment[ref0][0] == "foo\nbar\nhoge"
-        assert state.context[0] == "foo\nbar\nhoge"
+        assert str(state.environment[ref0][0]) == "foo\nbar\nhoge"
+        assert str(state.context[0]) == "foo\nbar\nhoge"
 
         state = interpreter.execute(ref1, state)
         assert state.history == [ref0, ref1]
         assert set(state.environment.keys()) == set([ref1])
         assert state.type_environment[ref1] == "Replace"
-        assert state.environment[ref1][0] == "foo\ntest\nhoge"
-        assert state.context[0] == "foo\ntest\nhoge"
+        assert str(state.environment[ref1][0]) == "foo\ntest\nhoge"
+        assert str(state.context[0]) == "foo\ntest\nhoge"
+
+
+class TestProgram(object):
+    def test_apply(self):
+        program = Program.from_text("bar\nhoge")
+        assert program.apply(Insert(1, "foo")).lines == ("bar", "foo", "hoge")
+        assert program.apply(Remove(0)).lines == ("hoge",)
+        assert program.apply(Replace(1, "foo")).lines == ("bar", "foo")
+        assert program.apply(Replace(2, "foo")).lines == ("bar", "hoge")
+
+    def test_share_lines(self):
+        program = Program.from_text("bar\nhoge")
+        next = program.apply(Insert(0, "foo"))
+        assert next.lines[1] is program.lines[0]
+        assert next.text == "foo\nbar\nhoge"
+
+    def test_cache(self):
+        program = Program.from_text("bar\nhoge")
+        assert program.apply(Remove(0)) is program.apply(Remove(0))
+
+    def test_cache_does_not_keep_programs(self):
+        program = Program.from_text("bar\nhoge")
+        next = weakref.ref(program.apply(Remove(0)))
+        gc.collect()
+        assert next() is None
+
+    def test_pickle(self):
+        program = Program.from_text("bar\nhoge")
+        next = program.apply(Remove(0))
+        loaded = pickle.loads(pickle.dumps(program))
+        assert loaded == program
+        assert len(pickle.dumps(program)) < \
+            len(pickle.dumps((program, next)))
+        assert loaded.apply(Remove(0)) == next
+
+    def test_eq(self):
+        assert Program(("foo",)) == Program.from_text("foo")
+        assert hash(Program(("foo",))) == hash(Program.from_text("foo"))
+        assert Program(("foo",)) != "foo"
@@ -55,6 +55,15 @@ class TestLexerWithLineNumber(object):
         ]
         assert lexer.tokenize("") is None
 
+    def test_tokenize_lines(self):
+        lexer = LexerWithLineNumber(MockLexer())
+        for text in ["foo bar", "foo\nbar", "foo\nbar\n", "foo\n\nbar"]:
+            lines = text.split("\n")
+            if text.endswith("\n"):
+                lines.pop()
+            assert lexer.tokenize_with_offset(text) == \
+                lexer.tokenize_lines(lines)
+
     def test_untokenize(self):
         lexer = LexerWithLineNumber(MockLexer())
         assert lexer.untokenize(lexer.tokenize("foo bar")) == "foo bar\n"
@@ -5,7 +5,11 @@ from mlprogram.metrics import ErrorCorrectRate
 
 
 class MockAnalyzer(Analyzer):
+    def __init__(self):
+        self.n_call = 0
+
     def __call__(self, value):
+        self.n_call += 1
         return list(value)
 
 
@@ -38,3 +42,12 @@ class TestErrorCorrectRate(object):
         assert np.allclose(
             0.0,
             acc(test_cases=[("", None)], actual="foobar"))
+
+    def test_reuse_original_errors(self):
+        analyzer = MockAnalyzer()
+        acc = ErrorCorrectRate(analyzer, MockInterpreter())
+        acc(test_cases=[("foo", None)], actual="")
+        acc(test_cases=[("foo", None)], actual="f")
+        assert 3 == analyzer.n_call
+        acc(test_cases=[("bar", None)], actual="")
+        assert 5 == analyzer.n_call
@@ -2,6 +2,7 @@ import numpy as np
 import torch
 
 from mlprogram.nn.action_sequence import Predictor
+from mlprogram.nn.utils.precision import autocast
 from mlprogram.nn.utils.rnn import pad_sequence
 
 
@@ -37,6 +38,18 @@ class TestPredictor(object):
         assert (11, 1, 13) == reference.data.shape
         assert (11, 1) == reference.mask.shape
 
+    def test_autocast(self):
+        predictor = Predictor(2, 3, 5, 7, 11)
+        f = torch.rand(11, 2)
+        nl = torch.rand(13, 3)
+        with autocast(torch.device("cpu"), "bfloat16"):
+            rule, token, reference = predictor(
+                reference_features=pad_sequence([nl]),
+                action_features=pad_sequence([f]))
+        assert torch.float32 == rule.data.dtype
+        assert torch.float32 == token.data.dtype
+        assert torch.float32 == reference.data.dtype
+
     def test_shape_eval(self):
         predictor = Predictor(2, 3, 5, 7, 11)
         f = torch.Tensor(11, 2)
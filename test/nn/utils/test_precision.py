@@ -0,0 +1,27 @@
+import torch
+from torch import nn
+
+from mlprogram.nn.utils.precision import autocast, create_grad_scaler
+
+
+class TestAutocast(object):
+    def test_float32(self):
+        with autocast(torch.device("cpu"), "float32"):
+            y = nn.Linear(2, 3)(torch.rand(1, 2))
+        assert torch.float32 == y.dtype
+
+    def test_bfloat16(self):
+        with autocast(torch.device("cpu"), "bfloat16"):
+            y = nn.Linear(2, 3)(torch.rand(1, 2))
+        assert torch.bfloat16 == y.dtype
+
+    def test_float16_on_cpu(self):
+        with autocast(torch.device("cpu"), "float16"):
+            y = nn.Linear(2, 3)(torch.rand(1, 2))
+        assert torch.bfloat16 == y.dtype
+
+
+class TestCreateGradScaler(object):
+    def test_cpu(self):
+        scaler = create_grad_scaler(torch.device("cpu"), "float16")
+        assert not scaler.is_enabled()
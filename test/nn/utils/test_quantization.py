@@ -0,0 +1,37 @@
+import torch
+from torch import nn
+
+from mlprogram.nn.action_sequence import CatInput, LSTMDecoder, Predictor
+from mlprogram.nn.utils.quantization import quantize_dynamic_
+from mlprogram.nn.utils.rnn import pad_sequence
+
+
+class Module(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.decoder = LSTMDecoder(CatInput(), 3, 5, 7)
+        self.predictor = Predictor(7, 3, 11, 13, 17)
+
+    def forward(self, input, action, reference):
+        output, _, _ = self.decoder(input, action, None, None)
+        return self.predictor(reference, output)
+
+
+class TestQuantizeDynamic(object):
+    def test_happy_path(self):
+        torch.manual_seed(0)
+        module = Module()
+        input = torch.rand(2, 3)
+        action = pad_sequence([torch.rand(4, 5), torch.rand(4, 5)])
+        reference = pad_sequence([torch.rand(6, 3), torch.rand(6, 3)])
+        module.eval()
+        with torch.no_grad():
+            expected = module(input, action, reference)
+
+        assert module is quantize_dynamic_(module)
+        assert not isinstance(module.decoder.lstm, nn.LSTMCell)
+        assert not isinstance(module.predictor.rule, nn.Linear)
+        with torch.no_grad():
+            actual = module(input, action, reference)
+        for e, a in zip(expected, actual):
+            assert torch.allclose(e, a, atol=1e-2)
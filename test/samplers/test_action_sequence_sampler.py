@@ -5,7 +5,12 @@ import numpy as np
 import torch
 import torch.nn as nn
 
-from mlprogram.actions import ExpandTreeRule, NodeConstraint, NodeType
+from mlprogram.actions import (
+    ActionSequence,
+    ExpandTreeRule,
+    NodeConstraint,
+    NodeType,
+)
 from mlprogram.builtins import Environment
 from mlprogram.encoders import ActionSequenceEncoder, Samples
 from mlprogram.languages import Root, Token
@@ -76,9 +81,10 @@ class DecoderModule(nn.Module):
 
     def forward(self, env):
         length = env["length"][0] - 1
-        env["rule_probs"] = self.rule_prob[length]
-        env["token_probs"] = self.token_prob[length]
-        env["reference_probs"] = self.reference_prob[length]
+        n = env["length"].shape[0]
+        env["rule_probs"] = self.rule_prob[length].repeat(n, 1)
+        env["token_probs"] = self.token_prob[length].repeat(n, 1)
+        env["reference_probs"] = self.reference_prob[length].repeat(n, 1)
         return env
 
 
@@ -133,8 +139,12 @@ class TestActionSequenceSampler(object):
                    DecoderModule(rule_prob, token_prob, reference_prob))
         )
         s = SamplerState(0.0, sampler.initialize(Environment()))
+        assert {"n_instantiated_action_sequence": 0,
+                "n_instantiated_action": 0} == sampler.statistics()
         topk_results = list(sampler.top_k_samples([s], 1))
         assert 1 == len(topk_results)
+        assert {"n_instantiated_action_sequence": 1,
+                "n_instantiated_action": 2} == sampler.statistics()
         assert 1 == topk_results[0].state.state["length"].item()
         assert np.allclose(log(0.2), topk_results[0].state.score)
         random_results = list(sampler.batch_k_samples([s], [1]))
@@ -151,12 +161,58 @@ class TestActionSequenceSampler(object):
         assert 1 == all_results[0].state.state["length"].item()
         assert \
             log(0.1) - 1e-5 <= all_results[0].state.score <= log(0.2) + 1e-5
+        per_state_results = sampler.all_samples_per_state([s])
+        assert 1 == len(per_state_results)
+        assert 2 == len(per_state_results[0])
+        assert np.allclose(log(0.2), per_state_results[0][0].state.score)
+        assert np.allclose(log(0.1), per_state_results[0][1].state.score)
+
+        finished = SamplerState(0.0, s.state.clone())
+        finished.state["action_sequence"] = ActionSequence()
+        s2 = SamplerState(1.0, s.state.clone())
+        per_state_results = sampler.all_samples_per_state([s, finished, s2])
+        assert 3 == len(per_state_results)
+        assert 2 == len(per_state_results[0])
+        assert np.allclose(log(0.2), per_state_results[0][0].state.score)
+        assert np.allclose(log(0.1), per_state_results[0][1].state.score)
+        assert [] == per_state_results[1]
+        assert 2 == len(per_state_results[2])
+        assert np.allclose(1.0 + log(0.2),
+                           per_state_results[2][0].state.score)
+        assert np.allclose(1.0 + log(0.1),
+                           per_state_results[2][1].state.score)
+        assert isinstance(
+            per_state_results[2][0].state.state["action_sequence"],
+            ActionSequence)
 
         next = list(sampler.top_k_samples(
             [s.state for s in topk_results], 1))[0]
         assert 2 == next.state.state["length"].item()
         assert np.allclose(log(0.2) + log(0.5), next.state.score)
 
+    def test_precision(self):
+        class AutocastDecoderModule(DecoderModule):
+            def forward(self, env):
+                assert torch.is_autocast_cpu_enabled()
+                return super().forward(env)
+
+        rule_prob = torch.tensor([[[1.0, 1.0, 0.2, 0.1, 1.0, 1.0]]])
+        token_prob = torch.tensor([[[]]])
+        reference_prob = torch.tensor([[[]]])
+        sampler = ActionSequenceSampler(
+            create_encoder(),
+            is_subtype,
+            create_transform_input([]), transform_action_sequence,
+            collate,
+            Module(encoder_module,
+                   AutocastDecoderModule(rule_prob, token_prob,
+                                         reference_prob)),
+            precision="bfloat16"
+        )
+        s = SamplerState(0.0, sampler.initialize(Environment()))
+        topk_results = list(sampler.top_k_samples([s], 1))
+        assert np.allclose(log(0.2), topk_results[0].state.score)
+
     def test_variadic_rule(self):
         rule_prob = torch.tensor([
             [[
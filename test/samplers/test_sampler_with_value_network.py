@@ -25,16 +25,24 @@ class MockSampler(Sampler[int, int, str]):
 
 
 class MockValueNetwork(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes: List[int] = []
+
     def forward(self, state: Environment) -> torch.Tensor:
+        self.batch_sizes.append(state["x"].shape[0])
         return state["x"]
 
 
+def transform(state: str) -> Environment:
+    return Environment({"x": torch.tensor([int(state)])})
+
+
+collate = Collate(x=CollateOptions(False, 0, 0))
+
+
 class TestSamplerWithValueNetwork(object):
     def test_rescore(self):
-        def transform(state: str) -> Environment:
-            return Environment({"x": torch.tensor([int(state)])})
-
-        collate = Collate(x=CollateOptions(False, 0, 0))
         sampler = SamplerWithValueNetwork(MockSampler(), transform, collate,
                                           MockValueNetwork())
         zero = SamplerState(0, sampler.initialize(0))
@@ -43,3 +51,30 @@ class TestSamplerWithValueNetwork(object):
                 DuplicatedSamplerState(SamplerState(1, "01"), 1),
                 DuplicatedSamplerState(SamplerState(2, "02"), 1)
                 ] == samples
+
+    def test_batch(self):
+        value_network = MockValueNetwork()
+        sampler = SamplerWithValueNetwork(MockSampler(), transform, collate,
+                                          value_network, batch_size=2)
+        zero = SamplerState(0, sampler.initialize(0))
+        samples = list(sampler.batch_k_samples([zero], [3]))
+        assert [0, 1, 2] == [sample.state.score for sample in samples]
+        assert [2, 1] == value_network.batch_sizes
+
+    def test_cache(self):
+        value_network = MockValueNetwork()
+        sampler = SamplerWithValueNetwork(MockSampler(), transform, collate,
+                                          value_network, batch_size=10,
+                                          to_key=lambda x: x)
+        zero = SamplerState(0, sampler.initialize(0))
+        samples = list(sampler.batch_k_samples([zero, zero], [4, 4]))
+        assert [0, 1, 0, 1] == [sample.state.score for sample in samples]
+        assert [2] == value_network.batch_sizes
+        samples = list(sampler.batch_k_samples([zero], [3]))
+        assert [0, 1, 2] == [sample.state.score for sample in samples]
+        assert [2, 1] == value_network.batch_sizes
+
+        # The cache is cleared by initialize
+        sampler.initialize(0)
+        list(sampler.batch_k_samples([zero], [1]))
+        assert [2, 1, 1] == value_network.batch_sizes
@@ -131,3 +131,21 @@ class TestSequentialProgramSampler(object):
                     )
                 })),
             1) == samples[2]
+
+    def test_n_worker(self):
+        asts = ["c0", "c1", "c2"]
+        samples = []
+        for n_worker in [0, 2]:
+            sampler = SequentialProgramSampler(
+                MockSynthesizer(asts),
+                transform_input,
+                Collate(),
+                MockEncoder(),
+                MockExpander(),
+                MockInterpreter(),
+                n_worker=n_worker)
+            zero = SamplerState(0, sampler.initialize([(None, None)]))
+            samples.append(list(sampler.batch_k_samples([zero, zero],
+                                                        [2, 3])))
+        assert 5 == len(samples[0])
+        assert samples[0] == samples[1]
@@ -61,3 +61,9 @@ class TestBeamSearch(object):
         decoder = MockBeamSearch(3, 2)
         results = list(decoder("".join([" "] * 100)))
         assert [Result("0", -1.0, True, 1)] == results
+
+    def test_statistics(self):
+        decoder = MockBeamSearch(3, 100)
+        assert {} == decoder.statistics()
+        decoder.sampler.statistics = lambda: {"n_instantiated_action": 1}
+        assert {"n_instantiated_action": 1} == decoder.statistics()
@@ -1,3 +1,4 @@
+import sys
 from typing import List, Tuple
 
 from mlprogram.samplers import DuplicatedSamplerState, Sampler, SamplerState
@@ -5,8 +6,10 @@ from mlprogram.synthesizers import DFS, Result
 
 
 class MockSampler(Sampler[str, str, Tuple[str, List[int]]]):
-    def __init__(self, finish: bool = True):
+    def __init__(self, finish: bool = True, n_digit: int = 3):
         self.finish = finish
+        self.n_digit = n_digit
+        self.n_batch_call = 0
 
     def initialize(self, input: str) -> Tuple[str, List[int]]:
         return (input, [])
@@ -22,12 +25,37 @@ class MockSampler(Sampler[str, str, Tuple[str, List[int]]]):
                     sorted: bool = True):
         for s in states:
             elems = len(s.state[1])
-            for i in range(3 - elems):
+            for i in range(max(self.n_digit - elems, 0)):
                 yield DuplicatedSamplerState(
-                    SamplerState(s.score + (3 - i),
+                    SamplerState(s.score + (self.n_digit - i),
                                  (s.state[0], s.state[1] + [i])),
                     1)
 
+    def all_samples_per_state(
+            self, states: List[SamplerState[Tuple[str, List[int]]]],
+            sorted: bool = True):
+        self.n_batch_call += 1
+        return [list(self.all_samples([s], sorted)) for s in states]
+
+
+class ChainSampler(Sampler[str, str, int]):
+    def __init__(self, depth: int):
+        self.depth = depth
+
+    def initialize(self, input: str) -> int:
+        return 0
+
+    def create_output(self, input, state: int):
+        if state != self.depth:
+            return None
+        return "1" * state, True
+
+    def all_samples(self, states: List[SamplerState[int]],
+                    sorted: bool = True):
+        for s in states:
+            yield DuplicatedSamplerState(
+                SamplerState(s.score + 1, s.state + 1), 1)
+
 
 class TestDFS(object):
     def test_happy_path(self):
@@ -39,3 +67,40 @@ class TestDFS(object):
             Result("110", 7.0, True, 1),
             Result("20", 4.0, True, 1),
             Result("210", 6.0, True, 1)]
+
+    def test_batch_size(self):
+        sampler = MockSampler()
+        decoder = DFS(sampler, batch_size=4)
+        results = list(decoder("x0"))
+        assert results == [
+            Result("0", 3.0, True, 1),
+            Result("10", 5.0, True, 1),
+            Result("110", 7.0, True, 1),
+            Result("20", 4.0, True, 1),
+            Result("210", 6.0, True, 1)]
+        assert sampler.n_batch_call == 4
+
+    def test_max_step_size(self):
+        decoder = DFS(MockSampler(finish=False), max_step_size=2)
+        results = list(decoder("x0"))
+        assert results == [
+            Result("0", 3.0, False, 1),
+            Result("00", 6.0, True, 1),
+            Result("01", 5.0, True, 1),
+            Result("10", 5.0, True, 1),
+            Result("20", 4.0, True, 1)]
+
+    def test_prune(self):
+        decoder = DFS(MockSampler(),
+                      prune=lambda input, state: 1 in state.state[1])
+        results = list(decoder("x0"))
+        assert results == [
+            Result("0", 3.0, True, 1),
+            Result("20", 4.0, True, 1)]
+
+    def test_long_program(self):
+        depth = sys.getrecursionlimit() + 1000
+        for batch_size in [1, 2]:
+            decoder = DFS(ChainSampler(depth), batch_size=batch_size)
+            results = list(decoder("x0"))
+            assert results == [Result("1" * depth, float(depth), True, 1)]
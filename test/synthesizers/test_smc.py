@@ -3,14 +3,17 @@ from typing import List, Optional, Tuple
 import numpy as np
 import timeout_decorator
 
+from mlprogram.deadline import Deadline, activate
 from mlprogram.samplers import DuplicatedSamplerState, Sampler, SamplerState
 from mlprogram.synthesizers import SMC
+from mlprogram.synthesizers.smc import multinomial, stratified, systematic
 
 
 class MockSampler(Sampler[str, str, Tuple[str, str]]):
     def __init__(self, rng, finish: bool = False):
         self.rng = rng
         self.finish = finish
+        self.initial_ks: List[int] = []
 
     def initialize(self, input: str) -> Tuple[str, str]:
         return (input, "")
@@ -24,6 +27,8 @@ class MockSampler(Sampler[str, str, Tuple[str, str]]):
 
     def batch_k_samples(self, states: List[SamplerState[Tuple[str, str]]],
                         ks: List[int]):
+        if len(states) == 1 and states[0].state[1] == "":
+            self.initial_ks.append(ks[0])
         for state, k in zip(states, ks):
             elems = len(state.state[1])
             if len(state.state[0]) > elems:
@@ -42,10 +47,10 @@ class MockSampler(Sampler[str, str, Tuple[str, str]]):
 class MockSMC(SMC[str, str, Tuple[str, str], str]):
     def __init__(self, max_step_size: int, max_try_num: int,
                  initial_particle: int, rng: np.random.RandomState,
-                 finish: bool = False):
+                 finish: bool = False, resampling: str = "multinomial"):
         super().__init__(max_step_size, initial_particle,
                          MockSampler(rng, finish), rng=rng,
-                         max_try_num=max_try_num)
+                         max_try_num=max_try_num, resampling=resampling)
 
 
 class TestSMC(object):
@@ -68,3 +73,48 @@ class TestSMC(object):
                 for result in decoder("x0", n_required_output=10)])
             assert "x0" in results
         f()
+
+    def test_max_try_num(self):
+        decoder = MockSMC(3, 4, 10, np.random.RandomState(0))
+        list(decoder("x0"))
+        assert decoder.sampler.initial_ks == [10, 20, 40, 80]
+
+    def test_deadline(self):
+        decoder = MockSMC(3, 10, 10, np.random.RandomState(0))
+        with activate(Deadline(0)):
+            results = list(decoder("x0"))
+        assert results == []
+
+    def test_resampling(self):
+        for resampling in ["systematic", "stratified"]:
+            decoder = MockSMC(3, 10, 10, np.random.RandomState(0),
+                              resampling=resampling)
+            results = set([result.output for result in decoder("x0")])
+            assert "x0" in results
+
+
+class TestResampling(object):
+    def test_multinomial(self):
+        probs = np.array([0.1, 0.2, 0.7])
+        resampled = multinomial(100, probs, np.random.RandomState(0))
+        assert resampled.shape == (3,)
+        assert resampled.sum() == 100
+
+    def test_systematic(self):
+        probs = np.array([0.1, 0.2, 0.0, 0.7])
+        rng = np.random.RandomState(0)
+        for _ in range(10):
+            resampled = systematic(100, probs, rng)
+            assert resampled.sum() == 100
+            assert np.all(np.abs(resampled - 100 * probs) <= 1)
+            assert resampled[2] == 0
+        assert systematic(10 ** 12, probs, rng).sum() == 10 ** 12
+
+    def test_stratified(self):
+        probs = np.array([0.1, 0.2, 0.0, 0.7])
+        rng = np.random.RandomState(0)
+        for _ in range(10):
+            resampled = stratified(100, probs, rng)
+            assert resampled.sum() == 100
+            assert np.all(np.abs(resampled - 100 * probs) <= 2)
+            assert resampled[2] == 0
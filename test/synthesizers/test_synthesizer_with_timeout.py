@@ -1,6 +1,7 @@
 import time
 from typing import Any, Dict, List
 
+from mlprogram.deadline import is_expired
 from mlprogram.synthesizers import Result, Synthesizer, SynthesizerWithTimeout
 
 
@@ -14,6 +15,17 @@ class MockSynthesizer(Synthesizer[Dict[str, Any], int]):
             yield Result(value, 1.0 / (i + 1), True, 1)
 
 
+class MockCooperativeSynthesizer(Synthesizer[Dict[str, Any], int]):
+    def __call__(self, input: Dict[str, Any], n_required_output=None):
+        yield Result(0, 1.0, True, 1)
+        # Slow step that checks the deadline
+        for _ in range(200):
+            if is_expired():
+                return
+            time.sleep(0.01)
+        yield Result(1, 1.0, True, 1)
+
+
 class TestFilteredSynthesizer(object):
     def test_timeout(self):
         synthesizer = SynthesizerWithTimeout(
@@ -22,3 +34,11 @@ class TestFilteredSynthesizer(object):
         candidates = list(synthesizer({"input": [0]}))
         assert 1 == len(candidates)
         assert 0.3 == candidates[0].output
+
+    def test_cooperative_timeout(self):
+        synthesizer = SynthesizerWithTimeout(MockCooperativeSynthesizer(), 0.1)
+        begin = time.time()
+        candidates = list(synthesizer({"input": [0]}))
+        assert time.time() - begin < 1.0
+        assert 1 == len(candidates)
+        assert 0 == candidates[0].output
@@ -0,0 +1,43 @@
+import time
+
+from mlprogram.deadline import (
+    Deadline,
+    activate,
+    current,
+    is_expired,
+    run_with_deadline,
+)
+
+
+class TestDeadline(object):
+    def test_happy_path(self):
+        assert not Deadline().is_expired()
+        assert Deadline().remaining() is None
+        assert Deadline(0).is_expired()
+        assert 0 < Deadline(10).remaining() <= 10
+
+    def test_activate(self):
+        assert not is_expired()
+        with activate(Deadline(0)):
+            assert is_expired()
+            # The outer deadline is nearer than the inner one
+            with activate(Deadline(10)):
+                assert is_expired()
+        assert not is_expired()
+        assert current().end is None
+
+    def test_run_with_deadline(self):
+        def f():
+            while True:
+                yield is_expired()
+                time.sleep(0.1)
+
+        deadline = Deadline(0.15)
+        values = []
+        for value in run_with_deadline(deadline, f()):
+            values.append(value)
+            # The deadline is not active outside of the generator
+            assert not is_expired()
+            if deadline.is_expired():
+                break
+        assert values == [False, False, True]
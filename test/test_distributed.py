@@ -0,0 +1,87 @@
+import tempfile
+
+import torch
+from torch import nn
+
+from mlprogram import distributed
+
+
+def _reduce(rank: int, tmpdir: str, bucket_size: int, use_all: bool) -> None:
+    distributed.initialize(tmpdir, rank=rank, world_size=2)
+    torch.manual_seed(0)
+    model = nn.Sequential(nn.Linear(2, 3), nn.Linear(3, 1), nn.Linear(1, 1))
+    reducer = distributed.GradientReducer(
+        model, distributed.groups["world_gloo"], bucket_size=bucket_size)
+
+    for step in range(2):
+        x = torch.full((1, 2), float(rank + step))
+        model.zero_grad()
+        if use_all:
+            y = model(x)
+        else:
+            y = model[1](model[0](x))
+        y.sum().backward()
+        reducer.synchronize()
+
+        # Compute the expected gradients
+        expected = nn.Sequential(nn.Linear(2, 3), nn.Linear(3, 1),
+                                 nn.Linear(1, 1))
+        expected.load_state_dict(model.state_dict())
+        for r in range(2):
+            x = torch.full((1, 2), float(r + step))
+            if use_all:
+                y = expected(x)
+            else:
+                y = expected[1](expected[0](x))
+            (y.sum() / 2).backward()
+        for p, q in zip(model.parameters(), expected.parameters()):
+            if q.grad is None:
+                q.grad = torch.zeros_like(q)
+            assert torch.allclose(p.grad, q.grad)
+
+
+def _accumulate(rank: int, tmpdir: str) -> None:
+    distributed.initialize(tmpdir, rank=rank, world_size=2)
+    torch.manual_seed(0)
+    model = nn.Linear(2, 1)
+    reducer = distributed.GradientReducer(
+        model, distributed.groups["world_gloo"])
+    xs = [torch.full((1, 2), float(rank * 2 + i)) for i in range(2)]
+
+    model.zero_grad()
+    with reducer.no_sync():
+        model(xs[0]).sum().backward()
+    model(xs[1]).sum().backward()
+    reducer.synchronize()
+
+    expected = nn.Linear(2, 1)
+    expected.load_state_dict(model.state_dict())
+    for r in range(2):
+        for i in range(2):
+            (expected(torch.full((1, 2), float(r * 2 + i))).sum() / 2) \
+                .backward()
+    for p, q in zip(model.parameters(), expected.parameters()):
+        assert torch.allclose(p.grad, q.grad)
+
+
+def _spawn(bucket_size: int, use_all: bool) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        torch.multiprocessing.start_processes(
+            _reduce, args=(tmpdir, bucket_size, use_all), nprocs=2,
+            start_method="fork")
+
+
+class TestGradientReducer(object):
+    def test_happy_path(self):
+        _spawn(25 * 1024 * 1024, True)
+
+    def test_multiple_buckets(self):
+        _spawn(16, True)
+
+    def test_unused_parameters(self):
+        _spawn(16, False)
+
+    def test_no_sync(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            torch.multiprocessing.start_processes(
+                _accumulate, args=(tmpdir,), nprocs=2, start_method="fork")
@@ -1,3 +1,4 @@
+import json
 import os
 import tempfile
 
@@ -6,73 +7,89 @@ import pytorch_pfn_extras as ppe
 import torch
 import torch.nn as nn
 
-from mlprogram.pytorch_pfn_extras import SaveTopKModel, StopByThreshold
+from mlprogram.pytorch_pfn_extras import (
+    SaveTopKModel,
+    StopByThreshold,
+    load_scores,
+    score_index_path,
+)
 
 
 class TestSaveTopKModel(object):
     def test_simple_case(self):
         model = nn.Linear(1, 1)
         with tempfile.TemporaryDirectory() as tmpdir:
+            model_dir = os.path.join(tmpdir, "model")
             manager = ppe.training.ExtensionsManager(
                 {}, {}, 1,
                 out_dir=tmpdir,
                 extensions=[],
                 iters_per_epoch=1,
             )
-            topk = SaveTopKModel(tmpdir, 2, "score", model)
+            topk = SaveTopKModel(model_dir, 2, "score", model)
             with manager.run_iteration():
                 ppe.reporting.report({"score": 1.0})
                 topk(manager)
-            assert ["model_0.pt"] == os.listdir(tmpdir)
+            topk.wait()
+            assert ["model_0.pt"] == os.listdir(model_dir)
 
             with manager.run_iteration():
                 ppe.reporting.report({"score": 2.0})
                 topk(manager)
-            assert ["model_0.pt", "model_1.pt"] == sorted(os.listdir(tmpdir))
+            topk.wait()
+            assert ["model_0.pt", "model_1.pt"] == sorted(os.listdir(model_dir))
 
             with manager.run_iteration():
                 ppe.reporting.report({"score": 3.0})
                 topk(manager)
-            assert ["model_1.pt", "model_2.pt"] == sorted(os.listdir(tmpdir))
+            topk.wait()
+            assert ["model_1.pt", "model_2.pt"] == sorted(os.listdir(model_dir))
 
             with manager.run_iteration():
                 ppe.reporting.report({"score": 0.0})
                 topk(manager)
-            assert ["model_1.pt", "model_2.pt"] == sorted(os.listdir(tmpdir))
+            topk.wait()
+            assert ["model_1.pt", "model_2.pt"] == sorted(os.listdir(model_dir))
 
-            result = torch.load(os.path.join(tmpdir, "model_2.pt"))
+            result = torch.load(os.path.join(model_dir, "model_2.pt"))
             assert 3.0 == result["score"]
+            assert {"model_1.pt": 2.0, "model_2.pt": 3.0} == \
+                load_scores(model_dir)
 
     def test_minimize(self):
         model = nn.Linear(1, 1)
         with tempfile.TemporaryDirectory() as tmpdir:
+            model_dir = os.path.join(tmpdir, "model")
             manager = ppe.training.ExtensionsManager(
                 {}, {}, 1,
                 out_dir=tmpdir,
                 extensions=[],
                 iters_per_epoch=1,
             )
-            topk = SaveTopKModel(tmpdir, 1, "score", model, maximize=False)
+            topk = SaveTopKModel(model_dir, 1, "score", model, maximize=False)
             with manager.run_iteration():
                 ppe.reporting.report({"score": 1.0})
                 topk(manager)
-            assert ["model_0.pt"] == os.listdir(tmpdir)
+            topk.wait()
+            assert ["model_0.pt"] == os.listdir(model_dir)
 
             with manager.run_iteration():
                 ppe.reporting.report({"score": 2.0})
                 topk(manager)
-            assert ["model_0.pt"] == sorted(os.listdir(tmpdir))
+            topk.wait()
+            assert ["model_0.pt"] == sorted(os.listdir(model_dir))
 
     def test_resume_case(self):
         with tempfile.TemporaryDirectory() as tmpdir:
             model = nn.Linear(1, 1)
+            model_dir = os.path.join(tmpdir, "model")
             manager = ppe.training.ExtensionsManager(
                 {}, {}, 1,
                 out_dir=tmpdir,
                 extensions=[],
                 iters_per_epoch=1,
             )
-            topk = SaveTopKModel(tmpdir, 2, "score", model)
+            topk = SaveTopKModel(model_dir, 2, "score", model)
             with manager.run_iteration():
                 ppe.reporting.report({"score": 1.0})
                 topk(manager)
@@ -80,16 +97,48 @@ class TestSaveTopKModel(object):
                 ppe.reporting.report({"score": 2.0})
                 topk(manager)
 
-            topk = SaveTopKModel(tmpdir, 2, "score", model)
+            topk.wait()
+            topk = SaveTopKModel(model_dir, 2, "score", model)
             with manager.run_iteration():
                 ppe.reporting.report({"score": 3.0})
                 topk(manager)
-            assert ["model_1.pt", "model_2.pt"] == sorted(os.listdir(tmpdir))
+            topk.wait()
+            assert ["model_1.pt", "model_2.pt"] == sorted(os.listdir(model_dir))
 
             with manager.run_iteration():
                 ppe.reporting.report({"score": 0.0})
                 topk(manager)
-            assert ["model_1.pt", "model_2.pt"] == sorted(os.listdir(tmpdir))
+            topk.wait()
+            assert ["model_1.pt", "model_2.pt"] == sorted(os.listdir(model_dir))
+
+    def test_skip_model_not_in_top_k(self):
+        model = nn.Linear(1, 1)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            model_dir = os.path.join(tmpdir, "model")
+            manager = ppe.training.ExtensionsManager(
+                {}, {}, 1,
+                out_dir=tmpdir,
+                extensions=[],
+                iters_per_epoch=1,
+            )
+            topk = SaveTopKModel(model_dir, 1, "score", model)
+            with manager.run_iteration():
+                ppe.reporting.report({"score": 1.0})
+                topk(manager)
+            with manager.run_iteration():
+                ppe.reporting.report({"score": 0.0})
+                topk(manager)
+            topk.finalize()
+            assert ["model_0.pt"] == os.listdir(model_dir)
+            assert os.path.exists(score_index_path(model_dir))
+            with open(score_index_path(model_dir)) as file:
+                assert {"model_0.pt": 1.0} == json.load(file)
+
+    def test_load_scores_without_index(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            torch.save({"score": 1.0, "model": {}},
+                       os.path.join(tmpdir, "model_0.pt"))
+            assert {"model_0.pt": 1.0} == load_scores(tmpdir)
 
 
 class TestStopByThreshold(object):
@@ -0,0 +1,54 @@
+import os
+import pickle
+import tempfile
+
+import torch
+
+from mlprogram.builtins import Environment
+from mlprogram.utils.data import ColumnarDataset
+from mlprogram.utils.data.columnar import is_columnar_file, is_supported, save
+
+
+class TestColumnarDataset(object):
+    def test_happy_path(self):
+        elems = [
+            Environment({"code": "foo", "n_error": 1, "score": 0.5,
+                         "flag": True, "tensor": torch.arange(6).view(2, 3)},
+                        set(["n_error"])),
+            Environment({"code": "ばー", "n_error": 0, "score": 1.0,
+                         "flag": False, "tensor": torch.zeros(0, 3).long()},
+                        set(["n_error"])),
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "dataset")
+            save(elems, path)
+            assert is_columnar_file(path)
+            dataset = ColumnarDataset(path)
+            assert 2 == len(dataset)
+            for expected, actual in zip(elems, dataset):
+                assert expected["code"] == actual["code"]
+                assert expected["n_error"] == actual["n_error"]
+                assert expected["score"] == actual["score"]
+                assert expected["flag"] == actual["flag"]
+                assert torch.equal(expected["tensor"], actual["tensor"])
+                assert actual.is_supervision("n_error")
+                assert not actual.is_supervision("code")
+            assert elems[1]["code"] == dataset[-1]["code"]
+            assert 1 == len(dataset[1:])
+
+            dataset2 = pickle.loads(pickle.dumps(dataset))
+            assert dataset[0]["code"] == dataset2[0]["code"]
+
+    def test_empty(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "dataset")
+            save([], path)
+            assert 0 == len(ColumnarDataset(path))
+
+    def test_is_supported(self):
+        assert is_supported([Environment({"x": 0}), Environment({"x": 1})])
+        assert not is_supported([Environment({"x": 0}),
+                                 Environment({"x": "1"})])
+        assert not is_supported([Environment({"x": 0}),
+                                 Environment({"y": 1})])
+        assert not is_supported([Environment({"x": [0]})])
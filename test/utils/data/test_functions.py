@@ -29,7 +29,17 @@ class TestGetWords(object):
                                set(["ground_truth"]))]
         dataset = ListDataset(entries)
         words = get_words(dataset, tokenize)
-        assert ["foo", "bar", "test", "foo"] == words
+        assert {"foo": 2, "bar": 1, "test": 1} == words
+        assert ["foo", "bar", "test"] == list(words.keys())
+
+    def test_multiprocess(self):
+        entries = [Environment({"text_query": "foo bar"}),
+                   Environment({"text_query": "test foo"}),
+                   Environment({"text_query": "bar baz"})]
+        dataset = ListDataset(entries)
+        words = get_words(dataset, tokenize, n_process=2, chunk_size=1)
+        assert {"foo": 2, "bar": 2, "test": 1, "baz": 1} == words
+        assert ["foo", "bar", "test", "baz"] == list(words.keys())
 
 
 class TestGetCharacters(object):
@@ -40,11 +50,10 @@ class TestGetCharacters(object):
                                set(["ground_truth"]))]
         dataset = ListDataset(entries)
         chars = get_characters(dataset, tokenize)
-        assert [
-            "f", "o", "o",
-            "b", "a", "r",
-            "t", "e", "s", "t",
-            "f", "o", "o"] == chars
+        assert {
+            "f": 2, "o": 4, "b": 1, "a": 1, "r": 1, "t": 2, "e": 1, "s": 1
+        } == chars
+        assert ["f", "o", "b", "a", "r", "t", "e", "s"] == list(chars.keys())
 
 
 class TestGetSamples(object):
@@ -53,15 +62,27 @@ class TestGetSamples(object):
                    Environment({"ground_truth": "f(x)"}, set(["ground_truth"]))]
         dataset = ListDataset(entries)
         d = get_samples(dataset, Parser(lambda x: [x]))
-        assert [
-            ("str", "y"),
-            ("str", "x"),
-            ("int", "1"),
-            ("str", "f"),
-            ("str", "x")
-        ] == d.tokens
-        assert 12 == len(d.rules)
-        assert 28 == len(d.node_types)
+        assert {
+            ("str", "y"): 1,
+            ("str", "x"): 2,
+            ("int", "1"): 1,
+            ("str", "f"): 1,
+        } == d.tokens
+        assert [("str", "y"), ("str", "x"), ("int", "1"), ("str", "f")] == \
+            list(d.tokens.keys())
+        assert 12 == sum(d.rules.values())
+        assert 28 == sum(d.node_types.values())
+
+    def test_chunk_size(self):
+        entries = [Environment({"ground_truth": "y = x + 1"}, set(["ground_truth"])),
+                   Environment({"ground_truth": "f(x)"}, set(["ground_truth"]))]
+        dataset = ListDataset(entries)
+        parser = Parser(lambda x: [x])
+        expected = get_samples(dataset, parser)
+        d = get_samples(dataset, parser, chunk_size=1)
+        assert expected == d
+        assert list(expected.rules.keys()) == list(d.rules.keys())
+        assert list(expected.node_types.keys()) == list(d.node_types.keys())
 
 
 class TestCollate(object):
@@ -187,10 +208,25 @@ class TestCollate(object):
 class MockAnalyzer(Analyzer[str, str]):
     def __init__(self, errors):
         self.errors = errors
+        self.batch_sizes = []
 
     def __call__(self, code):
         return self.errors[code]
 
+    def analyze_all(self, codes):
+        self.batch_sizes.append(len(codes))
+        return super().analyze_all(codes)
+
+
+class MockDataset(ListDataset):
+    def __init__(self, elems):
+        super().__init__(elems)
+        self.n_read = 0
+
+    def __getitem__(self, idx):
+        self.n_read += 1
+        return super().__getitem__(idx)
+
 
 class TestSplitByNError(object):
     def test_split(self):
@@ -227,6 +263,39 @@ class TestSplitByNError(object):
             Environment({"code": "y"})
         ]
 
+    def test_chunk_size(self):
+        dataset = ListDataset([
+            Environment({"code": "y"}),
+            Environment({"code": "x", "n_error": 0}, set(["n_error"])),
+            Environment({"code": "x"}),
+            Environment({"code": "y"})
+        ])
+        analyzer = MockAnalyzer({"x": [], "y": ["error"]})
+        splitted = split_by_n_error(dataset, analyzer, chunk_size=2)
+        assert [2, 1] == analyzer.batch_sizes
+        assert list(splitted["no_error"]) == [
+            Environment({"code": "x", "n_error": 0}, set(["n_error"])),
+            Environment({"code": "x"})
+        ]
+        assert list(splitted["with_error"]) == [
+            Environment({"code": "y"}),
+            Environment({"code": "y"})
+        ]
+
+    def test_lazy(self):
+        dataset = MockDataset([
+            Environment({"code": "x"}),
+            Environment({"code": "y"})
+        ])
+        splitted = split_by_n_error(dataset,
+                                    MockAnalyzer({"x": [], "y": ["error"]}))
+        n_read = dataset.n_read
+        # The elements are read only when the split datasets are accessed
+        assert splitted["no_error"][0] == Environment({"code": "x"})
+        assert dataset.n_read == n_read + 1
+        assert splitted["with_error"][0] == Environment({"code": "y"})
+        assert dataset.n_read == n_read + 2
+
     def test_multiprocess(self):
         dataset = ListDataset([
             Environment({"code": "x"}),
@@ -0,0 +1,80 @@
+from mlprogram.utils.data import BucketBatchSampler, InfiniteSampler
+
+
+class TestInfiniteSampler(object):
+    def test_happy_path(self):
+        sampler = InfiniteSampler(3, seed=0)
+        it = iter(sampler)
+        indices = [next(it) for _ in range(9)]
+        assert [0, 1, 2] == sorted(indices[:3])
+        assert [0, 1, 2] == sorted(indices[3:6])
+        assert [0, 1, 2] == sorted(indices[6:])
+
+    def test_reshuffle(self):
+        sampler = InfiniteSampler(10, seed=0)
+        it = iter(sampler)
+        epoch0 = [next(it) for _ in range(10)]
+        epoch1 = [next(it) for _ in range(10)]
+        assert epoch0 != epoch1
+
+    def test_seed(self):
+        it0 = iter(InfiniteSampler(10, seed=0))
+        it1 = iter(InfiniteSampler(10, seed=0))
+        assert [next(it0) for _ in range(20)] == \
+            [next(it1) for _ in range(20)]
+
+    def test_without_shuffle(self):
+        it = iter(InfiniteSampler(3, shuffle=False))
+        assert [0, 1, 2, 0, 1, 2] == [next(it) for _ in range(6)]
+
+    def test_shard(self):
+        indices = [InfiniteSampler(5, seed=0, rank=rank,
+                                   world_size=2).indices(0)
+                   for rank in range(2)]
+        assert [3, 3] == [len(x) for x in indices]
+        assert set(range(5)) == set(indices[0] + indices[1])
+
+
+class TestBucketBatchSampler(object):
+    def test_happy_path(self):
+        lengths = [5, 1, 4, 2, 3, 6]
+        sampler = BucketBatchSampler(lengths, batch_size=2, seed=0,
+                                     rank=0, world_size=1)
+        batches = sampler.batches(0)
+        assert 3 == len(batches)
+        assert [0, 1, 2, 3, 4, 5] == sorted(sum(batches, []))
+        assert [[1, 3], [4, 2], [0, 5]] == \
+            sorted(batches, key=lambda batch: lengths[batch[0]])
+
+    def test_max_tokens(self):
+        lengths = [1, 1, 1, 1, 4, 4]
+        sampler = BucketBatchSampler(lengths, max_tokens=4, shuffle=False,
+                                     rank=0, world_size=1)
+        assert [[0, 1, 2, 3], [4], [5]] == sampler.batches(0)
+
+    def test_bucket_size(self):
+        lengths = [3, 2, 1, 3, 2, 1]
+        sampler = BucketBatchSampler(lengths, batch_size=3, bucket_size=3,
+                                     shuffle=False, rank=0, world_size=1)
+        assert [[2, 1, 0], [5, 4, 3]] == sampler.batches(0)
+
+    def test_shard(self):
+        lengths = [1, 2, 3, 4, 5, 6, 7]
+        batches = [
+            BucketBatchSampler(lengths, batch_size=2, seed=0,
+                               rank=rank, world_size=3).batches(0)
+            for rank in range(3)
+        ]
+        assert [2, 2, 2] == [len(b) for b in batches]
+        indices = sum(sum(batches, []), [])
+        assert set(range(7)) == set(indices)
+
+    def test_iter(self):
+        sampler = BucketBatchSampler([1, 2, 3], batch_size=2, seed=0,
+                                     rank=0, world_size=1)
+        assert 2 == len(sampler)
+        it = iter(sampler)
+        batches = [next(it) for _ in range(6)]
+        assert [0, 1, 2] * 3 == \
+            sorted(sum(batches[:2], [])) + sorted(sum(batches[2:4], [])) + \
+            sorted(sum(batches[4:], []))
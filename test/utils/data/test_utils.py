@@ -1,6 +1,13 @@
 import torch
 
-from mlprogram.utils.data import ListDataset, to_map_style_dataset, transform
+from mlprogram import distributed
+from mlprogram.utils.data import (
+    ListDataset,
+    ShardedIterableDataset,
+    SubsetDataset,
+    to_map_style_dataset,
+    transform,
+)
 
 
 class MockDataset(torch.utils.data.IterableDataset):
@@ -23,6 +30,15 @@ class TestToMapStyleDataset(object):
         assert list(range(1, 11)) == list(elems)
 
 
+class TestSubsetDataset(object):
+    def test_happy_path(self):
+        dataset = SubsetDataset(ListDataset([0, 1, 2, 3]), [3, 1])
+        assert 2 == len(dataset)
+        assert 3 == dataset[0]
+        assert [3, 1] == dataset[:2]
+        assert [3, 1] == list(dataset)
+
+
 class TestTransform(object):
     def test_map_style_dataset(self):
         dataset = transform(ListDataset([0]), lambda x: x + 1)
@@ -35,3 +51,23 @@ class TestTransform(object):
         for x in dataset:
             break
         assert 2 == x
+
+
+class TestShardedIterableDataset(object):
+    def test_happy_path(self):
+        dataset = ShardedIterableDataset(ListDataset([0, 1, 2, 3, 4]))
+        assert [0, 1, 2, 3, 4] == list(dataset)
+
+    def test_shard_by_rank(self, monkeypatch):
+        monkeypatch.setattr(distributed, "size", lambda: 2)
+        dataset = ShardedIterableDataset(ListDataset([0, 1, 2, 3, 4]))
+        monkeypatch.setattr(distributed, "rank", lambda: 0)
+        assert [0, 2, 4] == list(dataset)
+        monkeypatch.setattr(distributed, "rank", lambda: 1)
+        assert [1, 3] == list(dataset)
+
+    def test_shard_by_worker(self):
+        dataset = ShardedIterableDataset(ListDataset([0, 1, 2, 3, 4]))
+        loader = torch.utils.data.DataLoader(dataset, 1, num_workers=2,
+                                             collate_fn=lambda x: x[0])
+        assert [0, 1, 2, 3, 4] == sorted(loader)